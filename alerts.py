@@ -0,0 +1,149 @@
+import queue
+import random
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+DIGEST_WINDOW = 60  # Seconds findings are collected before they go out as one digest email
+DEDUP_CACHE_SIZE = 100000  # Findings remembered to drop repeats of the same tx hash and issue
+MAX_RETRIES = 5  # Delivery attempts after the first one fails
+BACKOFF_BASE = 2.0  # Seconds, doubled on every retry
+SMTP_TIMEOUT = 30  # Seconds before an SMTP operation is abandoned
+
+
+# Background email dispatcher. Messages are queued and sent by a worker thread over one reused SMTP
+# connection; findings are deduplicated and batched into a digest email per time window.
+class AlertDispatcher:
+    def __init__(self, host, port, from_email, password, to_email, use_ssl=True, digest_window=DIGEST_WINDOW):
+        self.host = host
+        self.port = port
+        self.from_email = from_email
+        self.password = password
+        self.to_email = to_email
+        self.use_ssl = use_ssl
+        self.digest_window = digest_window
+        self.queue = queue.Queue()
+        self._connection = None
+        self._seen = OrderedDict()
+        self._pending = OrderedDict()  # Wallet -> findings waiting for the next digest
+        self._window_started = None
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    # Queue a complete email, it is sent as soon as the worker picks it up
+    def send(self, subject, body):
+        self.queue.put(("message", subject, body))
+
+    # Queue the findings of a wallet for the next digest
+    def submit_findings(self, wallet_address, findings):
+        self.queue.put(("findings", wallet_address, findings))
+
+    # Send the pending digest and every queued message, then stop the worker
+    def close(self):
+        self.queue.put(("stop",))
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            timeout = None
+            if self._window_started is not None:
+                timeout = max(0, self._window_started + self.digest_window - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self._send_digest()
+                continue
+
+            if item[0] == "message":
+                self._deliver(item[1], item[2])
+            elif item[0] == "findings":
+                self._add_findings(item[1], item[2])
+            else:
+                self._send_digest()
+                self._disconnect()
+                return
+
+    def _add_findings(self, wallet_address, findings):
+        wallet_address = wallet_address.lower()  # Findings of one wallet share its digest entry however the address is written
+        for finding in findings:
+            key = (wallet_address, finding.get("tx_hash") or finding["details"], finding["issue"])
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                continue
+            self._seen[key] = True
+            if len(self._seen) > DEDUP_CACHE_SIZE:
+                self._seen.popitem(last=False)
+            self._pending.setdefault(wallet_address, []).append(finding)
+        if self._pending and self._window_started is None:
+            self._window_started = time.monotonic()
+
+    def _send_digest(self):
+        self._window_started = None
+        if not self._pending:
+            return
+        total = sum(len(findings) for findings in self._pending.values())
+        lines = []
+        for wallet_address, findings in self._pending.items():
+            lines.append(f"Wallet: {wallet_address}")
+            for finding in findings:
+                lines.append(f"- {finding['issue']}: {finding['details']} (Tx Hash: {finding.get('tx_hash', 'N/A')})")
+            lines.append("")
+        subject = f"Ethereum Wallet Alerts: {total} findings across {len(self._pending)} wallets"
+        self._pending = OrderedDict()
+        self._deliver(subject, "\n".join(lines))
+
+    # Reuse the open connection while the server still answers, otherwise connect and log in again
+    def _connect(self):
+        if self._connection is not None:
+            try:
+                if self._connection.noop()[0] == 250:
+                    return self._connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._disconnect()
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        self._connection = smtp_class(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.password:
+            self._connection.login(self.from_email, self.password)
+        return self._connection
+
+    def _disconnect(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._connection = None
+
+    def _deliver(self, subject, body):
+        msg = MIMEMultipart()
+        msg['From'] = self.from_email
+        msg['To'] = self.to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                self._connect().sendmail(self.from_email, self.to_email, msg.as_string())
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"Error sending email (attempt {attempt + 1}): {e}")
+                self._disconnect()
+                if attempt < MAX_RETRIES:
+                    time.sleep(random.uniform(0, BACKOFF_BASE * 2 ** attempt))
+        print(f"Giving up on email: {subject}")
+        return False
+
+
+_dispatchers = {}
+
+
+# Shared dispatcher per SMTP account, kept alive across Streamlit reruns
+def get_dispatcher(host, port, from_email, password, to_email, use_ssl=True):
+    key = (host, port, from_email, to_email)
+    if key not in _dispatchers:
+        _dispatchers[key] = AlertDispatcher(host, port, from_email, password, to_email, use_ssl)
+    return _dispatchers[key]
@@ -0,0 +1,44 @@
+import argparse
+
+from metrics import write_metrics
+from pool import POOL_WORKERS, DetectionPool
+from core import BATCH_CONCURRENCY, TRANSACTION_COUNT, read_wallet_addresses, scan_wallets, write_batch_results
+
+
+# Command line entry point for scanning a list of wallets without the Streamlit UI
+def main():
+    parser = argparse.ArgumentParser(description="Scan a list of Ethereum wallets for suspicious activity.")
+    parser.add_argument("addresses", help="Text or CSV file with one wallet address per line")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl",
+                        help="Output file, .csv writes activity counts per wallet, anything else JSON lines with all findings")
+    parser.add_argument("-n", "--count", type=int, default=TRANSACTION_COUNT, help="Transactions to analyse per wallet")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY, help="Wallets fetched at the same time")
+    parser.add_argument("-w", "--workers", type=int, nargs="?", const=POOL_WORKERS, default=0,
+                        help="Run detection on this many processes (all cores if no number is given)")
+    parser.add_argument("--metrics", help="Write stage timings and API counters to this file in Prometheus text format")
+    args = parser.parse_args()
+
+    with open(args.addresses) as f:
+        wallet_addresses = read_wallet_addresses(f)
+
+    progress = {"done": 0}
+
+    def report(result):
+        progress["done"] += 1
+        flagged = sum(result["activity_counts"].values())
+        print(f"[{progress['done']}/{len(wallet_addresses)}] {result['wallet']}: {flagged} findings")
+
+    pool = DetectionPool(args.workers) if args.workers else None
+    try:
+        results = scan_wallets(wallet_addresses, count=args.count, concurrency=args.concurrency, on_result=report, pool=pool)
+    finally:
+        if pool:
+            pool.close()
+    write_batch_results(results, args.output)
+    print(f"Wrote results for {len(results)} wallets to {args.output}")
+    if args.metrics:
+        write_metrics(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
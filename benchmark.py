@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from store import TransactionStore
+from core import WalletDetectorState, build_transaction_frame, detect_suspicious_activity, load_rollups
+from rendering import (build_transaction_table, plot_address_interaction_network, plot_cumulative_transaction_value,
+                       plot_gas_fee_distribution, plot_pie_chart, plot_spend_vs_balance, plot_top_5_largest_transactions,
+                       plot_transaction_activity_timeline, plot_transaction_count_over_time, plot_transaction_heatmap,
+                       plot_transaction_success_rate, plot_transaction_value_bar_chart, plot_transaction_value_distribution,
+                       plot_transaction_value_trend)
+
+BENCHMARK_WALLET = "0x00000000000000000000000000000000000be7c4"
+DEFAULT_SIZES = [1000, 10000, 100000]
+GENERATE_CHUNK_SIZE = 10000  # Transactions generated and written to the store at a time
+START_BLOCK = 10000000
+START_TIMESTAMP = 1600000000
+SECONDS_PER_BLOCK = 12
+COLD_START_MODULES = ["core", "monitor", "batch", "rendering", "wallet"]  # Entry points whose import time is measured
+COLD_START_RUNS = 3  # Fresh interpreters per module, the fastest run is kept
+
+
+# Synthetic txlist results for one wallet, streamed in chunks so 10^7 transactions never sit in memory at once.
+# Counterparties follow a Zipf-like law (`skew` 0 is uniform, higher values concentrate traffic on a few
+# addresses), values are log-normal and `failure_rate` of the transactions have isError set.
+def generate_transactions(count, wallet_address=BENCHMARK_WALLET, counterparties=10000, skew=1.1, failure_rate=0.05, seed=0,
+                          chunk_size=GENERATE_CHUNK_SIZE):
+    rng = np.random.default_rng(seed)
+    addresses = np.array(["0x" + rng.bytes(20).hex() for _ in range(counterparties)], dtype=object)
+    weights = 1.0 / np.arange(1, counterparties + 1) ** skew
+    weights /= weights.sum()
+    block = START_BLOCK
+
+    for start in range(0, count, chunk_size):
+        size = min(chunk_size, count - start)
+        blocks = block + np.cumsum(rng.geometric(0.3, size) - 1)
+        block = int(blocks[-1])
+        partners = addresses[rng.choice(counterparties, size=size, p=weights)]
+        outgoing = rng.random(size) < 0.5
+        values = np.where(rng.random(size) < 0.2, 0, rng.lognormal(np.log(1e17), 2.5, size))
+        gas_prices = rng.integers(10 ** 9, 200 * 10 ** 9, size)
+        gas_used = rng.choice([21000, 46000, 120000, 250000], size)
+        failed = rng.random(size) < failure_rate
+        creations = rng.random(size) < 0.001
+        hashes = rng.bytes(32 * size).hex()
+
+        for i in range(size):
+            partner = partners[i]
+            yield {
+                "blockNumber": str(blocks[i]),
+                "timeStamp": str(START_TIMESTAMP + (blocks[i] - START_BLOCK) * SECONDS_PER_BLOCK),
+                "hash": "0x" + hashes[64 * i:64 * (i + 1)],
+                "transactionIndex": str(i % 200),
+                "from": wallet_address if outgoing[i] else partner,
+                "to": "" if creations[i] else (partner if outgoing[i] else wallet_address),
+                "value": str(int(values[i])),
+                "gas": str(gas_used[i] * 2),
+                "gasPrice": str(gas_prices[i]),
+                "gasUsed": str(gas_used[i]),
+                "isError": "1" if failed[i] else "0",
+                "contractAddress": ""
+            }
+
+
+# Time a stage, then run it again under tracemalloc for its peak allocation (tracing slows it down too much to time it)
+def measure(stage, function, track_memory=True):
+    started = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - started
+    peak_bytes = None
+    if track_memory:
+        tracemalloc.start()
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, {"stage": stage, "seconds": seconds, "peak_bytes": peak_bytes}
+
+
+# Run every stage for one history size and return one record per stage
+def run_benchmark(size, counterparties=10000, skew=1.1, failure_rate=0.05, seed=0, track_memory=True):
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = TransactionStore(os.path.join(directory, "benchmark.db"))
+
+        # Generating and writing are timed separately per chunk, the store only ever sees whole chunks
+        generate_seconds = write_seconds = 0.0
+        transactions = generate_transactions(size, BENCHMARK_WALLET, counterparties, skew, failure_rate, seed)
+        while True:
+            started = time.perf_counter()
+            chunk = [tx for _, tx in zip(range(GENERATE_CHUNK_SIZE), transactions)]
+            generate_seconds += time.perf_counter() - started
+            if not chunk:
+                break
+            started = time.perf_counter()
+            store.add_transactions(BENCHMARK_WALLET, chunk)
+            write_seconds += time.perf_counter() - started
+        records.append({"stage": "generate", "seconds": generate_seconds, "peak_bytes": None})
+        records.append({"stage": "store_write", "seconds": write_seconds, "peak_bytes": None})
+
+        _, record = measure("rollup_refresh", lambda: store.refresh_rollups(BENCHMARK_WALLET, 0), False)
+        records.append(record)
+        frame, record = measure("build_frame", lambda: build_transaction_frame(store.iter_transactions(BENCHMARK_WALLET)), track_memory)
+        records.append(record)
+
+        wallet_creation_date = START_TIMESTAMP
+        balance = 1.0
+        (suspicious_activities, activity_counts), record = measure(
+            "detect", lambda: detect_suspicious_activity(frame, wallet_creation_date, balance), track_memory)
+        records.append(record)
+        _, record = measure("detect_sketches", lambda: detect_suspicious_activity(frame, wallet_creation_date, balance, use_sketches=True),
+                            track_memory)
+        records.append(record)
+        _, record = measure("detector_state", lambda: WalletDetectorState(BENCHMARK_WALLET, wallet_creation_date, balance).add_transactions(
+            store.iter_transactions(BENCHMARK_WALLET)), track_memory)
+        records.append(record)
+
+        _, record = measure("table", lambda: build_transaction_table(frame), track_memory)
+        records.append(record)
+
+        hourly_rollups, record = measure("load_rollups_hour", lambda: load_rollups(BENCHMARK_WALLET, "hour", store), track_memory)
+        records.append(record)
+        daily_rollups, record = measure("load_rollups_day", lambda: load_rollups(BENCHMARK_WALLET, "day", store), track_memory)
+        records.append(record)
+
+        charts = [
+            (plot_pie_chart, (activity_counts,)),
+            (plot_transaction_value_bar_chart, (frame,)),
+            (plot_transaction_heatmap, (hourly_rollups,)),
+            (plot_spend_vs_balance, (frame, balance)),
+            (plot_transaction_count_over_time, (daily_rollups,)),
+            (plot_top_5_largest_transactions, (frame,)),
+            (plot_transaction_value_distribution, (frame,)),
+            (plot_gas_fee_distribution, (frame,)),
+            (plot_cumulative_transaction_value, (hourly_rollups,)),
+            (plot_address_interaction_network, (frame, BENCHMARK_WALLET)),
+            (plot_transaction_value_trend, (hourly_rollups,)),
+            (plot_transaction_success_rate, (frame,)),
+            (plot_transaction_activity_timeline, (daily_rollups,))
+        ]
+        # Charts are timed up to their JSON payload, which is what gets sent to the browser
+        for plot_function, args in charts:
+            payload, record = measure(plot_function.__name__, lambda: plot_function(*args).to_json(), track_memory)
+            record["payload_bytes"] = len(payload)
+            records.append(record)
+
+        store.close()
+
+    for record in records:
+        record["size"] = size
+        if record["stage"] == "detect":
+            record["findings"] = len(suspicious_activities)
+    return records
+
+
+# Import time of each entry point in a fresh interpreter, what a cron scan or a monitor restart pays
+# before doing any work. Headless entry points must not pull in streamlit, plotly, pandas or web3.
+def measure_cold_start(modules=COLD_START_MODULES, runs=COLD_START_RUNS):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    timings = {}
+    for module in modules:
+        code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+        seconds = [float(subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True).stdout.split()[-1])
+                   for _ in range(runs)]
+        timings[module] = min(seconds)
+    return timings
+
+
+# Environment details stored with the results, so runs from different machines and releases can be told apart
+def benchmark_metadata(args):
+    return {
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "counterparties": args.counterparties,
+        "skew": args.skew,
+        "failure_rate": args.failure_rate,
+        "seed": args.seed
+    }
+
+
+# Command line entry point, runs offline against a temporary store
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parsing, detection, the table and the charts on synthetic wallets.")
+    parser.add_argument("-s", "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Transactions per synthetic wallet (10^3 to 10^7)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="JSON file the results are written to")
+    parser.add_argument("--counterparties", type=int, default=10000, help="Distinct counterparties of the synthetic wallet")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of counterparty popularity, 0 is uniform")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of failed transactions")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the generator")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass that records peak memory")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        records = run_benchmark(size, args.counterparties, args.skew, args.failure_rate, args.seed, not args.no_memory)
+        for record in records:
+            peak = "" if record["peak_bytes"] is None else f"{record['peak_bytes'] / 2 ** 20:10.1f} MiB"
+            print(f"{size:>10} {record['stage']:<40} {record['seconds']:10.4f}s {peak}", file=sys.stderr)
+        results.extend(records)
+
+    cold_start = measure_cold_start()
+    for module, seconds in cold_start.items():
+        print(f"{'cold start':>10} {module:<40} {seconds:10.4f}s", file=sys.stderr)
+
+    metadata = benchmark_metadata(args)
+    metadata["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Reported in KiB on Linux
+    with open(args.output, "w") as f:
+        json.dump({"metadata": metadata, "cold_start": cold_start, "results": results}, f, indent=2)
+    print(f"Wrote {len(results)} measurements to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+import numpy as np
+
+# Location of the compiled blacklist, build it with `python blacklist.py <lists...> -o blacklist.bin`
+BLACKLIST_PATH = os.environ.get("WALLET_MONITOR_BLACKLIST", "blacklist.bin")
+
+BLOOM_FALSE_POSITIVE_RATE = 0.01  # Share of clean addresses that pass the Bloom filter and need the binary search
+RELOAD_CHECK_INTERVAL = 5  # Seconds between checks of the blacklist file for a newer version
+
+# File layout: header, Bloom filter bits, then the sorted 20-byte addresses.
+# Header: magic, format version, address count, Bloom filter size in bits, number of Bloom hashes.
+MAGIC = b"EWBL"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQI4x")
+ADDRESS_SIZE = 20
+
+_address_pattern = re.compile(r"0x[0-9a-fA-F]{40}")
+_mask64 = (1 << 64) - 1
+
+
+# Addresses are keccak hashes already, so the Bloom hashes are taken from the address bytes themselves
+# and combined with double hashing (h1 + i * h2). Returns the bit positions, one row per address.
+def _bloom_positions(keys, num_bits, num_hashes):
+    words = keys.view(np.uint8).reshape(-1, ADDRESS_SIZE)[:, :16].copy().view("<u8")
+    h1 = words[:, 0]
+    h2 = words[:, 1] | np.uint64(1)
+    return np.stack([(h1 + np.uint64(i) * h2) % np.uint64(num_bits) for i in range(num_hashes)], axis=1)
+
+
+def _address_bytes(address):
+    if not isinstance(address, str) or not _address_pattern.fullmatch(address):
+        return None
+    return bytes.fromhex(address[2:])
+
+
+# Compile addresses into the binary blacklist format. The file is written next to `path` and moved
+# into place, so a running monitor never reads a half-written list.
+def write_blacklist(addresses, path=BLACKLIST_PATH, false_positive_rate=BLOOM_FALSE_POSITIVE_RATE):
+    raw = [key for key in map(_address_bytes, addresses) if key is not None]
+    keys = np.unique(np.array(raw, dtype=f"S{ADDRESS_SIZE}"))
+    # Optimal Bloom filter size and hash count for the requested false positive rate
+    num_bits = max(64, int(math.ceil(-len(keys) * math.log(false_positive_rate) / math.log(2) ** 2 / 64)) * 64)
+    num_hashes = max(1, round(num_bits / max(len(keys), 1) * math.log(2)))
+    bits = np.zeros(num_bits, dtype=bool)
+    if len(keys):
+        bits[_bloom_positions(keys, num_bits, num_hashes).ravel()] = True
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), num_bits, num_hashes))
+        f.write(np.packbits(bits, bitorder="little").tobytes())
+        f.write(keys.tobytes())
+    os.replace(temporary_path, path)
+    return len(keys)
+
+
+# One compiled blacklist file, memory-mapped so only the pages touched by lookups are read
+class BlacklistFile:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, num_bits, num_hashes = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} blacklist file")
+        self.count = count
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bloom = np.frombuffer(self._mmap, dtype=np.uint8, count=num_bits // 8, offset=HEADER.size)
+        self.keys = np.frombuffer(self._mmap, dtype=f"S{ADDRESS_SIZE}", count=count, offset=HEADER.size + num_bits // 8)
+
+    def __len__(self):
+        return self.count
+
+    # Single lookup: Bloom filter first, binary search only for the few addresses that pass it
+    def contains(self, key):
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:16], "little") | 1
+        for i in range(self.num_hashes):
+            position = ((h1 + i * h2) & _mask64) % self.num_bits
+            if not self._mmap[HEADER.size + (position >> 3)] >> (position & 7) & 1:
+                return False
+        index = int(np.searchsorted(self.keys, key))
+        return index < self.count and self.keys[index:index + 1].tobytes() == key
+
+    # Vectorized lookup of many keys (an S20 array), returns a boolean array
+    def contains_many(self, keys):
+        found = np.zeros(len(keys), dtype=bool)
+        if not self.count or not len(keys):
+            return found
+        positions = _bloom_positions(keys, self.num_bits, self.num_hashes)
+        candidates = ((self.bloom[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+        candidate_keys = keys[candidates]
+        indices = np.minimum(np.searchsorted(self.keys, candidate_keys), self.count - 1)
+        found[candidates] = self.keys[indices] == candidate_keys
+        return found
+
+
+# Blacklist screening with hot reload: the file is re-checked every RELOAD_CHECK_INTERVAL seconds and
+# swapped in when it changed, so daily list updates need no restart. `extra_addresses` are always listed.
+class Blacklist:
+    def __init__(self, path=BLACKLIST_PATH, extra_addresses=()):
+        self.path = path
+        self.extra_addresses = {address.lower() for address in extra_addresses}
+        self.lock = threading.Lock()
+        self._file = None
+        self._signature = None
+        self._checked = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < RELOAD_CHECK_INTERVAL:
+            return
+        with self.lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._file = self._signature = None
+                return
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if signature == self._signature:
+                return
+            try:
+                self._file = BlacklistFile(self.path)
+                self._signature = signature
+            except (OSError, ValueError) as e:
+                print(f"Error loading blacklist {self.path}: {e}")
+
+    def __len__(self):
+        self.reload_if_changed()
+        return len(self.extra_addresses) + (len(self._file) if self._file else 0)
+
+    def __contains__(self, address):
+        self.reload_if_changed()
+        if isinstance(address, str) and address.lower() in self.extra_addresses:
+            return True
+        key = _address_bytes(address)
+        return key is not None and self._file is not None and self._file.contains(key)
+
+    # Screen a column of addresses, each distinct address is looked up once
+    def screen(self, addresses):
+        self.reload_if_changed()
+        values = np.array([address if isinstance(address, str) else "" for address in addresses], dtype=str)
+        unique, inverse = np.unique(values, return_inverse=True)
+        listed = np.isin(np.char.lower(unique), list(self.extra_addresses))
+        blacklist_file = self._file
+        if blacklist_file is not None:
+            raw = [_address_bytes(address) for address in unique.tolist()]
+            valid = np.array([key is not None for key in raw], dtype=bool)
+            keys = np.array([key for key in raw if key is not None], dtype=f"S{ADDRESS_SIZE}")
+            listed[valid] |= blacklist_file.contains_many(keys)
+        return listed[inverse.ravel()]
+
+
+_blacklists = {}
+
+
+# Shared blacklist per file, reused across Streamlit reruns and by every detector
+def get_blacklist(path=BLACKLIST_PATH, extra_addresses=()):
+    if path not in _blacklists:
+        _blacklists[path] = Blacklist(path, extra_addresses)
+    return _blacklists[path]
+
+
+# Read addresses from text or CSV screening lists, anything that is not a 0x address is skipped
+def read_blacklist_sources(paths):
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                yield from (match.lower() for match in _address_pattern.findall(line))
+
+
+# Command line entry point for compiling screening lists into the binary blacklist
+def main():
+    parser = argparse.ArgumentParser(description="Compile address screening lists into a memory-mapped blacklist.")
+    parser.add_argument("sources", nargs="+", help="Text or CSV files containing 0x addresses")
+    parser.add_argument("-o", "--output", default=BLACKLIST_PATH, help="Blacklist file to write")
+    parser.add_argument("-p", "--false-positive-rate", type=float, default=BLOOM_FALSE_POSITIVE_RATE,
+                        help="Bloom filter false positive rate")
+    args = parser.parse_args()
+
+    count = write_blacklist(read_blacklist_sources(args.sources), args.output, args.false_positive_rate)
+    print(f"Wrote {count} addresses to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
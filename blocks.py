@@ -0,0 +1,152 @@
+import asyncio
+import json
+import time
+
+from etherscan import MAX_RETRIES, POOL_SIZE, REQUEST_TIMEOUT, PooledClient, RetryableError, read_body
+from metrics import metrics
+
+RPC_BATCH_SIZE = 100  # Requests per JSON-RPC batch, node providers reject larger batches
+MAX_BLOCKS_PER_SCAN = 500  # Blocks read in one scan, a monitor that fell behind catches up in steps
+
+
+# Async JSON-RPC client for an Ethereum node. Requests of one method are sent as batches over a
+# pooled connection, with the same retries and backoff as the Etherscan client.
+class JsonRpcClient(PooledClient):
+    def __init__(self, url, batch_size=RPC_BATCH_SIZE, pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        super().__init__(pool_size, timeout)
+        self.url = url
+        self.batch_size = batch_size
+
+    # Call `method` once per params entry and return the results in order, None for calls that failed
+    async def batch(self, method, params_list):
+        chunks = [params_list[i:i + self.batch_size] for i in range(0, len(params_list), self.batch_size)]
+        responses = await asyncio.gather(*(self._send_batch(method, chunk) for chunk in chunks))
+        return [result for response in responses for result in response]
+
+    async def _send_batch(self, method, params_list):
+        payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params} for i, params in enumerate(params_list)]
+
+        async def attempt(session):
+            started = time.perf_counter()
+            async with session.post(self.url, json=payload) as response:
+                body = await read_body(response)
+            data = json.loads(body)
+            metrics.observe("wallet_monitor_rpc_batch_seconds", time.perf_counter() - started, method=method)
+            metrics.increment("wallet_monitor_payload_bytes_total", len(body), source=f"rpc:{method}")
+            if not isinstance(data, list):
+                # The node answered the whole batch with one error, e.g. a rate limit
+                raise RetryableError(data.get("error") if isinstance(data, dict) else data)
+            return data
+
+        try:
+            data = await self.request(attempt, lambda outcome: metrics.increment("wallet_monitor_rpc_calls_total", len(params_list),
+                                                                                  method=method, outcome=outcome))
+        except RetryableError as e:
+            print(f"Error calling {method} on the node after {MAX_RETRIES + 1} attempts: {e}")
+            return [None] * len(params_list)
+
+        results = [None] * len(params_list)
+        for item in data:
+            if "error" in item:
+                print(f"Error from node on {method}: {item['error']}")
+                metrics.increment("wallet_monitor_rpc_calls_total", method=method, outcome="error")
+            else:
+                results[item["id"]] = item.get("result")
+                metrics.increment("wallet_monitor_rpc_calls_total", method=method, outcome="ok")
+        return results
+
+    async def get_block_number(self):
+        return (await self.batch("eth_blockNumber", [[]]))[0]
+
+    async def get_blocks(self, numbers):
+        return await self.batch("eth_getBlockByNumber", [[hex(number), True] for number in numbers])
+
+    async def get_receipts(self, hashes):
+        return await self.batch("eth_getTransactionReceipt", [[tx_hash] for tx_hash in hashes])
+
+
+# Convert a node transaction and its receipt into the dict shape returned by Etherscan's txlist,
+# so the store and the detectors do not care which source a transaction came from
+def to_txlist_transaction(tx, receipt, timestamp):
+    return {
+        "blockNumber": str(int(tx["blockNumber"], 16)),
+        "timeStamp": str(timestamp),
+        "hash": tx["hash"],
+        "transactionIndex": str(int(tx["transactionIndex"], 16)),
+        "from": tx["from"].lower(),
+        "to": (tx.get("to") or "").lower(),
+        "contractAddress": (receipt.get("contractAddress") or "").lower(),
+        "value": str(int(tx["value"], 16)),
+        "gas": str(int(tx["gas"], 16)),
+        "gasPrice": str(int(receipt.get("effectiveGasPrice") or tx.get("gasPrice") or "0x0", 16)),
+        "gasUsed": str(int(receipt["gasUsed"], 16)),
+        "isError": "0" if receipt.get("status", "0x1") == "0x1" else "1"  # Receipts before Byzantium carry no status
+    }
+
+
+# Reads every new block once for the whole watchlist. Transactions are matched against a hash index
+# of the watched addresses and only the matches need a receipt, so a scan costs the same for 10 or
+# 10,000 wallets. Hashes of recent blocks are remembered to notice reorganisations.
+class BlockScanner:
+    def __init__(self, client, wallet_addresses, reorg_depth, max_blocks=MAX_BLOCKS_PER_SCAN):
+        self.client = client
+        self.watched = {address.lower(): address for address in wallet_addresses}
+        self.reorg_depth = reorg_depth
+        self.max_blocks = max_blocks
+        self.block_hashes = {}  # Block number -> hash of the blocks scanned recently
+
+    async def get_head(self):
+        result = await self.client.get_block_number()
+        return None if result is None else int(result, 16)
+
+    # Scan blocks from `start` up to `end` and return the matching transactions per watched wallet, in
+    # txlist format and block order, the block the next scan starts at and whether a reorganisation was
+    # found. Blocks or receipts the node did not return end the scan early. On a reorganisation nothing is
+    # returned and the next scan starts `reorg_depth` blocks before the fork, and never after `start`.
+    async def scan(self, start, end):
+        end = min(end, start + self.max_blocks - 1)
+        blocks = await self.client.get_blocks(range(start, end + 1))
+        matched = []  # (block number, timestamp, tx, watched wallets)
+        next_block = start
+        for block in blocks:
+            if block is None:
+                break
+            number = int(block["number"], 16)
+            parent_hash = self.block_hashes.get(number - 1)
+            if parent_hash is not None and block["parentHash"] != parent_hash:
+                rewind = max(0, min(start, number - self.reorg_depth))
+                self.block_hashes = {n: h for n, h in self.block_hashes.items() if n < rewind}
+                print(f"Reorganisation at block {number}, scanning again from block {rewind}")
+                return {}, rewind, True
+            self.block_hashes[number] = block["hash"]
+            timestamp = int(block["timestamp"], 16)
+            for tx in block["transactions"]:
+                wallets = {self.watched.get(tx["from"].lower()), self.watched.get((tx.get("to") or "").lower())}
+                wallets.discard(None)
+                if wallets:
+                    matched.append((number, timestamp, tx, wallets))
+            next_block = number + 1
+
+        receipts = await self.client.get_receipts([tx["hash"] for _, _, tx, _ in matched])
+        matches = {}
+        for (number, timestamp, tx, wallets), receipt in zip(matched, receipts):
+            if receipt is None:
+                next_block = number  # The block is scanned again once the node returns the receipt
+                break
+            transaction = to_txlist_transaction(tx, receipt, timestamp)
+            for wallet_address in wallets:
+                matches.setdefault(wallet_address, []).append(transaction)
+
+        self.block_hashes = {n: h for n, h in self.block_hashes.items() if n >= next_block - 2 * self.reorg_depth}
+        metrics.increment("wallet_monitor_blocks_scanned_total", next_block - start)
+        return matches, next_block, False
+
+
+_clients = {}
+
+
+# Shared client per node URL, requests run on the Etherscan client loop and are closed with the Etherscan clients
+def get_rpc_client(url):
+    if url not in _clients:
+        _clients[url] = JsonRpcClient(url)
+    return _clients[url]
@@ -0,0 +1,825 @@
+import asyncio
+import bisect
+import csv
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from alerts import get_dispatcher
+from blacklist import get_blacklist
+from etherscan import get_client, run_sync
+from metrics import timed
+from sketches import BloomFilter, HyperLogLog, SpaceSaving
+from store import get_store
+
+# Fetching, normalization and detection, shared by the app, batch.py and monitor.py. Nothing here imports
+# the UI or chart libraries; pandas and web3 are imported by the functions that need them, so headless
+# entry points start fast.
+
+# Set up your Etherscan and Infura API keys
+INFURA_URL = os.environ.get("ETHEREUM_RPC_URL", "https://mainnet.infura.io/v3/INFURAAPIKEY")  # Override to use a local node or stub
+ETHERSCAN_API_KEY = "ETHERSCAN API KEY"
+ETHERSCAN_API_TIER = "free"  # API key tier, sets the rate limit (free, standard, advanced, professional)
+TRANSACTION_COUNT = 100  # Adjust the number of transactions to fetch
+TRANSACTION_PAGE_SIZE = 1000  # Transactions requested per txlist call when walking the full history
+THRESHOLD_ETH = 10  # Set threshold for large transactions in ETH
+REORG_DEPTH = 12  # Recent blocks dropped and fetched again on every sync in case they were reorganised
+FREQUENT_TX_WINDOW = 10 * 60  # Sliding window, in seconds, for the transaction frequency rule
+FREQUENT_TX_THRESHOLD = 10  # More transactions than this within one window is excessive activity
+DIVERSITY_THRESHOLD = 100  # More unique counterparties than this is flagged as transaction diversity
+REPETITION_THRESHOLD = 10  # More interactions with one address than this is flagged as repetitive
+BALANCEMULTI_BATCH_SIZE = 20  # Etherscan accepts at most 20 addresses per balancemulti call
+BATCH_CONCURRENCY = 10  # Wallets whose transactions are fetched at the same time in batch mode
+ADDRESS_PATTERN = re.compile(r"0x[0-9a-fA-F]{40}")  # A wallet address as accepted in address lists
+
+# Web3 connection to the Infura node, created on first use because importing web3 alone takes over a second
+_web3 = None
+
+def get_web3():
+    global _web3
+    if _web3 is None:
+        from web3 import Web3
+        _web3 = Web3(Web3.HTTPProvider(INFURA_URL))
+    return _web3
+
+# Every kind of suspicious activity reported by the detectors, in display order
+ACTIVITY_TYPES = [
+    "Blacklisted Address",
+    "Self Transaction",
+    "Failed Transaction",
+    "High Gas Fee",
+    "Frequent Transaction",
+    "High Spend with Low Balance",
+    "Large Transaction",
+    "Large Transaction for New Wallet",
+    "Transaction Diversity",
+    "Repetitive Transactions"
+]
+
+# Example of a set of blacklisted addresses
+BLACKLISTED_ADDRESSES = {
+    "0x0000000000000000000000000000000000000000",
+    "0x1111111111111111111111111111111111111111"
+}
+
+# Screening list compiled with blacklist.py, reloaded when the file changes. The addresses above are always included.
+blacklist = get_blacklist(extra_addresses=BLACKLISTED_ADDRESSES)
+
+# Shared Etherscan client, its connection pool and rate limiter are reused by every scan
+etherscan = get_client(ETHERSCAN_API_KEY, tier=ETHERSCAN_API_TIER)
+
+# Function to fetch wallet balance from Etherscan, None if it could not be fetched
+async def get_balance_async(wallet_address):
+    with timed("get_balance"):
+        data = await etherscan.get_balance(wallet_address)
+    if data["status"] == "1":
+        return int(data["result"]) / (10 ** 18)  # Convert from Wei to Ether
+    else:
+        print(f"Error fetching balance from Etherscan: {data['message']}")
+        return None
+
+def get_balance(wallet_address):
+    return run_sync(get_balance_async(wallet_address))
+
+# Function to fetch the latest block number, used to key cached scans
+async def get_latest_block_async():
+    data = await etherscan.get_block_number()
+    try:
+        return int(data["result"], 16)
+    except (KeyError, TypeError, ValueError):
+        print(f"Error fetching latest block from Etherscan: {data.get('message', data.get('result'))}")
+        return None
+
+def get_latest_block():
+    return run_sync(get_latest_block_async())
+
+# Function to fetch the latest block number from the Infura node, falling back to Etherscan
+def get_chain_head():
+    try:
+        return get_web3().eth.block_number
+    except Exception as e:
+        print(f"Error fetching latest block from Infura, using Etherscan: {e}")
+        return get_latest_block()
+
+# Function to fetch the balances of many wallets, 20 addresses per balancemulti call.
+# Wallets whose balance could not be fetched get None, never a made-up balance of 0.
+async def get_balances_async(wallet_addresses):
+    chunks = [wallet_addresses[i:i + BALANCEMULTI_BATCH_SIZE] for i in range(0, len(wallet_addresses), BALANCEMULTI_BATCH_SIZE)]
+    responses = await asyncio.gather(*(etherscan.get_balances(chunk) for chunk in chunks))
+    balances = {}
+    for data in responses:
+        if data["status"] == "1":
+            for entry in data["result"]:
+                balances[entry["account"].lower()] = int(entry["balance"]) / (10 ** 18)  # Convert from Wei to Ether
+        else:
+            print(f"Error fetching balances from Etherscan: {data['message']}")
+    return [balances.get(address.lower()) for address in wallet_addresses]
+
+def get_balances(wallet_addresses):
+    return run_sync(get_balances_async(wallet_addresses))
+
+# Raised by the history walks when a txlist page could not be fetched, so a failed request is not taken for the end of the history
+class TransactionFetchError(Exception):
+    pass
+
+# Function to fetch a single txlist page from Etherscan, None if the request failed.
+# Etherscan answers a range without transactions with status 0 and an empty list, that is an empty page.
+async def fetch_transaction_page_async(wallet_address, startblock=0, endblock=99999999, page=1, offset=TRANSACTION_PAGE_SIZE, sort="desc"):
+    data = await etherscan.get_transactions(wallet_address, startblock, endblock, page, offset, sort)
+    if data["status"] == "1" or data["result"] == []:
+        return data["result"]
+    else:
+        print(f"Error fetching transactions from Etherscan: {data['message']}")
+        return None
+
+def fetch_transaction_page(wallet_address, startblock=0, endblock=99999999, page=1, offset=TRANSACTION_PAGE_SIZE, sort="desc"):
+    return run_sync(fetch_transaction_page_async(wallet_address, startblock, endblock, page, offset, sort))
+
+# Work out where the txlist page after `batch` starts, or None once the history is exhausted.
+# Etherscan caps page * offset at 10,000 results, so instead of paging deeper we move the block
+# cursor to the last block seen and skip the transactions of that block that were already yielded.
+def next_page_cursor(batch, startblock, endblock, page, page_size, seen_hashes, sort):
+    if len(batch) < page_size:
+        return None
+
+    cursor = startblock if sort == "asc" else endblock
+    boundary_block = int(batch[-1]["blockNumber"])
+    boundary_hashes = {tx["hash"] for tx in batch if int(tx["blockNumber"]) == boundary_block}
+    if boundary_block == cursor:
+        # The whole page belongs to the cursor block, read the next page of that block
+        return startblock, endblock, page + 1, seen_hashes | boundary_hashes
+    if sort == "asc":
+        return boundary_block, endblock, 1, boundary_hashes
+    return startblock, boundary_block, 1, boundary_hashes
+
+# Generator walking the whole transaction history, yielding transactions page by page as they arrive
+def iter_transactions(wallet_address, startblock=0, endblock=99999999, page_size=TRANSACTION_PAGE_SIZE, sort="asc"):
+    cursor = (startblock, endblock, 1, set())
+    while cursor is not None and cursor[0] <= cursor[1]:
+        startblock, endblock, page, seen_hashes = cursor
+        batch = fetch_transaction_page(wallet_address, startblock, endblock, page, page_size, sort)
+        if batch is None:
+            raise TransactionFetchError(f"txlist page {page} of blocks {startblock}-{endblock} failed")
+        for tx in batch:
+            if tx["hash"] not in seen_hashes:
+                yield tx
+        cursor = next_page_cursor(batch, startblock, endblock, page, page_size, seen_hashes, sort)
+
+# Async counterpart of iter_transactions, lets several wallets be walked at the same time
+async def aiter_transactions(wallet_address, startblock=0, endblock=99999999, page_size=TRANSACTION_PAGE_SIZE, sort="asc"):
+    cursor = (startblock, endblock, 1, set())
+    while cursor is not None and cursor[0] <= cursor[1]:
+        startblock, endblock, page, seen_hashes = cursor
+        batch = await fetch_transaction_page_async(wallet_address, startblock, endblock, page, page_size, sort)
+        if batch is None:
+            raise TransactionFetchError(f"txlist page {page} of blocks {startblock}-{endblock} failed")
+        for tx in batch:
+            if tx["hash"] not in seen_hashes:
+                yield tx
+        cursor = next_page_cursor(batch, startblock, endblock, page, page_size, seen_hashes, sort)
+
+# Function to fetch recent transactions from Etherscan
+async def fetch_recent_transactions_async(wallet_address, count=10):
+    transactions = []
+    with timed("fetch_recent_transactions"):
+        try:
+            async for tx in aiter_transactions(wallet_address, page_size=min(count, TRANSACTION_PAGE_SIZE), sort="desc"):
+                transactions.append(tx)
+                if len(transactions) >= count:
+                    break
+        except TransactionFetchError as e:
+            print(f"Error fetching recent transactions of {wallet_address}: {e}")
+    return transactions  # Return the top `count` transactions
+
+def fetch_recent_transactions(wallet_address, count=10):
+    return run_sync(fetch_recent_transactions_async(wallet_address, count))
+
+# Function to bring the local store of a wallet up to date, fetching only blocks after the last sync.
+# The last `reorg_depth` blocks are fetched again in case they were reorganised; the first page fetched replaces
+# them in one store transaction. If a page cannot be fetched the sync stops there and the wallet's sync state
+# is left alone, so the next sync fetches the same blocks again and nothing stored is lost or reported twice.
+# `on_new_transactions` receives batches of transactions that were not stored before.
+# The sync reads up to `endblock`, the chain head (looked up when not given), and records the wallet as synced
+# up to there, so the next sync does not fetch the wallet's last transaction again. Returns that block, None if the sync failed.
+async def sync_wallet_async(store, wallet_address, reorg_depth=REORG_DEPTH, on_new_transactions=None, endblock=None):
+    last_block = store.last_synced_block(wallet_address)
+    startblock = 0 if last_block is None else max(0, last_block + 1 - reorg_depth)
+    if endblock is None:
+        endblock = await get_latest_block_async()
+    if endblock is not None and last_block is not None:
+        endblock = max(endblock, last_block)  # A head behind the last sync, e.g. from a lagging Etherscan, never moves it back
+    known_hashes = store.hashes_from_block(wallet_address, startblock) if on_new_transactions else set()
+    rollup_since = None
+    replaced = False
+
+    def flush(batch):
+        nonlocal rollup_since, replaced
+        with timed("store_write"):
+            if replaced:
+                store.add_transactions(wallet_address, batch)
+            else:
+                rollup_since = store.replace_from_block(wallet_address, startblock, batch)
+                replaced = True
+        if batch:
+            earliest = min(int(tx["timeStamp"]) for tx in batch)
+            rollup_since = earliest if rollup_since is None else min(rollup_since, earliest)
+        new_transactions = [tx for tx in batch if tx["hash"] not in known_hashes]
+        if on_new_transactions and new_transactions:
+            on_new_transactions(new_transactions)
+
+    highest_block = last_block
+    batch = []
+    complete = True
+    try:
+        async for tx in aiter_transactions(wallet_address, startblock=startblock, endblock=99999999 if endblock is None else endblock, sort="asc"):
+            batch.append(tx)
+            if len(batch) >= TRANSACTION_PAGE_SIZE:
+                flush(batch)
+                batch = []
+            highest_block = max(highest_block or 0, int(tx["blockNumber"]))
+        flush(batch)
+    except TransactionFetchError as e:
+        print(f"Error syncing {wallet_address}, its sync state is left as it was: {e}")
+        complete = False
+
+    if rollup_since is not None:
+        with timed("rollup_refresh"):
+            store.refresh_rollups(wallet_address, rollup_since)
+    if not complete:
+        return None
+    # Without a head the sync only knows it covered the wallet's last transaction
+    synced_block = highest_block if endblock is None else max(endblock, highest_block or 0)
+    if synced_block is not None:
+        store.set_synced_block(wallet_address, synced_block)
+    return synced_block
+
+def sync_wallet(store, wallet_address, reorg_depth=REORG_DEPTH, on_new_transactions=None, endblock=None):
+    return run_sync(sync_wallet_async(store, wallet_address, reorg_depth, on_new_transactions, endblock))
+
+# Function to find when a wallet was created, i.e. the timestamp of its first transaction, cached in the store for good.
+# A synced wallet has its whole history stored already; otherwise one ascending txlist call with offset=1 returns just
+# the first transaction. Returns None for a wallet without transactions, such a wallet is not treated as new.
+async def get_wallet_creation_date_async(wallet_address, store=None):
+    store = store or get_store()
+    creation_date = store.wallet_creation_date(wallet_address)
+    if creation_date is not None:
+        return creation_date
+    if store.last_synced_block(wallet_address) is not None:
+        creation_date = store.first_transaction_time(wallet_address)
+    else:
+        with timed("wallet_creation_date"):
+            first_transactions = await fetch_transaction_page_async(wallet_address, page=1, offset=1, sort="asc")
+        creation_date = int(first_transactions[0]["timeStamp"]) if first_transactions else None
+    if creation_date is not None:
+        store.set_wallet_creation_date(wallet_address, creation_date)
+    return creation_date
+
+def get_wallet_creation_date(wallet_address, store=None):
+    return run_sync(get_wallet_creation_date_async(wallet_address, store))
+
+# Full-history syncs running in the background, one per wallet
+_backfills = {}
+
+# Function to sync the whole history of a wallet in the background, unless that is already under way.
+# Must be called on the client loop.
+def start_backfill(store, wallet_address, endblock=None):
+    key = wallet_address.lower()
+    if key not in _backfills or _backfills[key].done():
+        _backfills[key] = asyncio.ensure_future(sync_wallet_async(store, wallet_address, endblock=endblock))
+    return _backfills[key]
+
+# Function to read the `count` most recent transactions of a wallet. A synced wallet is brought up to date
+# incrementally and read from the store. A wallet that was never synced costs a single desc txlist page
+# instead of a walk through its whole history; with `backfill` that history is then synced in the background.
+async def load_recent_transactions_async(store, wallet_address, count, backfill=False, endblock=None):
+    if store.last_synced_block(wallet_address) is not None:
+        await sync_wallet_async(store, wallet_address, endblock=endblock)
+        return store.recent_transactions(wallet_address, count)
+    transactions = await fetch_recent_transactions_async(wallet_address, count)
+    if backfill:
+        start_backfill(store, wallet_address, endblock)
+    return transactions
+
+# Function to fetch the balance and the most recent transactions of a wallet concurrently.
+# The first view of a wallet is served from one txlist page while its history is synced in the background.
+async def fetch_wallet_data_async(wallet_address, count=10, endblock=None):
+    store = get_store()
+    return await asyncio.gather(get_balance_async(wallet_address),
+                                load_recent_transactions_async(store, wallet_address, count, backfill=True, endblock=endblock))
+
+def fetch_wallet_data(wallet_address, count=10, endblock=None):
+    return run_sync(fetch_wallet_data_async(wallet_address, count, endblock))
+
+# Normalize txlist transactions into a typed columnar frame, parsed exactly once per scan and shared by
+# detection, the transactions table and every chart. Accepts a list or a stream of transactions.
+# Amounts are converted with Python ints, so Ether values are exact and `value_wei` keeps the full uint256.
+@timed("build_frame")
+def build_transaction_frame(transactions):
+    import pandas as pd
+    hashes, blocks, times, from_addresses, to_addresses = [], [], [], [], []
+    values_wei, values, gas_prices, gas_used, gas_fees, errors = [], [], [], [], [], []
+    for tx in transactions:
+        value_wei = int(tx["value"])
+        gas_price_wei = int(tx["gasPrice"])
+        hashes.append(tx["hash"])
+        blocks.append(int(tx["blockNumber"]))
+        times.append(int(tx["timeStamp"]))
+        from_addresses.append(sys.intern(tx["from"].lower()))
+        to_addresses.append(sys.intern(tx["to"].lower()) if tx["to"] else None)
+        values_wei.append(value_wei)
+        values.append(value_wei / (10 ** 18))
+        gas_prices.append(gas_price_wei / (10 ** 18))
+        gas_used.append(int(tx["gasUsed"]) if "gasUsed" in tx else 0)
+        gas_fees.append(int(tx["gasUsed"]) * gas_price_wei / (10 ** 18) if "gasUsed" in tx else 0)
+        errors.append(tx["isError"] == "1")
+
+    return pd.DataFrame({
+        "hash": pd.Series(hashes, dtype=object),
+        "block_number": np.array(blocks, dtype=np.int64),
+        "time": pd.to_datetime(np.array(times, dtype=np.int64), unit='s'),
+        "from": pd.Series(from_addresses, dtype=object),
+        "to": pd.Series(to_addresses, dtype=object),
+        "value_wei": pd.Series(values_wei, dtype=object),
+        "value": np.array(values, dtype=np.float64),
+        "gas_price": np.array(gas_prices, dtype=np.float64),
+        "gas_used": np.array(gas_used, dtype=np.int64),
+        "gas_fee": np.array(gas_fees, dtype=np.float64),
+        "is_error": np.array(errors, dtype=bool)
+    })
+
+# Columnar counterpart of build_transaction_frame, for the byte columns pool workers receive (see pool.py).
+# Integers are parsed by numpy, amounts still with Python ints, so both functions build the same frame.
+@timed("build_frame")
+def build_column_frame(columns):
+    import pandas as pd
+    values_wei = [int(value) for value in columns["value"].tolist()]
+    gas_prices_wei = [int(gas_price) for gas_price in columns["gasPrice"].tolist()]
+    gas_used = np.where(columns["gasUsed"] == b"", b"0", columns["gasUsed"]).astype(np.int64)
+
+    return pd.DataFrame({
+        "hash": pd.Series(columns["hash"].astype(str).tolist(), dtype=object),
+        "block_number": columns["blockNumber"].astype(np.int64),
+        "time": pd.to_datetime(columns["timeStamp"].astype(np.int64), unit='s'),
+        "from": pd.Series([sys.intern(address.decode().lower()) for address in columns["from"].tolist()], dtype=object),
+        "to": pd.Series([sys.intern(address.decode().lower()) if address else None for address in columns["to"].tolist()], dtype=object),
+        "value_wei": pd.Series(values_wei, dtype=object),
+        "value": np.array([value / (10 ** 18) for value in values_wei], dtype=np.float64),
+        "gas_price": np.array([gas_price / (10 ** 18) for gas_price in gas_prices_wei], dtype=np.float64),
+        "gas_used": gas_used,
+        "gas_fee": np.array([used * gas_price / (10 ** 18) for used, gas_price in zip(gas_used.tolist(), gas_prices_wei)], dtype=np.float64),
+        "is_error": columns["isError"] == b"1"
+    })
+
+FREQUENT_TX_DETAILS = f"More than {FREQUENT_TX_THRESHOLD} transactions within {FREQUENT_TX_WINDOW // 60} minutes"
+
+# Mark every transaction that belongs to a burst, i.e. a window of FREQUENT_TX_WINDOW seconds holding more than
+# FREQUENT_TX_THRESHOLD transactions. Timestamps are sorted once and the start of the window ending at each
+# transaction is found with searchsorted; a difference array then marks all transactions covered by a burst.
+def detect_frequent_transactions(timestamps, window=FREQUENT_TX_WINDOW, threshold=FREQUENT_TX_THRESHOLD):
+    order = np.argsort(timestamps, kind="stable")
+    sorted_timestamps = timestamps[order]
+    window_starts = np.searchsorted(sorted_timestamps, sorted_timestamps - window, side="right")
+    is_burst_end = np.arange(len(sorted_timestamps)) - window_starts + 1 > threshold
+
+    marks = np.zeros(len(sorted_timestamps) + 1, dtype=np.int64)
+    np.add.at(marks, window_starts[is_burst_end], 1)
+    np.add.at(marks, np.flatnonzero(is_burst_end) + 1, -1)
+    in_burst = np.empty(len(sorted_timestamps), dtype=bool)
+    in_burst[order] = np.cumsum(marks[:-1]) > 0
+    return in_burst
+
+# Function to load the hourly or daily rollups of a wallet as a frame, one row per bucket with activity
+def load_rollups(wallet_address, resolution, store=None):
+    import pandas as pd
+    rows = (store or get_store()).rollups(wallet_address, resolution)
+    rollups = pd.DataFrame(rows, columns=["time", "tx_count", "value", "gas_fee", "failures"])
+    rollups["time"] = pd.to_datetime(rollups["time"].astype(np.int64), unit="s")
+    return rollups
+
+# Function to detect suspicious activity in transactions.
+# Every rule is a boolean mask over the transaction frame; findings are emitted in the same
+# order as a per-transaction loop would, i.e. by transaction and then by rule.
+# With `use_sketches` the diversity and repetition rules run on fixed-size sketches (see sketches.py)
+# instead of exact per-address counts.
+@timed("detect_suspicious_activity")
+def detect_suspicious_activity(transactions, wallet_creation_date, wallet_balance, threshold=THRESHOLD_ETH, use_sketches=False):
+    import pandas as pd
+    frame = transactions if isinstance(transactions, pd.DataFrame) else build_transaction_frame(transactions)
+    suspicious_transactions = []
+    activity_counts = dict.fromkeys(ACTIVITY_TYPES, 0)
+
+    hashes = frame["hash"].to_numpy()
+    from_addresses = frame["from"]
+    to_addresses = frame["to"]
+    values = frame["value"].to_numpy()
+    gas_fees = frame["gas_fee"].to_numpy()
+    is_new_wallet = wallet_creation_date is not None and wallet_creation_date >= time.time() - 30 * 24 * 60 * 60
+
+    # Check for suspicious patterns
+    is_blacklisted = blacklist.screen(to_addresses) | blacklist.screen(from_addresses)
+    is_self_transaction = (from_addresses == to_addresses).to_numpy()
+    is_failed_transaction = frame["is_error"].to_numpy()
+    is_high_fee = gas_fees > (values * 0.05)  # Fee > 5% of value
+    is_frequent_tx = detect_frequent_transactions(frame["time"].to_numpy().astype("datetime64[s]").astype(np.int64))  # Excessive transactions in a short time
+    is_low_balance = wallet_balance is not None and wallet_balance < 0.1  # A balance that could not be fetched is never low
+    is_low_balance_high_spend = is_low_balance & (values > (wallet_balance or 0) * 0.5)  # High spend with low balance
+    is_large_transaction = values >= threshold
+    is_new_wallet_large_tx = is_large_transaction & is_new_wallet  # Large TX for new wallets
+
+    # Details are formatted only for flagged transactions
+    blacklist_addresses = to_addresses.where(to_addresses.notna(), from_addresses).to_numpy()
+    to_values = to_addresses.to_numpy()
+    rules = [
+        ("Blacklisted Address", is_blacklisted, lambda idx: [f"Address: {address}" for address in blacklist_addresses[idx]]),
+        ("Self Transaction", is_self_transaction, lambda idx: to_values[idx].tolist()),
+        ("Failed Transaction", is_failed_transaction, lambda idx: ["Transaction failed"] * len(idx)),
+        ("High Gas Fee", is_high_fee, lambda idx: [f"Fee: {fee:.4f} ETH" for fee in gas_fees[idx].tolist()]),
+        ("Frequent Transaction", is_frequent_tx, lambda idx: [FREQUENT_TX_DETAILS] * len(idx)),
+        ("High Spend with Low Balance", is_low_balance_high_spend, lambda idx: [f"Value: {value:.4f} ETH" for value in values[idx].tolist()]),
+        ("Large Transaction", is_large_transaction, lambda idx: [f"Value: {value:.4f} ETH" for value in values[idx].tolist()]),
+        ("Large Transaction for New Wallet", is_new_wallet_large_tx, lambda idx: [f"Value: {value:.4f} ETH" for value in values[idx].tolist()])
+    ]
+
+    # Add suspicious transaction details, ordered by transaction first and rule second
+    findings = []
+    rule_ids = []
+    tx_indices = []
+    for rule_id, (issue, mask, details) in enumerate(rules):
+        idx = np.flatnonzero(mask)
+        findings.extend({"issue": issue, "details": detail, "tx_hash": tx_hash} for detail, tx_hash in zip(details(idx), hashes[idx].tolist()))
+        activity_counts[issue] += len(idx)
+        rule_ids.append(np.full(len(idx), rule_id))
+        tx_indices.append(idx)
+    order = np.lexsort((np.concatenate(rule_ids), np.concatenate(tx_indices)))
+    suspicious_transactions.extend(findings[i] for i in order.tolist())
+
+    if use_sketches:
+        distinct_addresses = HyperLogLog()
+        address_counts = SpaceSaving()
+        for address in to_addresses.dropna().tolist():
+            distinct_addresses.add(address)
+            address_counts.add(address)
+        unique_address_count = distinct_addresses.estimate()
+        repeated_addresses = address_counts.heavy_hitters(REPETITION_THRESHOLD)
+    else:
+        unique_address_count = to_addresses.nunique()
+        repeated_addresses = to_addresses.groupby(to_addresses, sort=False).size()
+        repeated_addresses = repeated_addresses[repeated_addresses > REPETITION_THRESHOLD].items()
+
+    # Check for transaction diversity (too many unique addresses)
+    if unique_address_count > DIVERSITY_THRESHOLD:
+        suspicious_transactions.append({"issue": "Transaction Diversity", "details": f"Interacted with {unique_address_count} unique addresses"})
+        activity_counts["Transaction Diversity"] += 1
+
+    # Check for repetitive patterns (too many interactions with the same address)
+    for address, count in repeated_addresses:
+        suspicious_transactions.append({"issue": "Repetitive Transactions", "details": f"Repeated interactions with {address} ({count} times)"})
+        activity_counts["Repetitive Transactions"] += 1
+
+    return suspicious_transactions, activity_counts
+
+# Per-wallet detection state updated one transaction at a time, for wallets that are watched continuously.
+# Running counters replace the whole-list rules, so adding a transaction costs O(1) and returns only the
+# findings it newly triggers. The state serializes to a plain dict so it can be persisted between runs.
+# With `use_sketches` the per-address counts are replaced by fixed-size sketches, so the memory of a
+# wallet stays bounded however many counterparties it has. Until a balance is set the "High Spend with Low
+# Balance" rule is skipped, so a state rebuilt from stored history does not judge old spends by a balance of 0.
+class WalletDetectorState:
+    def __init__(self, wallet_address, wallet_creation_date, wallet_balance=None, threshold=THRESHOLD_ETH, use_sketches=False):
+        self.wallet_address = wallet_address.lower()
+        self.wallet_creation_date = wallet_creation_date
+        self.wallet_balance = wallet_balance
+        self.threshold = threshold
+        self.use_sketches = use_sketches
+        self.transaction_count = 0
+        self.address_counts = SpaceSaving() if use_sketches else {}  # Interactions per destination address
+        self.distinct_addresses = HyperLogLog() if use_sketches else None
+        # Addresses already reported as repetitive. A sketch count starts over when an address is evicted
+        # and comes back, so it can cross the threshold more than once.
+        self.repetition_flagged = BloomFilter() if use_sketches else None
+        self.recent_transactions = deque()  # [timestamp, tx hash, flagged] inside the frequency window
+        self.diversity_flagged = False
+        self.activity_counts = dict.fromkeys(ACTIVITY_TYPES, 0)
+
+    def add_transaction(self, tx):
+        findings = []
+
+        def flag(issue, details, tx_hash=None):
+            finding = {"issue": issue, "details": details}
+            if tx_hash:
+                finding["tx_hash"] = tx_hash
+            findings.append(finding)
+            self.activity_counts[issue] += 1
+
+        value_in_ether = int(tx["value"]) / (10 ** 18)
+        gas_fee_in_ether = int(tx["gasUsed"]) * int(tx["gasPrice"]) / (10 ** 18) if "gasUsed" in tx else 0
+        to_address = tx["to"].lower() if tx["to"] else None
+        from_address = tx["from"].lower()
+        self.transaction_count += 1
+        if self.wallet_creation_date is None:
+            self.wallet_creation_date = int(tx["timeStamp"])  # The state sees the history from the start, its first transaction dates the wallet
+
+        if to_address in blacklist or from_address in blacklist:
+            flag("Blacklisted Address", f"Address: {to_address or from_address}", tx["hash"])
+        if from_address == to_address:
+            flag("Self Transaction", to_address, tx["hash"])
+        if tx["isError"] == "1":
+            flag("Failed Transaction", "Transaction failed", tx["hash"])
+        if gas_fee_in_ether > value_in_ether * 0.05:
+            flag("High Gas Fee", f"Fee: {gas_fee_in_ether:.4f} ETH", tx["hash"])
+        for tx_hash in self._update_frequency_window(int(tx["timeStamp"]), tx["hash"]):
+            flag("Frequent Transaction", FREQUENT_TX_DETAILS, tx_hash)
+        if self.wallet_balance is not None and self.wallet_balance < 0.1 and value_in_ether > self.wallet_balance * 0.5:
+            flag("High Spend with Low Balance", f"Value: {value_in_ether:.4f} ETH", tx["hash"])
+        if value_in_ether >= self.threshold:
+            flag("Large Transaction", f"Value: {value_in_ether:.4f} ETH", tx["hash"])
+            if self.wallet_creation_date >= time.time() - 30 * 24 * 60 * 60:
+                flag("Large Transaction for New Wallet", f"Value: {value_in_ether:.4f} ETH", tx["hash"])
+
+        if to_address:
+            if self.use_sketches:
+                count = self.address_counts.add(to_address)
+                self.distinct_addresses.add(to_address)
+                unique_address_count = self.distinct_addresses.estimate()
+                is_repetitive = count > REPETITION_THRESHOLD and to_address not in self.repetition_flagged
+                if is_repetitive:
+                    self.repetition_flagged.add(to_address)
+            else:
+                count = self.address_counts.get(to_address, 0) + 1
+                self.address_counts[to_address] = count
+                unique_address_count = len(self.address_counts)
+                is_repetitive = count == REPETITION_THRESHOLD + 1
+            if is_repetitive:
+                flag("Repetitive Transactions", f"Repeated interactions with {to_address} ({count} times)")
+            if unique_address_count > DIVERSITY_THRESHOLD and not self.diversity_flagged:
+                self.diversity_flagged = True
+                flag("Transaction Diversity", f"Interacted with {unique_address_count} unique addresses")
+        return findings
+
+    # Slide the frequency window to the new transaction and return the hashes that a burst newly covers.
+    # Transactions are expected in time order; a late one is inserted at its place in the window.
+    def _update_frequency_window(self, timestamp, tx_hash):
+        window = self.recent_transactions
+        if window and timestamp < window[-1][0]:
+            position = bisect.bisect_right([entry[0] for entry in window], timestamp)
+            window.insert(position, [timestamp, tx_hash, False])
+        else:
+            window.append([timestamp, tx_hash, False])
+        newest = window[-1][0]
+        while window and window[0][0] <= newest - FREQUENT_TX_WINDOW:
+            window.popleft()
+        if len(window) <= FREQUENT_TX_THRESHOLD:
+            return []
+        newly_flagged = [entry for entry in window if not entry[2]]
+        for entry in newly_flagged:
+            entry[2] = True
+        return [entry[1] for entry in newly_flagged]
+
+    def add_transactions(self, transactions):
+        findings = []
+        for tx in transactions:
+            findings.extend(self.add_transaction(tx))
+        return findings
+
+    def to_dict(self):
+        return {
+            "wallet_address": self.wallet_address,
+            "wallet_creation_date": self.wallet_creation_date,
+            "wallet_balance": self.wallet_balance,
+            "threshold": self.threshold,
+            "use_sketches": self.use_sketches,
+            "transaction_count": self.transaction_count,
+            "address_counts": self.address_counts.to_dict() if self.use_sketches else self.address_counts,
+            "distinct_addresses": self.distinct_addresses.to_dict() if self.use_sketches else None,
+            "repetition_flagged": self.repetition_flagged.to_dict() if self.use_sketches else None,
+            "recent_transactions": list(self.recent_transactions),
+            "diversity_flagged": self.diversity_flagged,
+            "activity_counts": self.activity_counts
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        use_sketches = data.get("use_sketches", False)
+        state = cls(data["wallet_address"], data["wallet_creation_date"], data["wallet_balance"], data["threshold"], use_sketches)
+        state.transaction_count = data["transaction_count"]
+        if use_sketches:
+            state.address_counts = SpaceSaving.from_dict(data["address_counts"])
+            state.distinct_addresses = HyperLogLog.from_dict(data["distinct_addresses"])
+            if data.get("repetition_flagged"):
+                state.repetition_flagged = BloomFilter.from_dict(data["repetition_flagged"])
+        else:
+            state.address_counts = data["address_counts"]
+        state.recent_transactions = deque(data["recent_transactions"])
+        state.diversity_flagged = data["diversity_flagged"]
+        state.activity_counts.update(data["activity_counts"])
+        return state
+
+def generate_detailed_security_summary(activity_counts, suspicious_activities):
+    summary = []
+    
+    # Security Risk Levels
+    def risk_level(count, activity_type):
+        if count > 0:
+            if activity_type in ["Large Transaction", "Failed Transaction", "High Spend with Low Balance"]:
+                return "High Risk"
+            elif activity_type in ["Frequent Transaction", "Repetitive Transactions", "Transaction Diversity"]:
+                return "Medium Risk"
+            else:
+                return "Low Risk"
+        return "No Issues"
+
+    # Security Overview
+    summary.append("### Security Overview:")
+    
+    # 1. Blacklisted Address
+    if activity_counts["Blacklisted Address"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Blacklisted Address'], 'Blacklisted Address')}**: "
+                       "This wallet has interacted with one or more blacklisted addresses. "
+                       "Blacklisted addresses are typically associated with fraudulent or suspicious activities, "
+                       "such as money laundering or scam operations. It is highly advised not to send funds to this wallet if it has interacted with any blacklisted addresses.")
+    
+    # 2. Self Transactions
+    if activity_counts["Self Transaction"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Self Transaction'], 'Self Transaction')}**: "
+                       "There have been self-transactions detected in the wallet. "
+                       "Self-transactions often point to attempts to hide the true source or destination of funds, or they might be used to obfuscate the wallet's activity trail. "
+                       "These transactions can indicate potential laundering behavior or other illicit activities. Review the transactions carefully for unusual patterns.")
+    
+    # 3. Failed Transactions
+    if activity_counts["Failed Transaction"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Failed Transaction'], 'Failed Transaction')}**: "
+                       "There are failed transactions associated with this wallet. "
+                       "While occasional failures can occur due to network issues, persistent failures can indicate problems with the wallet's security, "
+                       "incorrect contract interaction, or deliberate attempts to disrupt transaction history. Consider verifying the wallet's health and connection status.")
+    
+    # 4. High Gas Fee
+    if activity_counts["High Gas Fee"] > 0:
+        summary.append(f"**{risk_level(activity_counts['High Gas Fee'], 'High Gas Fee')}**: "
+                       "Certain transactions have been executed with disproportionately high gas fees (greater than 5% of the transaction value). "
+                       "This can be a sign of either an intentional attempt to drain funds with high costs or errors in contract interaction. "
+                       "It is recommended to monitor future gas fees closely and avoid engaging in transactions with excessively high fees.")
+    
+    # 5. Frequent Transactions
+    if activity_counts["Frequent Transaction"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Frequent Transaction'], 'Frequent Transaction')}**: "
+                       "This wallet has made a high frequency of transactions within a short period. "
+                       "Frequent transactions might indicate an automated system or bot operating the wallet, which could be a sign of fraudulent activities like phishing, or other malicious use cases. "
+                       "Carefully evaluate the nature of each transaction to determine if this is suspicious or abnormal activity.")
+    
+    # 6. High Spend with Low Balance
+    if activity_counts["High Spend with Low Balance"] > 0:
+        summary.append(f"**{risk_level(activity_counts['High Spend with Low Balance'], 'High Spend with Low Balance')}**: "
+                       "The wallet is spending a large portion of its balance despite having a relatively low overall balance. "
+                       "This could indicate reckless spending behavior or, in some cases, attempts to drain the wallet’s funds rapidly. "
+                       "If you are the owner or a potential counterparty, consider re-evaluating the wallet's current financial stability and assess any pending transactions.")
+    
+    # 7. Large Transactions
+    if activity_counts["Large Transaction"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Large Transaction'], 'Large Transaction')}**: "
+                       "This wallet has been involved in transactions of unusually large amounts. "
+                       "Large transfers often indicate high-value transfers that could be linked to illicit activities, including large-scale fraud or asset concealment. "
+                       "If you are considering interacting with this wallet, exercise extra caution, verify the source of funds, and assess the legitimacy of the transaction.")
+    
+    # 8. Large Transaction for New Wallet
+    if activity_counts["Large Transaction for New Wallet"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Large Transaction for New Wallet'], 'Large Transaction for New Wallet')}**: "
+                       "A large transaction was detected soon after the wallet was created. "
+                       "New wallets making large transactions could be an indication of suspicious behavior or attempts to quickly launder funds. "
+                       "This behavior warrants a higher level of scrutiny before interacting with this wallet.")
+    
+    # 9. Transaction Diversity
+    if activity_counts["Transaction Diversity"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Transaction Diversity'], 'Transaction Diversity')}**: "
+                       "This wallet has interacted with an unusually large number of unique addresses. "
+                       "While diversification in transaction partners can be normal, this could also suggest an attempt to obfuscate the wallet’s activities or involve it in diverse operations that could be illicit. "
+                       "Investigating the pattern of address interactions is recommended.")
+    
+    # 10. Repetitive Transactions
+    if activity_counts["Repetitive Transactions"] > 0:
+        summary.append(f"**{risk_level(activity_counts['Repetitive Transactions'], 'Repetitive Transactions')}**: "
+                       "The wallet has made multiple repetitive transactions with the same address. "
+                       "Repeated interactions could suggest a controlled operation or targeted manipulation of the wallet, potentially for fraudulent activities. "
+                       "Check the recipient addresses for known suspicious or untrustworthy entities.")
+
+    # Recommendations for Interaction
+    summary.append("\n### Recommendations for Interaction:")
+    summary.append("1. **Avoid Interaction with High-Risk Patterns**: Avoid interacting with this wallet if you notice any blacklisted addresses or high-risk behavior, like self-transactions or large/failed transactions.")
+    summary.append("2. **Verify Sources and Destinations**: Confirm the legitimacy of large transactions and verify any involved addresses before sending funds.")
+    summary.append("3. **Monitor Gas Fees**: Keep an eye on gas fees and avoid transactions with excessive costs unless absolutely necessary.")
+    summary.append("4. **Consider Further Investigation**: It is advisable to conduct a more in-depth investigation if you are unsure about the wallet’s legitimacy or transactions.")
+    summary.append("5. **Seek Professional Advice**: If you're dealing with significant amounts of funds, consider consulting a blockchain security expert or using blockchain forensics services.")
+
+    return "\n".join(summary)
+
+# Function to read wallet addresses from a text or CSV file (first column), one per line.
+# Lines that are not an address, such as a CSV header, are skipped with a warning.
+def read_wallet_addresses(lines):
+    wallet_addresses = []
+    seen = set()
+    for line in lines:
+        address = line.split(",")[0].strip()
+        if not address or address.startswith("#") or address.lower() in seen:
+            continue
+        if not ADDRESS_PATTERN.fullmatch(address):
+            print(f"Skipping {address!r}: not a wallet address", file=sys.stderr)
+            continue
+        seen.add(address.lower())
+        wallet_addresses.append(address)
+    return wallet_addresses
+
+# Function to read what the scan of one wallet of a batch needs, the recent transactions and the creation date.
+# Wallets are not backfilled, a batch only ever looks at the most recent `count` transactions.
+async def load_scan_input_async(wallet_address, count=TRANSACTION_COUNT, store=None, endblock=None):
+    store = store or get_store()
+    transactions = await load_recent_transactions_async(store, wallet_address, count, endblock=endblock)
+    return transactions, await get_wallet_creation_date_async(wallet_address, store)
+
+# Function to put together the result of one wallet of a batch
+def scan_result(wallet_address, balance, transaction_count, suspicious_activities, activity_counts):
+    return {
+        'wallet': wallet_address,
+        'balance': balance,
+        'transaction_count': transaction_count,
+        'activity_counts': activity_counts,
+        'suspicious_activities': suspicious_activities
+    }
+
+# Function to scan one wallet of a batch, the balance comes from the batched balancemulti call
+async def scan_wallet_async(wallet_address, balance, count=TRANSACTION_COUNT, endblock=None):
+    transactions, wallet_creation_date = await load_scan_input_async(wallet_address, count, endblock=endblock)
+    suspicious_activities, activity_counts = detect_suspicious_activity(transactions, wallet_creation_date, balance)
+    return scan_result(wallet_address, balance, len(transactions), suspicious_activities, activity_counts)
+
+# Function to scan many wallets, txlist fetches fan out under the client's global rate limit.
+# Results are handed to `on_result` as soon as each wallet finishes so callers can write them out.
+# With a DetectionPool (see pool.py) fetching stays here and detection runs on the pool's worker processes.
+# The chain head is looked up once, every synced wallet is brought up to it.
+async def scan_wallets_async(wallet_addresses, count=TRANSACTION_COUNT, concurrency=BATCH_CONCURRENCY, on_result=None, pool=None):
+    balances, head = await asyncio.gather(get_balances_async(wallet_addresses), get_latest_block_async())
+    semaphore = asyncio.Semaphore(concurrency)
+
+    if pool is not None:
+        async def load(item):
+            wallet_address, balance = item
+            async with semaphore:
+                transactions, wallet_creation_date = await load_scan_input_async(wallet_address, count, endblock=head)
+            return (wallet_address, balance, wallet_creation_date), transactions
+
+        return await pool.scan(list(zip(wallet_addresses, balances)), load, on_result)
+
+    async def scan(wallet_address, balance):
+        async with semaphore:
+            result = await scan_wallet_async(wallet_address, balance, count, head)
+        if on_result:
+            on_result(result)
+        return result
+
+    return await asyncio.gather(*(scan(address, balance) for address, balance in zip(wallet_addresses, balances)))
+
+def scan_wallets(wallet_addresses, count=TRANSACTION_COUNT, concurrency=BATCH_CONCURRENCY, on_result=None, pool=None):
+    return run_sync(scan_wallets_async(wallet_addresses, count, concurrency, on_result, pool))
+
+# Flatten batch results into one row per wallet with its activity counts
+def batch_summary_rows(results):
+    rows = []
+    for result in results:
+        row = {'Wallet': result['wallet'], 'Balance (ETH)': result['balance'], 'Transactions': result['transaction_count']}
+        row.update(result['activity_counts'])
+        row['Total Findings'] = len(result['suspicious_activities'])
+        rows.append(row)
+    return rows
+
+# Write batch results, a CSV of activity counts per wallet or JSON lines with the full findings
+def write_batch_results(results, path):
+    with open(path, "w", newline="") as f:
+        if path.endswith(".csv"):
+            rows = batch_summary_rows(results)
+            if rows:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+# Set up the email credentials
+from_email = 'from email'  # Replace with your Gmail address
+app_password = 'temporary password generated for ur gmail'  # Replace with your generated app password
+to_email = 'email to send report to'  # Replace with the recipient's email address
+# SMTP server, point it at a local debug server (e.g. SMTP_HOST=localhost SMTP_PORT=1025 SMTP_USE_SSL=0) when testing
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.environ.get("SMTP_USE_SSL", "1") == "1"
+
+# Shared alert dispatcher, sends on a background thread over a reused SMTP connection
+def get_alert_dispatcher():
+    return get_dispatcher(SMTP_HOST, SMTP_PORT, from_email, app_password, to_email, SMTP_USE_SSL)
+
+# Function to send the email, queued so the caller never waits on SMTP
+def send_email(subject, body):
+    get_alert_dispatcher().send(subject, body)
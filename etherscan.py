@@ -0,0 +1,209 @@
+import asyncio
+import atexit
+import json
+import os
+import random
+import threading
+import time
+
+import aiohttp
+
+from metrics import metrics
+
+# Base URL of the Etherscan API, override it to point the client at a local stub server
+ETHERSCAN_API_URL = os.environ.get("ETHERSCAN_API_URL", "https://api.etherscan.io/api")
+
+# Calls per second allowed for each Etherscan API key tier
+RATE_LIMITS = {
+    "free": 5,
+    "standard": 10,
+    "advanced": 20,
+    "professional": 30
+}
+
+POOL_SIZE = 20  # Maximum number of open connections to Etherscan
+REQUEST_TIMEOUT = 30  # Seconds before a single request is abandoned
+MAX_RETRIES = 5  # Retries on rate limit and transient network errors
+BACKOFF_BASE = 0.5  # Seconds, doubled on every retry
+BACKOFF_MAX = 8.0  # Upper bound for a single backoff delay
+
+
+# Token bucket shared by every request of a client, so bursts never exceed the key's rate limit
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        # The lock is created lazily so it belongs to the loop that actually runs the requests
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    metrics.increment("wallet_monitor_rate_limit_wait_seconds_total", now - started)
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Full jitter exponential backoff, spreads out retries of concurrent requests
+def backoff_delay(attempt):
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+# Etherscan reports rate limiting as a normal response with status "0"
+def is_rate_limited(data):
+    return data.get("status") == "0" and "rate limit" in str(data.get("result", "")).lower()
+
+
+# Raised by a request attempt that should be tried again, e.g. an error the server reported in the response body.
+# `outcome` labels the failed attempt in the call metrics.
+class RetryableError(Exception):
+    def __init__(self, message, outcome="error"):
+        super().__init__(message)
+        self.outcome = outcome
+
+
+# Read the body of a response, HTTP 429 and 5xx responses are worth trying again
+async def read_body(response):
+    if response.status == 429 or response.status >= 500:
+        raise RetryableError(f"HTTP {response.status}", "http_error")
+    response.raise_for_status()
+    return await response.read()
+
+
+# HTTP client with a pooled keep-alive session and retries with backoff, shared by the Etherscan client and
+# the node client in blocks.py. Clients with an open session are closed when the process exits.
+class PooledClient:
+    def __init__(self, pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+
+    async def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            _open_clients.add(self)
+        return self._session
+
+    # Run `attempt(session)` until it returns, backing off between tries. Network and decoding errors and
+    # RetryableError are retried, `on_failure(outcome)` is called for every failed try. Once the retries
+    # are used up a RetryableError with the last error is raised.
+    async def request(self, attempt, on_failure):
+        error = None
+        for tries in range(MAX_RETRIES + 1):
+            if tries:
+                delay = backoff_delay(tries - 1)
+                metrics.increment("wallet_monitor_backoff_seconds_total", delay)
+                await asyncio.sleep(delay)
+            try:
+                return await attempt(await self.session())
+            except RetryableError as e:
+                error, outcome = str(e), e.outcome
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                error, outcome = str(e) or type(e).__name__, "error"
+            on_failure(outcome)
+        raise RetryableError(error)
+
+    async def close(self):
+        _open_clients.discard(self)
+        if self._session is not None:
+            await self._session.close()
+
+
+# Async Etherscan client with a pooled connection, rate limiting and retries
+class EtherscanClient(PooledClient):
+    def __init__(self, api_key, tier="free", base_url=ETHERSCAN_API_URL, pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        super().__init__(pool_size, timeout)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.limiter = TokenBucket(RATE_LIMITS[tier])
+
+    async def call(self, **params):
+        params["apikey"] = self.api_key
+        action = params.get("action", "")
+
+        async def attempt(session):
+            await self.limiter.acquire()
+            started = time.perf_counter()
+            async with session.get(self.base_url, params=params) as response:
+                body = await read_body(response)
+            decode_started = time.perf_counter()
+            data = json.loads(body)
+            metrics.observe("wallet_monitor_api_decode_seconds", time.perf_counter() - decode_started, action=action)
+            metrics.observe("wallet_monitor_api_request_seconds", time.perf_counter() - started, action=action)
+            metrics.increment("wallet_monitor_payload_bytes_total", len(body), source=f"etherscan:{action}")
+            if is_rate_limited(data):
+                raise RetryableError(data["result"], "rate_limited")
+            metrics.increment("wallet_monitor_api_calls_total", action=action, outcome="ok")
+            return data
+
+        try:
+            return await self.request(attempt, lambda outcome: metrics.increment("wallet_monitor_api_calls_total", action=action, outcome=outcome))
+        except RetryableError as e:
+            return {"status": "0", "message": f"Request failed after {MAX_RETRIES + 1} attempts: {e}", "result": None}
+
+    async def get_balance(self, address):
+        return await self.call(module="account", action="balance", address=address, tag="latest")
+
+    async def get_balances(self, addresses):
+        return await self.call(module="account", action="balancemulti", address=",".join(addresses), tag="latest")
+
+    async def get_transactions(self, address, startblock=0, endblock=99999999, page=1, offset=10, sort="desc"):
+        return await self.call(module="account", action="txlist", address=address, startblock=startblock,
+                               endblock=endblock, page=page, offset=offset, sort=sort)
+
+    async def get_block_number(self):
+        return await self.call(module="proxy", action="eth_blockNumber")
+
+
+_clients = {}
+_open_clients = set()  # Pooled clients of any kind whose session is open
+_loop = None
+_loop_lock = threading.Lock()
+
+
+# Close the pooled connections of every client when the process exits
+def _close_clients():
+    if _loop is not None and _loop.is_running():
+        for client in list(_open_clients):
+            asyncio.run_coroutine_threadsafe(client.close(), _loop).result(timeout=5)
+
+
+atexit.register(_close_clients)
+
+
+# Shared client per API key, this module outlives Streamlit reruns so the pool is reused
+def get_client(api_key, tier="free"):
+    if (api_key, tier) not in _clients:
+        _clients[(api_key, tier)] = EtherscanClient(api_key, tier)
+    return _clients[(api_key, tier)]
+
+
+# Event loop living in a background thread, so the connection pool survives across Streamlit reruns
+def get_event_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="etherscan-client", daemon=True).start()
+    return _loop
+
+
+# Schedule a coroutine on the client loop and return a concurrent.futures.Future
+def submit(coroutine):
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop())
+
+
+# Run a coroutine on the client loop and wait for its result
+def run_sync(coroutine):
+    return submit(coroutine).result()
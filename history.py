@@ -0,0 +1,77 @@
+import os
+import time
+from collections import OrderedDict
+
+HISTORY_MAX_WALLETS = int(os.environ.get("WALLET_MONITOR_HISTORY_SIZE", "20"))  # Wallets kept in the history, least recently scanned go first
+HISTORY_TOP_FINDINGS = 5  # Findings kept per wallet, the counts cover the rest
+PERSIST_HISTORY = os.environ.get("WALLET_MONITOR_PERSIST_HISTORY", "0") == "1"  # Keep the history in the store across restarts
+
+
+# The first `limit` findings taken round-robin across issues, so one noisy issue cannot crowd out the others
+def top_findings(suspicious_activities, limit=HISTORY_TOP_FINDINGS):
+    by_issue = OrderedDict()
+    for finding in suspicious_activities:
+        by_issue.setdefault(finding['issue'], []).append(finding)
+    findings = []
+    depth = 0
+    while len(findings) < limit and any(depth < len(issue_findings) for issue_findings in by_issue.values()):
+        for issue_findings in by_issue.values():
+            if depth < len(issue_findings) and len(findings) < limit:
+                finding = issue_findings[depth]
+                findings.append({'issue': finding['issue'], 'details': finding['details'], 'tx_hash': finding.get('tx_hash')})
+        depth += 1
+    return findings
+
+
+# Compact summary of one scan: balance, activity counts and a bounded list of findings
+def scan_summary(wallet_address, balance, activity_counts, suspicious_activities, limit=HISTORY_TOP_FINDINGS):
+    return {
+        'wallet': wallet_address,
+        'balance': balance,
+        'activity_counts': dict(activity_counts),
+        'finding_count': len(suspicious_activities),
+        'findings': top_findings(suspicious_activities, limit)
+    }
+
+
+# Scan history with one summary per wallet, evicted least recently scanned first once `capacity` wallets
+# are held. With a store the history is loaded from and written through to it, so it survives restarts.
+class ScanHistory:
+    def __init__(self, capacity=HISTORY_MAX_WALLETS, limit=HISTORY_TOP_FINDINGS, store=None):
+        self.capacity = capacity
+        self.limit = limit
+        self.store = store
+        self.entries = OrderedDict()  # Lowercase wallet -> summary, most recently scanned last
+        if store is not None:
+            for summary in reversed(store.scan_summaries(capacity)):
+                self.entries[summary['wallet'].lower()] = summary
+
+    # Record a scan, a rescan of the same wallet replaces its summary and moves it to the front
+    def record(self, wallet_address, balance, activity_counts, suspicious_activities):
+        key = wallet_address.lower()
+        summary = scan_summary(wallet_address, balance, activity_counts, suspicious_activities, self.limit)
+        # Streamlit reruns the script on every interaction, repeating the latest scan unchanged is a no-op
+        previous = self.entries.get(key)
+        if next(reversed(self.entries), None) == key and all(previous.get(field) == value for field, value in summary.items()):
+            return previous
+        summary['scanned_at'] = time.time()
+        self.entries.pop(key, None)
+        self.entries[key] = summary
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        if self.store is not None:
+            self.store.save_scan_summary(wallet_address, summary)
+            self.store.prune_scan_summaries(self.capacity)
+        return summary
+
+    def clear(self):
+        self.entries.clear()
+        if self.store is not None:
+            self.store.prune_scan_summaries(0)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Summaries, most recently scanned first
+    def __iter__(self):
+        return iter(reversed(list(self.entries.values())))
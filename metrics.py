@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Help text and Prometheus type of every metric, summaries are exported as <name>_count and <name>_sum
+METRICS = {
+    "wallet_monitor_stage_seconds": ("summary", "Time spent in each stage of a scan"),
+    "wallet_monitor_api_calls_total": ("counter", "Etherscan API requests by action and outcome"),
+    "wallet_monitor_api_request_seconds": ("summary", "Etherscan request latency by action, decoding included"),
+    "wallet_monitor_api_decode_seconds": ("summary", "Time spent decoding Etherscan JSON responses"),
+    "wallet_monitor_payload_bytes_total": ("counter", "Bytes received from Etherscan and the node and chart JSON produced, by source"),
+    "wallet_monitor_rate_limit_wait_seconds_total": ("counter", "Time requests waited for the client-side rate limiter"),
+    "wallet_monitor_backoff_seconds_total": ("counter", "Time spent backing off before retries"),
+    "wallet_monitor_rpc_calls_total": ("counter", "JSON-RPC calls to the node by method and outcome"),
+    "wallet_monitor_rpc_batch_seconds": ("summary", "JSON-RPC batch latency by method, decoding included"),
+    "wallet_monitor_blocks_scanned_total": ("counter", "Blocks read by the block scanner")
+}
+
+
+# Thread-safe in-process metrics registry. Counters hold a total, summaries a count and a sum.
+# Values are keyed by metric name and a sorted tuple of label pairs.
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            count, total = self.values.get(key, (0, 0.0))
+            self.values[key] = (count + 1, total + value)
+
+    # Time the enclosed block as one observation of a stage, usable as `with` block or decorator
+    @contextmanager
+    def timed(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("wallet_monitor_stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    # Prometheus text exposition format
+    def to_prometheus(self):
+        values = self.snapshot()
+        lines = []
+        for name, (metric_type, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (key_name, labels), value in sorted(values.items()):
+                if key_name != name:
+                    continue
+                label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+                label_text = "{" + label_text + "}" if label_text else ""
+                if metric_type == "summary":
+                    lines.append(f"{name}_count{label_text} {value[0]}")
+                    lines.append(f"{name}_sum{label_text} {value[1]}")
+                else:
+                    lines.append(f"{name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry for the process, the Etherscan client, the scans and the charts all report here
+metrics = Metrics()
+
+
+def timed(stage):
+    return metrics.timed(stage)
+
+
+# What changed between two snapshots, as rows for a table. Used to show the work done by a single run.
+def snapshot_delta(before, after):
+    rows = []
+    for (name, labels), value in sorted(after.items()):
+        previous = before.get((name, labels))
+        label_text = ", ".join(f"{label}={label_value}" for label, label_value in labels)
+        if isinstance(value, tuple):
+            count, total = value[0] - (previous[0] if previous else 0), value[1] - (previous[1] if previous else 0.0)
+        else:
+            count, total = None, value - (previous or 0)
+        if count or total:
+            rows.append({"metric": name, "labels": label_text, "count": count, "total": total})
+    return rows
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.to_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes would otherwise flood stderr
+
+
+# Serve /metrics for Prometheus from a background thread
+def serve_metrics(port, host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+# Write the metrics to a file in one step, for node_exporter's textfile collector
+def write_metrics(path):
+    with open(f"{path}.tmp", "w") as f:
+        f.write(metrics.to_prometheus())
+    os.replace(f"{path}.tmp", path)
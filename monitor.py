@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from blocks import BlockScanner, get_rpc_client
+from etherscan import run_sync
+from metrics import serve_metrics, timed
+from pool import POOL_WORKERS, DetectionPool
+from store import get_store
+from core import (BATCH_CONCURRENCY, INFURA_URL, REORG_DEPTH, WalletDetectorState, get_alert_dispatcher, get_balances_async,
+                  get_chain_head, get_wallet_creation_date_async, read_wallet_addresses, sync_wallet_async)
+
+POLL_INTERVAL = 4  # Seconds between checks for a new block
+
+
+# Print one alert per finding as a JSON line, so the output can be piped into other tools
+def emit_alert(wallet_address, block, finding):
+    alert = {"time": time.time(), "wallet": wallet_address, "block": block}
+    alert.update(finding)
+    print(json.dumps(alert), flush=True)
+
+
+# Restore the saved detector state of a wallet, None when there is none for this counting mode
+def restore_detector_state(store, wallet_address, wallet_creation_date, use_sketches=False):
+    data = store.load_detector_state(wallet_address)
+    if data is None or data.get("use_sketches", False) != use_sketches:
+        return None
+    state = WalletDetectorState.from_dict(data)
+    state.wallet_creation_date = wallet_creation_date or state.wallet_creation_date
+    return state
+
+
+# Load the detector state of a wallet, or build it from the stored history without alerting.
+# The wallet is synced already, so its creation date comes from the store without an API call.
+# The history is replayed without a balance: today's balance says nothing about old spends, so the low
+# balance rule only applies to the transactions that arrive once the monitor has fetched one.
+async def load_detector_state(store, wallet_address, use_sketches=False):
+    wallet_creation_date = await get_wallet_creation_date_async(wallet_address, store)
+    state = restore_detector_state(store, wallet_address, wallet_creation_date, use_sketches)
+    if state is None:
+        state = WalletDetectorState(wallet_address, wallet_creation_date, use_sketches=use_sketches)
+        for tx in store.iter_transactions(wallet_address):
+            state.add_transaction(tx)
+    return state
+
+
+# Load the detector states of many wallets. With a DetectionPool the states that have to be rebuilt
+# from history, every wallet on a first run, are built by the pool's workers.
+async def load_detector_states(store, wallet_addresses, use_sketches=False, pool=None):
+    if pool is None:
+        return [await load_detector_state(store, address, use_sketches) for address in wallet_addresses]
+
+    states = {}
+    rebuild = []
+    for wallet_address in wallet_addresses:
+        wallet_creation_date = await get_wallet_creation_date_async(wallet_address, store)
+        states[wallet_address] = restore_detector_state(store, wallet_address, wallet_creation_date, use_sketches)
+        if states[wallet_address] is None:
+            rebuild.append((wallet_address, wallet_creation_date))
+
+    async def load(item):
+        wallet_address, wallet_creation_date = item
+        return (wallet_address, wallet_creation_date, use_sketches), list(store.iter_transactions(wallet_address))
+
+    for (wallet_address, _), state in zip(rebuild, await pool.build_states(rebuild, load)):
+        states[wallet_address] = state
+    return [states[address] for address in wallet_addresses]
+
+
+# Sync one watched wallet and collect the transactions that are new since the last cycle.
+# Wallets that were never synced are backfilled silently instead of alerting on their whole history.
+# Returns whether a backfill completed, one that failed is tried again by the next cycle.
+async def poll_wallet(store, wallet_address, semaphore, head=None):
+    new_transactions = []
+    backfill = store.last_synced_block(wallet_address) is None
+    async with semaphore:
+        synced_block = await sync_wallet_async(store, wallet_address, on_new_transactions=None if backfill else new_transactions.extend,
+                                               endblock=head)
+    return backfill and synced_block is not None, new_transactions
+
+
+# Load the detector states of wallets into `states` and save them
+async def add_detector_states(store, states, wallet_addresses, use_sketches=False, pool=None):
+    for wallet_address, state in zip(wallet_addresses, await load_detector_states(store, wallet_addresses, use_sketches, pool)):
+        states[wallet_address] = state
+        store.save_detector_state(wallet_address, state.to_dict())
+
+
+# One monitoring pass: sync every wallet, then feed only the new transactions to each wallet's detector.
+# States of wallets synced before, by an earlier run, the app or a batch scan, are loaded before the sync:
+# a state rebuilt from the stored history afterwards would already hold the new transactions.
+async def monitor_cycle(store, states, wallet_addresses, head, concurrency=BATCH_CONCURRENCY, dispatcher=None, use_sketches=False,
+                        pool=None):
+    synced = [address for address in wallet_addresses if address not in states and store.last_synced_block(address) is not None]
+    await add_detector_states(store, states, synced, use_sketches, pool)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    polled = await asyncio.gather(*(poll_wallet(store, address, semaphore, head) for address in wallet_addresses))
+
+    # Backfilled wallets start from their whole history, without alerting on it
+    backfilled = [address for address, (backfill, _) in zip(wallet_addresses, polled) if backfill]
+    await add_detector_states(store, states, backfilled, use_sketches, pool)
+
+    active = [(address, transactions) for address, (_, transactions) in zip(wallet_addresses, polled) if transactions]
+    return await detect_new_transactions(store, states, active, head, dispatcher)
+
+
+# Feed new transactions, as (wallet, transactions) pairs, to each wallet's detector and emit the findings
+async def detect_new_transactions(store, states, active, head, dispatcher=None):
+    if not active:
+        return 0
+
+    # Balances only change with new activity, so only active wallets are looked up
+    balances = await get_balances_async([address for address, _ in active])
+    alerts = 0
+    for (wallet_address, transactions), balance in zip(active, balances):
+        state = states[wallet_address]
+        state.wallet_balance = balance
+        findings = state.add_transactions(transactions)
+        for finding in findings:
+            emit_alert(wallet_address, head, finding)
+        if dispatcher and findings:
+            dispatcher.submit_findings(wallet_address, findings)
+        alerts += len(findings)
+        store.save_detector_state(wallet_address, state.to_dict())
+    return alerts
+
+
+# One block scanner pass: read the blocks from `start` to `end` once, store the transactions of every
+# watched wallet found in them and feed the new ones to the detectors. After a reorganisation the
+# stored transactions from `start` on are dropped first, the scan replaces them.
+# Returns the alerts, the block the next pass starts at and whether this pass found a reorganisation.
+async def block_cycle(store, states, scanner, start, end, dispatcher=None, reorg=False):
+    matches, next_block, rewound = await scanner.scan(start, end)
+    active = []
+    for wallet_address in (scanner.watched.values() if reorg else matches):
+        transactions = matches.get(wallet_address, [])
+        known_hashes = store.hashes_from_block(wallet_address, start)
+        rollup_since = store.drop_from_block(wallet_address, start) if reorg else None
+        if transactions:
+            with timed("store_write"):
+                store.add_transactions(wallet_address, transactions)
+            earliest = min(int(tx["timeStamp"]) for tx in transactions)
+            rollup_since = earliest if rollup_since is None else min(rollup_since, earliest)
+        if rollup_since is not None:
+            with timed("rollup_refresh"):
+                store.refresh_rollups(wallet_address, rollup_since)
+        new_transactions = [tx for tx in transactions if tx["hash"] not in known_hashes]
+        if new_transactions:
+            active.append((wallet_address, new_transactions))
+    # Every watched wallet is complete up to the last scanned block, so Etherscan syncs by the app, a batch
+    # scan or a restarted monitor start from there instead of fetching the scanned blocks again
+    if next_block > start and not rewound:
+        store.advance_synced_blocks(scanner.watched.values(), next_block - 1)
+    alerts = await detect_new_transactions(store, states, active, next_block - 1, dispatcher)
+    return alerts, next_block, rewound
+
+
+# Watch the wallets until interrupted, running a cycle every time a new block lands
+def run_monitor(wallet_addresses, poll_interval=POLL_INTERVAL, concurrency=BATCH_CONCURRENCY, once=False, dispatcher=None,
+                use_sketches=False, pool=None):
+    store = get_store()
+    states = {}
+    last_head = None
+    while True:
+        head = get_chain_head()
+        if head is not None and head != last_head:
+            started = time.time()
+            with timed("monitor_cycle"):
+                alerts = run_sync(monitor_cycle(store, states, wallet_addresses, head, concurrency, dispatcher, use_sketches, pool))
+            print(f"Block {head}: scanned {len(wallet_addresses)} wallets in {time.time() - started:.1f}s, {alerts} alerts", file=sys.stderr, flush=True)
+            last_head = head
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+# Watch the wallets by reading every new block from the node once for the whole watchlist.
+# The first cycle backfills and catches up every wallet through Etherscan; the last REORG_DEPTH blocks
+# are then scanned again in case Etherscan had not indexed them yet.
+def run_block_monitor(wallet_addresses, poll_interval=POLL_INTERVAL, concurrency=BATCH_CONCURRENCY, once=False, dispatcher=None,
+                      use_sketches=False, pool=None):
+    store = get_store()
+    states = {}
+    scanner = BlockScanner(get_rpc_client(INFURA_URL), wallet_addresses, REORG_DEPTH)
+    next_block = None
+    reorg = False
+    while True:
+        head = run_sync(scanner.get_head())
+        if head is not None and next_block is None:
+            started = time.time()
+            with timed("monitor_cycle"):
+                alerts = run_sync(monitor_cycle(store, states, wallet_addresses, head, concurrency, dispatcher, use_sketches, pool))
+            print(f"Block {head}: synced {len(wallet_addresses)} wallets in {time.time() - started:.1f}s, {alerts} alerts", file=sys.stderr, flush=True)
+            next_block = head + 1 - REORG_DEPTH
+        elif head is not None and head >= next_block:
+            started = time.time()
+            with timed("monitor_cycle"):
+                alerts, scanned_to, reorg = run_sync(block_cycle(store, states, scanner, next_block, head, dispatcher, reorg))
+            if not reorg:
+                print(f"Blocks {next_block}-{scanned_to - 1}: scanned for {len(wallet_addresses)} wallets in {time.time() - started:.1f}s, "
+                      f"{alerts} alerts", file=sys.stderr, flush=True)
+            next_block = scanned_to
+        if once:
+            return
+        if next_block is None or head is None or head < next_block:
+            time.sleep(poll_interval)
+
+
+# Command line entry point for the headless watcher
+def main():
+    parser = argparse.ArgumentParser(description="Watch Ethereum wallets and print alerts as new blocks land.")
+    parser.add_argument("watchlist", help="Text or CSV file with one wallet address per line")
+    parser.add_argument("-i", "--interval", type=float, default=POLL_INTERVAL, help="Seconds between checks for a new block")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY, help="Wallets synced at the same time")
+    parser.add_argument("--once", action="store_true", help="Run a single cycle and exit")
+    parser.add_argument("--email", action="store_true", help="Also send alerts as digest emails")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port at /metrics")
+    parser.add_argument("--blocks", action="store_true",
+                        help="Read each new block once from the node (ETHEREUM_RPC_URL) instead of calling txlist per wallet")
+    parser.add_argument("--sketch", action="store_true",
+                        help="Track counterparties with fixed-size sketches instead of exact counts, bounds memory per wallet")
+    parser.add_argument("-w", "--workers", type=int, nargs="?", const=POOL_WORKERS, default=0,
+                        help="Build detector states on this many processes (all cores if no number is given)")
+    args = parser.parse_args()
+
+    with open(args.watchlist) as f:
+        wallet_addresses = read_wallet_addresses(f)
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+    dispatcher = get_alert_dispatcher() if args.email else None
+    pool = DetectionPool(args.workers) if args.workers else None
+    try:
+        monitor = run_block_monitor if args.blocks else run_monitor
+        monitor(wallet_addresses, args.interval, args.concurrency, args.once, dispatcher, args.sketch, pool)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if dispatcher:
+            dispatcher.close()  # Flush the pending digest before exiting
+        if pool:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core import WalletDetectorState, build_column_frame, detect_suspicious_activity, scan_result
+from store import TRANSACTION_COLUMNS
+
+POOL_WORKERS = os.cpu_count() or 1  # Detection processes, one per core by default
+SHARD_SIZE = 64  # Wallets handed to a worker at a time, their transactions share one shared memory block
+
+
+# Pack the transactions of a shard, one list per wallet, into one shared memory block of fixed-width byte
+# columns. Returns the block and its layout, a small picklable description the workers map it with.
+def pack_transactions(groups):
+    columns = [(field, np.array([tx.get(field) or "" for transactions in groups for tx in transactions], dtype=bytes))
+               for field in TRANSACTION_COLUMNS]
+    block = shared_memory.SharedMemory(create=True, size=max(1, sum(column.nbytes for _, column in columns)))
+    layout = {"name": block.name, "counts": [len(transactions) for transactions in groups], "columns": []}
+    offset = 0
+    for field, column in columns:
+        np.ndarray(column.shape, dtype=column.dtype, buffer=block.buf, offset=offset)[:] = column
+        layout["columns"].append((field, column.dtype.str, offset, len(column)))
+        offset += column.nbytes
+    return block, layout
+
+
+# Copy the columns out of a shard's shared memory block and split them per wallet, in worker processes
+def unpack_transactions(layout):
+    block = shared_memory.SharedMemory(name=layout["name"])
+    try:
+        columns = {field: np.ndarray(count, dtype=dtype, buffer=block.buf, offset=offset).copy()
+                   for field, dtype, offset, count in layout["columns"]}
+    finally:
+        block.close()
+    bounds = np.cumsum([0] + layout["counts"]).tolist()
+    return [{field: column[start:end] for field, column in columns.items()} for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+# Turn a wallet's columns back into txlist dicts, for the incremental detector state
+def column_transactions(columns):
+    fields = list(columns)
+    transactions = []
+    for values in zip(*(columns[field].astype(str).tolist() for field in fields)):
+        tx = dict(zip(fields, values))
+        if not tx["gasUsed"]:
+            del tx["gasUsed"]  # Missing gasUsed stays missing, like in the API response
+        transactions.append(tx)
+    return transactions
+
+
+# Worker: batch scan of a shard, jobs are (wallet, balance, creation date)
+def _scan_shard(layout, jobs):
+    results = []
+    for columns, (wallet_address, balance, wallet_creation_date) in zip(unpack_transactions(layout), jobs):
+        frame = build_column_frame(columns)
+        suspicious_activities, activity_counts = detect_suspicious_activity(frame, wallet_creation_date, balance)
+        results.append(scan_result(wallet_address, balance, len(frame), suspicious_activities, activity_counts))
+    return results
+
+
+# Worker: rebuild detector states from full histories, jobs are (wallet, creation date, use_sketches).
+# Like monitor.load_detector_state the history is replayed without a balance.
+def _build_states(layout, jobs):
+    states = []
+    for columns, (wallet_address, wallet_creation_date, use_sketches) in zip(unpack_transactions(layout), jobs):
+        state = WalletDetectorState(wallet_address, wallet_creation_date, use_sketches=use_sketches)
+        state.add_transactions(column_transactions(columns))
+        states.append(state.to_dict())
+    return states
+
+
+# Process pool for the CPU-bound part of batch and daemon runs. Wallets are sharded across the workers;
+# a shard's transactions travel as byte columns in shared memory instead of pickled dicts, and only
+# compact results come back (counts and findings, or serialized detector states).
+# Workers are spawned rather than forked, the parent runs the client's event loop thread.
+class DetectionPool:
+    def __init__(self, workers=POOL_WORKERS, shard_size=SHARD_SIZE):
+        self.workers = workers
+        self.shard_size = shard_size
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # Run a worker function over `items` shard by shard. `load(item)` is awaited on the event loop and
+    # returns the item's job and transactions; at most two shards per worker are loaded at a time, which
+    # keeps the workers busy while bounding memory. `on_result` sees each result as its shard finishes.
+    async def map_shards(self, function, items, load, on_result=None):
+        semaphore = asyncio.Semaphore(2 * self.workers)
+
+        async def run_shard(shard):
+            async with semaphore:
+                loaded = await asyncio.gather(*(load(item) for item in shard))
+                block, layout = pack_transactions([transactions for _, transactions in loaded])
+                try:
+                    results = await asyncio.wrap_future(self.executor.submit(function, layout, [job for job, _ in loaded]))
+                finally:
+                    block.close()
+                    block.unlink()
+            if on_result:
+                for result in results:
+                    on_result(result)
+            return results
+
+        shards = [items[i:i + self.shard_size] for i in range(0, len(items), self.shard_size)]
+        return [result for results in await asyncio.gather(*(run_shard(shard) for shard in shards)) for result in results]
+
+    # Batch scan, `load(item)` returns ((wallet, balance, creation date), recent transactions)
+    async def scan(self, items, load, on_result=None):
+        return await self.map_shards(_scan_shard, items, load, on_result)
+
+    # Detector states built from history, `load(item)` returns ((wallet, creation date, use_sketches), transactions)
+    async def build_states(self, items, load):
+        return [WalletDetectorState.from_dict(data) for data in await self.map_shards(_build_states, items, load)]
+
+    def close(self):
+        self.executor.shutdown()
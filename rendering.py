@@ -0,0 +1,355 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from metrics import timed
+
+# Figures and the transactions table, built from the frames produced by core.py. Only the app and
+# benchmark.py import this module; plotly.express is loaded by the two histograms that use it.
+
+bright_colors = ['#FF007F', '#FFB400', '#00FF7F', '#00D9FF', '#FF7F00', '#FF00FF', '#FFFF00', '#00FF00']
+
+NETWORK_MAX_NODES = 100  # Counterparties drawn in the interaction network, the rest are collapsed into one node
+CHART_MAX_POINTS = 5000  # Points per series sent to the browser, longer series are downsampled with LTTB
+SCATTERGL_THRESHOLD = 1000  # Series longer than this are drawn with WebGL
+
+# Function to build the table of recent transactions. Columns keep their numeric types, formatting is
+# left to st.dataframe's column_config in the app so the table stays sortable and costs nothing per cell.
+@timed("build_table")
+def build_transaction_table(transactions):
+    return pd.DataFrame({
+        'Tx Hash': transactions["hash"],
+        'From Address': transactions["from"],
+        'To Address': transactions["to"].fillna(""),
+        'Value (ETH)': transactions["value"],
+        'Gas Price (ETH)': transactions["gas_price"],
+        'Gas Used (ETH)': transactions["gas_fee"],
+        'Transaction Status': np.where(transactions["is_error"], 'Failed', 'Success')
+    })
+
+# Function to plot pie chart with animation
+def plot_pie_chart(activity_counts):
+    labels = list(activity_counts.keys())
+    values = list(activity_counts.values())
+    
+    fig = go.Figure(data=[go.Pie(labels=labels, values=values, hole=0.4, pull=[0.1]*len(values), 
+                                 rotation=90, marker=dict(colors=bright_colors))])
+    
+    fig.update_traces(hoverinfo='label+percent', textinfo='value', textfont_size=20, 
+                      hoverlabel=dict(bgcolor="rgba(0, 0, 0, 0.7)", font_size=16, font_color="white"))
+    
+    fig.update_layout(
+        title="Distribution of Security Issues",
+        title_x=0.5,
+        transition_duration=500,
+        transition_easing="cubic-in-out",
+        autosize=True,
+        plot_bgcolor="#2E3440",  # Dark background color for the chart
+        paper_bgcolor="#2E3440",
+        font=dict(family="Roboto, sans-serif", color="white"),
+        margin=dict(l=0, r=0, b=0, t=40)
+    )
+    return fig
+
+
+# Additional Visualizations (Bar chart, Heatmap, Histogram, etc.)
+
+# Largest-Triangle-Three-Buckets downsampling: keep the first and last point and, from each bucket in
+# between, the point forming the largest triangle with the previous pick and the next bucket's average.
+# Peaks and the overall shape survive while the series shrinks to `max_points`. Returns positions.
+def lttb_indices(x, y, max_points=CHART_MAX_POINTS):
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_x = x[end:edges[bucket + 2]].mean()
+        next_y = y[end:edges[bucket + 2]].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+# Numeric x positions for LTTB, datetimes as nanoseconds and anything else by position
+def chart_positions(x):
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").astype(np.int64)
+    if np.issubdtype(values.dtype, np.number):
+        return values
+    return np.arange(len(values))
+
+# Build a line or marker trace, downsampled to CHART_MAX_POINTS and drawn with WebGL when the series is long
+def series_trace(x, y, **trace_options):
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    selected = lttb_indices(chart_positions(x), y)
+    trace_class = go.Scattergl if len(y) > SCATTERGL_THRESHOLD else go.Scatter
+    return trace_class(x=x[selected], y=y[selected], **trace_options)
+
+# Plot bar chart of transaction values, long histories keep the LTTB selection of bars
+def plot_transaction_value_bar_chart(transactions):
+    selected = lttb_indices(np.arange(len(transactions)), transactions["value"].to_numpy())
+    values = transactions["value"].to_numpy()[selected]
+    tx_hashes = transactions["hash"].to_numpy()[selected]
+    title = "Transaction Values" if len(selected) == len(transactions) else f"Transaction Values ({len(selected)} of {len(transactions)} shown)"
+
+    fig = go.Figure(data=[go.Bar(x=tx_hashes, y=values, marker=dict(color=bright_colors[1]))])
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title="Transaction Hash",
+        yaxis_title="ETH",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white"),
+        showlegend=False
+    )
+    return fig
+
+# Plot heatmap for transaction times, from the hourly rollups
+def plot_transaction_heatmap(hourly_rollups):
+    hour_counts = hourly_rollups.groupby(hourly_rollups["time"].dt.hour)["tx_count"].sum().reindex(range(24), fill_value=0)
+
+    fig = go.Figure(data=[go.Bar(x=hour_counts.index, y=hour_counts.values, marker=dict(color=bright_colors[0]))])
+    fig.update_layout(
+        title="Transaction Activity Heatmap (Hour of the Day)",
+        xaxis_title="Hour of Day",
+        yaxis_title="Transaction Count",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+
+# Plot spend vs balance line chart
+def plot_spend_vs_balance(transactions, wallet_balance):
+    df = pd.DataFrame({
+        'Date': transactions["time"],
+        'Spend': transactions["value"],
+        'Balance': wallet_balance
+    })
+    
+    fig = go.Figure()
+    fig.add_trace(series_trace(df['Date'], df['Spend'], mode='lines', name='Spend', line=dict(color=bright_colors[0])))
+    fig.add_trace(series_trace(df['Date'], df['Balance'], mode='lines', name='Balance', line=dict(color=bright_colors[4])))
+    
+    fig.update_layout(
+        title="Spend vs Balance",
+        xaxis_title="Date",
+        yaxis_title="ETH",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+
+# Plot transaction count per day, from the daily rollups
+def plot_transaction_count_over_time(daily_rollups):
+    fig = go.Figure()
+    fig.add_trace(series_trace(daily_rollups["time"], daily_rollups["tx_count"], mode='lines', 
+                             name='Transaction Count', line=dict(color=bright_colors[3], width=4)))
+
+    fig.update_layout(
+        title="Transaction Count Over Time",
+        xaxis_title="Date",
+        yaxis_title="Number of Transactions",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+
+
+
+
+# 2. Plot top 5 largest transactions (Bar Chart)
+def plot_top_5_largest_transactions(transactions):
+    transactions_sorted = transactions.sort_values("value_wei", ascending=False, kind="stable").head(5)
+    values = transactions_sorted["value"]
+    tx_hashes = transactions_sorted["hash"]
+    
+    fig = go.Figure(data=[go.Bar(x=tx_hashes, y=values, marker=dict(color='#81A1C1'))])
+    fig.update_layout(
+        title="Top 5 Largest Transactions",
+        xaxis_title="Transaction Hash",
+        yaxis_title="ETH",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white"),
+        showlegend=False,
+    )
+    return fig
+
+# 3. Plot transaction value distribution (Histogram)
+def plot_transaction_value_distribution(transactions):
+    import plotly.express as px
+    values = transactions["value"].to_numpy()
+
+    fig = px.histogram(values, nbins=50, color_discrete_sequence=["#81A1C1"])
+    fig.update_layout(
+        title="Transaction Value Distribution",
+        xaxis_title="Transaction Value (ETH)",
+        yaxis_title="Frequency",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+
+# 4. Plot gas fee distribution (Histogram)
+def plot_gas_fee_distribution(transactions):
+    import plotly.express as px
+    gas_fees = transactions["gas_fee"].to_numpy()
+
+    fig = px.histogram(gas_fees, nbins=50, color_discrete_sequence=[bright_colors[2]])
+    fig.update_layout(
+        title="Gas Fee Distribution",
+        xaxis_title="Gas Fee (ETH)",
+        yaxis_title="Frequency",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+
+# 6. Plot Address Interaction Network (radial graph around the wallet)
+# Transactions are aggregated into one weighted edge per counterparty. The top NETWORK_MAX_NODES
+# counterparties by volume are drawn on rings, heavier ones closer to the wallet, and the rest are
+# collapsed into a single node, so the layout costs the same whatever the size of the history.
+def plot_address_interaction_network(transactions, wallet_address):
+    wallet = wallet_address.lower()
+    is_outgoing = (transactions["from"] == wallet).to_numpy()
+    counterparties = transactions["to"].where(is_outgoing, transactions["from"]).fillna("(contract creation)")
+    counterparties = counterparties.where(counterparties != wallet, "(self)")
+    edges = pd.DataFrame({
+        "counterparty": counterparties.to_numpy(),
+        "value": transactions["value"].to_numpy(),
+        "sent": is_outgoing
+    }).groupby("counterparty").agg(tx_count=("value", "size"), volume=("value", "sum"), sent=("sent", "sum"))
+    edges = edges.sort_values(["volume", "tx_count"], ascending=False)
+
+    if len(edges) > NETWORK_MAX_NODES:
+        rest = edges.iloc[NETWORK_MAX_NODES - 1:]
+        other = pd.DataFrame({"tx_count": [rest["tx_count"].sum()], "volume": [rest["volume"].sum()], "sent": [rest["sent"].sum()]},
+                             index=[f"Other ({len(rest)} addresses)"])
+        edges = pd.concat([edges.iloc[:NETWORK_MAX_NODES - 1], other])
+
+    # Vectorized radial layout: golden-angle spacing, radius grows with the volume rank
+    rank = np.arange(len(edges))
+    angles = rank * np.pi * (3 - np.sqrt(5))
+    radii = 0.3 + 0.7 * (rank + 1) / max(len(edges), 1)
+    nodes_x = radii * np.cos(angles)
+    nodes_y = radii * np.sin(angles)
+
+    # One edge trace for all edges, NaN separators break the line between edges
+    edges_x = np.column_stack([np.zeros(len(edges)), nodes_x, np.full(len(edges), np.nan)]).ravel()
+    edges_y = np.column_stack([np.zeros(len(edges)), nodes_y, np.full(len(edges), np.nan)]).ravel()
+
+    edge_trace = go.Scatter(x=edges_x, y=edges_y, mode='lines', line=dict(width=0.5, color=bright_colors[6]),
+                            hoverinfo='none')
+
+    hover_text = [f"{address}<br>{tx_count} transactions ({sent} sent)<br>{volume:.4f} ETH"
+                  for address, tx_count, sent, volume in zip(edges.index, edges["tx_count"], edges["sent"], edges["volume"])]
+    node_sizes = 8 + 22 * np.sqrt(edges["tx_count"].to_numpy() / max(edges["tx_count"].max(), 1)) if len(edges) else []
+    node_trace = go.Scatter(x=nodes_x, y=nodes_y, mode='markers', hoverinfo='text', text=hover_text,
+                            marker=dict(color=bright_colors[7], size=node_sizes))
+    wallet_trace = go.Scatter(x=[0], y=[0], mode='markers', hoverinfo='text',
+                              text=[f"{wallet}<br>{len(transactions)} transactions"],
+                              marker=dict(color=bright_colors[0], size=24))
+
+    fig = go.Figure(data=[edge_trace, node_trace, wallet_trace])
+    fig.update_layout(
+        title="Address Interaction Network",
+        title_x=0.5,
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white"),
+        showlegend=False,
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False, scaleanchor="x")
+    )
+    return fig
+
+
+# 7. Plot cumulative transaction value over time (Line Chart), from the hourly rollups
+def plot_cumulative_transaction_value(hourly_rollups):
+    # Calculate cumulative value
+    cumulative_values = hourly_rollups["value"].cumsum()
+
+    fig = go.Figure()
+    fig.add_trace(series_trace(
+        hourly_rollups["time"], 
+        cumulative_values, 
+        mode='lines', 
+        name='Cumulative Value', 
+        line=dict(color='#81A1C1', width=4, dash='dot')
+    ))
+
+    fig.update_layout(
+        title="Cumulative Transaction Value Over Time",
+        xaxis_title="Date",
+        yaxis_title="Cumulative ETH",
+        plot_bgcolor="#2E3440",  # Dark background
+        paper_bgcolor="#3B4252",  # Lighter background for contrast
+        font=dict(family="Roboto, sans-serif", color="white"),
+        hoverlabel=dict(font_size=18, font_color="white"),
+        transition_duration=1000,
+        transition_easing="cubic-in-out"
+    )
+    return fig
+
+# 8. Plot Transaction Value Trend (Line Chart), value moved per hour from the hourly rollups
+def plot_transaction_value_trend(hourly_rollups):
+    fig = go.Figure()
+    fig.add_trace(series_trace(hourly_rollups["time"], hourly_rollups["value"], mode='lines+markers', name='Transaction Value Trend',
+                             line=dict(color=bright_colors[5], width=3), marker=dict(size=6, color=bright_colors[1])))
+
+    fig.update_layout(
+        title="Transaction Value Trend Over Time",
+        xaxis_title="Date",
+        yaxis_title="ETH",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+
+def plot_transaction_success_rate(transactions):
+    failed = int(transactions["is_error"].sum())
+    successful = len(transactions) - failed
+
+    fig = go.Figure(data=[go.Pie(labels=["Successful", "Failed"], values=[successful, failed], hole=0.3,
+                                 marker=dict(colors=[bright_colors[0], bright_colors[3]]))])
+    
+    fig.update_layout(
+        title="Transaction Success vs Failure",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
+    
+# 9. Plot Transaction Activity Over Time (Line Chart), from the daily rollups
+def plot_transaction_activity_timeline(daily_rollups):
+    fig = go.Figure()
+    fig.add_trace(series_trace(daily_rollups["time"], daily_rollups["tx_count"], mode='lines+markers', 
+                             name="Daily Transaction Activity", line=dict(color=bright_colors[4], width=3)))
+
+    fig.update_layout(
+        title="Transaction Activity Over Time",
+        xaxis_title="Date",
+        yaxis_title="Number of Transactions",
+        plot_bgcolor="#2E3440",
+        paper_bgcolor="#3B4252",
+        font=dict(family="Roboto, sans-serif", color="white")
+    )
+    return fig
@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import heapq
+import math
+
+HLL_PRECISION = 12  # 2^12 one-byte registers per sketch, standard error 1.04 / sqrt(4096) ~ 1.6%
+HEAVY_HITTER_CAPACITY = 256  # Counters kept by the heavy hitter sketch
+BLOOM_FILTER_BITS = 1 << 15  # 4 KiB of bits per filter, about 1% false positives with 3,400 items
+BLOOM_FILTER_HASHES = 7  # Bit positions set per item
+
+
+# 64-bit hash of an address, stable across processes so persisted sketches stay valid
+def _hash64(item):
+    return int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+
+
+# HyperLogLog distinct counter with a fixed 2^precision bytes of memory.
+# The estimate has a relative standard error of 1.04 / sqrt(2^precision); small counts fall back to
+# linear counting and are close to exact. The harmonic sum is kept up to date, so estimate() is O(1).
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self._harmonic_sum = float(len(self.registers))
+        self._zeros = len(self.registers)
+
+    # Add an item, returns True when a register changed and the estimate may have moved
+    def add(self, item):
+        h = _hash64(item)
+        index = h >> (64 - self.precision)
+        rank = (64 - self.precision) - (h & ((1 << (64 - self.precision)) - 1)).bit_length() + 1
+        current = self.registers[index]
+        if rank <= current:
+            return False
+        self._harmonic_sum += 2.0 ** -rank - 2.0 ** -current
+        if current == 0:
+            self._zeros -= 1
+        self.registers[index] = rank
+        return True
+
+    def estimate(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / self._harmonic_sum
+        if estimate <= 2.5 * m and self._zeros:
+            estimate = m * math.log(m / self._zeros)
+        return int(round(estimate))
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": base64.b64encode(self.registers).decode()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["precision"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        sketch._harmonic_sum = sum(2.0 ** -register for register in sketch.registers)
+        sketch._zeros = sketch.registers.count(0)
+        return sketch
+
+
+# Bloom filter with a fixed number of bits. An added item is always found; an item that was never
+# added is found by mistake with a probability that grows with the number of items added.
+class BloomFilter:
+    def __init__(self, bits=BLOOM_FILTER_BITS, hashes=BLOOM_FILTER_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray(bits // 8)
+
+    # Bit positions of an item, by double hashing the two halves of its 64-bit hash
+    def _positions(self, item):
+        h = _hash64(item)
+        h1, h2 = h >> 32, (h & 0xFFFFFFFF) | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.array[position >> 3] >> (position & 7) & 1 for position in self._positions(item))
+
+    def to_dict(self):
+        return {"bits": self.bits, "hashes": self.hashes, "array": base64.b64encode(self.array).decode()}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["bits"], data["hashes"])
+        sketch.array = bytearray(base64.b64decode(data["array"]))
+        return sketch
+
+
+# Space-Saving heavy hitter sketch with a fixed number of counters. Every item seen more than
+# N / capacity times (N = items added) is guaranteed to hold a counter. Each counter also records how
+# much it may overestimate, so `count - error` is a lower bound on the true count that never
+# over-reports; it can under-report by at most N / capacity.
+# The smallest counter is found through a lazily updated min-heap, so an eviction costs O(log capacity).
+class SpaceSaving:
+    def __init__(self, capacity=HEAVY_HITTER_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}  # Item -> [count, error]
+        self._heap = []  # (count, item), one entry per counter, counts may lag behind
+
+    # Add an item, returns its guaranteed count (a lower bound on the true count)
+    def add(self, item):
+        counter = self.counters.get(item)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[item] = [0, 0]
+                heapq.heappush(self._heap, (0, item))
+            else:
+                # Refresh stale heap entries until the top is the real minimum
+                while self._heap[0][0] != self.counters[self._heap[0][1]][0]:
+                    smallest = self._heap[0][1]
+                    heapq.heapreplace(self._heap, (self.counters[smallest][0], smallest))
+                # Replace the smallest counter, the newcomer inherits its count as possible error
+                minimum, smallest = self._heap[0]
+                del self.counters[smallest]
+                heapq.heapreplace(self._heap, (minimum, item))
+                counter = self.counters[item] = [minimum, minimum]
+        counter[0] += 1
+        return counter[0] - counter[1]
+
+    # Items whose guaranteed count exceeds the threshold, with that count
+    def heavy_hitters(self, threshold):
+        return [(item, count - error) for item, (count, error) in self.counters.items() if count - error > threshold]
+
+    def to_dict(self):
+        return {"capacity": self.capacity, "counters": self.counters}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["capacity"])
+        sketch.counters = data["counters"]
+        sketch._heap = [(counter[0], item) for item, counter in sketch.counters.items()]
+        heapq.heapify(sketch._heap)
+        return sketch
@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Location of the local transaction database
+DB_PATH = os.environ.get("WALLET_MONITOR_DB", "wallet_monitor.db")
+
+# txlist fields kept for every transaction and the columns they live in.
+# Amounts stay TEXT so uint256 values round-trip exactly.
+TRANSACTION_COLUMNS = {
+    "hash": "hash",
+    "blockNumber": "block_number",
+    "transactionIndex": "transaction_index",
+    "timeStamp": "time_stamp",
+    "from": "from_address",
+    "to": "to_address",
+    "contractAddress": "contract_address",
+    "value": "value",
+    "gas": "gas",
+    "gasPrice": "gas_price",
+    "gasUsed": "gas_used",
+    "isError": "is_error"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    wallet TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    transaction_index INTEGER NOT NULL,
+    time_stamp INTEGER NOT NULL,
+    from_address TEXT,
+    to_address TEXT,
+    contract_address TEXT,
+    value TEXT,
+    gas TEXT,
+    gas_price TEXT,
+    gas_used TEXT,
+    is_error TEXT,
+    PRIMARY KEY (wallet, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_by_block ON transactions (wallet, block_number, transaction_index);
+CREATE TABLE IF NOT EXISTS sync_state (
+    wallet TEXT PRIMARY KEY,
+    last_block INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    wallet TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    tx_count INTEGER NOT NULL,
+    value REAL NOT NULL,
+    gas_fee REAL NOT NULL,
+    failures INTEGER NOT NULL,
+    PRIMARY KEY (wallet, resolution, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS wallet_creation_dates (
+    wallet TEXT PRIMARY KEY,
+    time_stamp INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS detector_state (
+    wallet TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scan_history (
+    wallet TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_history_by_time ON scan_history (updated_at);
+"""
+
+# Time bucket sizes, in seconds, of the per-wallet rollups that back the time-based charts
+ROLLUP_RESOLUTIONS = {
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60
+}
+
+_columns = ", ".join(TRANSACTION_COLUMNS.values())
+_placeholders = ", ".join("?" for _ in TRANSACTION_COLUMNS)
+
+
+# Convert a txlist dict into a row of the transactions table
+def _transaction_to_row(wallet, tx):
+    row = [tx.get(field) or None for field in TRANSACTION_COLUMNS]
+    row[2] = row[2] or 0  # transactionIndex is part of the sort key
+    return (wallet,) + tuple(row)
+
+
+# Convert a stored row back into the dict shape returned by Etherscan's txlist
+def _row_to_transaction(row):
+    tx = {}
+    for field, value in zip(TRANSACTION_COLUMNS, row):
+        if value is None and field == "gasUsed":
+            continue  # Missing gasUsed stays missing, like in the API response
+        tx[field] = "" if value is None else str(value)
+    return tx
+
+
+# SQLite store of transactions keyed by wallet and tx hash, with the highest synced block per wallet
+class TransactionStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()  # One connection shared by the UI thread and the client loop
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def last_synced_block(self, wallet):
+        with self.lock:
+            row = self.connection.execute("SELECT last_block FROM sync_state WHERE wallet = ?", (wallet.lower(),)).fetchone()
+        return row[0] if row else None
+
+    def set_synced_block(self, wallet, block):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO sync_state (wallet, last_block, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (wallet) DO UPDATE SET last_block = excluded.last_block, synced_at = excluded.synced_at",
+                (wallet.lower(), block, time.time()))
+
+    # Raise the synced block of wallets that were synced before, e.g. after the block scanner covered a range.
+    # Wallets without a sync state are left alone, their history has yet to be backfilled.
+    def advance_synced_blocks(self, wallets, block):
+        now = time.time()
+        with self.lock, self.connection:
+            self.connection.executemany("UPDATE sync_state SET last_block = ?, synced_at = ? WHERE wallet = ? AND last_block < ?",
+                                        [(block, now, wallet.lower(), block) for wallet in wallets])
+
+    # Remove everything from `block` onwards, used to refetch blocks that may have been reorganised.
+    # Returns the earliest timestamp removed, the rollups from there on have to be refreshed.
+    def drop_from_block(self, wallet, block):
+        return self.replace_from_block(wallet, block, [])
+
+    # Replace everything from `block` onwards with freshly fetched transactions in one database transaction,
+    # so the stored blocks are never missing while they are fetched again. Returns the earliest timestamp removed.
+    def replace_from_block(self, wallet, block, transactions):
+        rows = [_transaction_to_row(wallet.lower(), tx) for tx in transactions]
+        with self.lock, self.connection:
+            earliest = self.connection.execute("SELECT MIN(time_stamp) FROM transactions WHERE wallet = ? AND block_number >= ?",
+                                               (wallet.lower(), block)).fetchone()[0]
+            self.connection.execute("DELETE FROM transactions WHERE wallet = ? AND block_number >= ?", (wallet.lower(), block))
+            self.connection.executemany(f"INSERT OR REPLACE INTO transactions (wallet, {_columns}) VALUES (?, {_placeholders})", rows)
+        return earliest
+
+    def hashes_from_block(self, wallet, block):
+        with self.lock:
+            rows = self.connection.execute("SELECT hash FROM transactions WHERE wallet = ? AND block_number >= ?", (wallet.lower(), block)).fetchall()
+        return {row[0] for row in rows}
+
+    def add_transactions(self, wallet, transactions):
+        rows = [_transaction_to_row(wallet.lower(), tx) for tx in transactions]
+        with self.lock, self.connection:
+            self.connection.executemany(f"INSERT OR REPLACE INTO transactions (wallet, {_columns}) VALUES (?, {_placeholders})", rows)
+        return len(rows)
+
+    # Most recent transactions first, like txlist with sort=desc
+    def recent_transactions(self, wallet, count=None):
+        query = f"SELECT {_columns} FROM transactions WHERE wallet = ? ORDER BY block_number DESC, transaction_index DESC, hash DESC"
+        params = (wallet.lower(),)
+        if count is not None:
+            query += " LIMIT ?"
+            params += (count,)
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return [_row_to_transaction(row) for row in rows]
+
+    # Stream a wallet's stored history in block order without loading it all at once
+    def iter_transactions(self, wallet, batch_size=1000):
+        last = (-1, -1, "")
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    f"SELECT {_columns} FROM transactions WHERE wallet = ? AND (block_number, transaction_index, hash) > (?, ?, ?) "
+                    "ORDER BY block_number, transaction_index, hash LIMIT ?", (wallet.lower(),) + last + (batch_size,)).fetchall()
+            for row in rows:
+                yield _row_to_transaction(row)
+            if len(rows) < batch_size:
+                return
+            last = (rows[-1][1], rows[-1][2], rows[-1][0])
+
+    # Rebuild the hourly and daily buckets from `since` onwards out of the stored transactions, so a sync
+    # only re-aggregates the tail it touched. A wallet without rollups yet is aggregated in full.
+    def refresh_rollups(self, wallet, since):
+        wallet = wallet.lower()
+        with self.lock, self.connection:
+            if self.connection.execute("SELECT 1 FROM rollups WHERE wallet = ? LIMIT 1", (wallet,)).fetchone() is None:
+                since = 0
+            for resolution, seconds in ROLLUP_RESOLUTIONS.items():
+                start = since - since % seconds
+                self.connection.execute("DELETE FROM rollups WHERE wallet = ? AND resolution = ? AND bucket >= ?", (wallet, resolution, start))
+                self.connection.execute(
+                    "INSERT INTO rollups (wallet, resolution, bucket, tx_count, value, gas_fee, failures) "
+                    "SELECT wallet, ?, time_stamp - time_stamp % ? AS bucket, COUNT(*), "
+                    "TOTAL(CAST(value AS REAL)) / 1e18, TOTAL(CAST(gas_used AS REAL) * CAST(gas_price AS REAL)) / 1e18, TOTAL(is_error = '1') "
+                    "FROM transactions WHERE wallet = ? AND time_stamp >= ? GROUP BY bucket",
+                    (resolution, seconds, wallet, start))
+
+    # Buckets of one resolution in time order, as (bucket start, tx count, value, gas fee, failures)
+    def rollups(self, wallet, resolution):
+        with self.lock:
+            return self.connection.execute(
+                "SELECT bucket, tx_count, value, gas_fee, failures FROM rollups WHERE wallet = ? AND resolution = ? ORDER BY bucket",
+                (wallet.lower(), resolution)).fetchall()
+
+    # Timestamp of the first stored transaction, the wallet's creation date once its whole history is synced
+    def first_transaction_time(self, wallet):
+        with self.lock:
+            row = self.connection.execute("SELECT time_stamp FROM transactions WHERE wallet = ? ORDER BY block_number, transaction_index LIMIT 1",
+                                          (wallet.lower(),)).fetchone()
+        return row[0] if row else None
+
+    # Creation dates never change, so once found they are kept for good
+    def wallet_creation_date(self, wallet):
+        with self.lock:
+            row = self.connection.execute("SELECT time_stamp FROM wallet_creation_dates WHERE wallet = ?", (wallet.lower(),)).fetchone()
+        return row[0] if row else None
+
+    def set_wallet_creation_date(self, wallet, timestamp):
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO wallet_creation_dates (wallet, time_stamp) VALUES (?, ?)", (wallet.lower(), timestamp))
+
+    # Serialized incremental detector state of a wallet, stored as JSON
+    def load_detector_state(self, wallet):
+        with self.lock:
+            row = self.connection.execute("SELECT state FROM detector_state WHERE wallet = ?", (wallet.lower(),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_detector_state(self, wallet, state):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO detector_state (wallet, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (wallet) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (wallet.lower(), json.dumps(state), time.time()))
+
+    # Compact per-wallet scan summaries behind the app's history, stored as JSON
+    def scan_summaries(self, limit):
+        with self.lock:
+            rows = self.connection.execute("SELECT summary FROM scan_history ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save_scan_summary(self, wallet, summary):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO scan_history (wallet, summary, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (wallet) DO UPDATE SET summary = excluded.summary, updated_at = excluded.updated_at",
+                (wallet.lower(), json.dumps(summary), summary.get("scanned_at", time.time())))
+
+    # Drop all but the `keep` most recently scanned summaries
+    def prune_scan_summaries(self, keep):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM scan_history WHERE wallet NOT IN (SELECT wallet FROM scan_history ORDER BY updated_at DESC LIMIT ?)", (keep,))
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+_stores = {}
+
+
+# Shared store per database file, reused across Streamlit reruns
+def get_store(path=DB_PATH):
+    if path not in _stores:
+        _stores[path] = TransactionStore(path)
+    return _stores[path]
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core
+import etherscan
+from blocks import JsonRpcClient
+from etherscan import EtherscanClient, run_sync
+from store import TransactionStore
+from stubs import EtherscanStub
+
+
+# Fresh database per test, also returned by core.get_store so code that opens the shared store uses it
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = TransactionStore(str(tmp_path / "wallet_monitor.db"))
+    monkeypatch.setattr(core, "get_store", lambda path=None: store)
+    yield store
+    store.close()
+
+
+# Etherscan stub wired into core in place of the real API, without client-side rate limiting or backoff
+@pytest.fixture
+def etherscan_stub(monkeypatch):
+    stub = EtherscanStub().start()
+    client = EtherscanClient("test", tier="professional", base_url=stub.url + "api")
+    client.limiter.rate = 10 ** 6
+    monkeypatch.setattr(core, "etherscan", client)
+    monkeypatch.setattr(etherscan, "BACKOFF_BASE", 0.01)
+    yield stub
+    run_sync(client.close())
+    stub.stop()
+
+
+@pytest.fixture
+def rpc_client():
+    clients = []
+
+    def connect(url):
+        clients.append(JsonRpcClient(url))
+        return clients[-1]
+
+    yield connect
+    for client in clients:
+        run_sync(client.close())
@@ -0,0 +1,191 @@
+import random
+
+from aiohttp import web
+
+from core import ADDRESS_PATTERN
+from etherscan import run_sync
+
+WALLET = "0xaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
+START_BLOCK = 1000
+START_TIMESTAMP = 1600000000
+SECONDS_PER_BLOCK = 12
+ETHERSCAN_RESULT_WINDOW = 10000  # Etherscan rejects page * offset above this
+
+
+# Deterministic txlist transactions of one wallet, in block order. Includes failed transactions, contract
+# creations, self transactions, blacklisted counterparties and bursts of several transactions per block.
+def make_transactions(wallet_address, count, counterparties=30, start_block=START_BLOCK, seed=0):
+    rng = random.Random(seed)
+    partners = ["0x%040x" % rng.getrandbits(160) for _ in range(counterparties)] + ["0x0000000000000000000000000000000000000000"]
+    transactions = []
+    block = start_block
+    index = 0
+    for _ in range(count):
+        step = rng.choice([0, 0, 1, 1, 2, 50])
+        block += step
+        index = index + 1 if step == 0 else 0
+        partner = rng.choice(partners)
+        outgoing = rng.random() < 0.5
+        creation = rng.random() < 0.02
+        to_address = "" if creation else (wallet_address if rng.random() < 0.03 else (partner if outgoing else wallet_address))
+        transactions.append({
+            "blockNumber": str(block),
+            "timeStamp": str(START_TIMESTAMP + (block - START_BLOCK) * SECONDS_PER_BLOCK),
+            "hash": "0x%064x" % rng.getrandbits(256),
+            "transactionIndex": str(index),
+            "from": wallet_address if outgoing or creation else partner,
+            "to": to_address,
+            "value": str(rng.choice([0, 10 ** 15, rng.randrange(10 ** 20), 25 * 10 ** 18])),
+            "gas": "90000",
+            "gasPrice": str(rng.randrange(10 ** 9, 200 * 10 ** 9)),
+            "gasUsed": str(rng.choice([21000, 46000, 120000])),
+            "isError": "1" if rng.random() < 0.05 else "0",
+            "contractAddress": ""
+        })
+    return transactions
+
+
+# aiohttp application running on the client loop, so a test talks to it through the real clients
+class StubServer:
+    def __init__(self):
+        self.calls = []
+        self.runner = None
+        self.url = None
+
+    def routes(self, app):
+        raise NotImplementedError
+
+    async def _start(self):
+        app = web.Application()
+        self.routes(app)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self.url = run_sync(self._start())
+        return self
+
+    def stop(self):
+        run_sync(self.runner.cleanup())
+
+    def count(self, action):
+        return sum(1 for call in self.calls if call.get("action", call.get("method")) == action)
+
+
+# Etherscan account and proxy endpoints over a fixed set of transactions per wallet
+class EtherscanStub(StubServer):
+    def __init__(self, transactions=None, balance=2 * 10 ** 18, head=None):
+        super().__init__()
+        self.transactions = transactions or {}  # Wallet -> txlist transactions in block order
+        self.balance = balance
+        self.head = head
+        self.failing = set()  # Actions answered with an Etherscan error
+        self.rate_limited = 0  # Next calls answered with Etherscan's rate limit error
+
+    def routes(self, app):
+        app.router.add_get("/api", self.handle)
+
+    async def handle(self, request):
+        query = dict(request.query)
+        self.calls.append(query)
+        action = query["action"]
+        if self.rate_limited:
+            self.rate_limited -= 1
+            return web.json_response({"status": "0", "message": "NOTOK", "result": "Max rate limit reached"})
+        if action in self.failing:
+            return web.json_response({"status": "0", "message": "NOTOK", "result": "Error! Something went wrong"})
+        if action == "balance":
+            return web.json_response({"status": "1", "message": "OK", "result": str(self.balance)})
+        if action == "balancemulti":
+            addresses = query["address"].split(",")
+            if not all(ADDRESS_PATTERN.fullmatch(address) for address in addresses):
+                return web.json_response({"status": "0", "message": "NOTOK", "result": "Error! Invalid address format"})
+            result = [{"account": address, "balance": str(self.balance)} for address in addresses]
+            return web.json_response({"status": "1", "message": "OK", "result": result})
+        if action == "eth_blockNumber" and self.head is None:
+            return web.json_response({"jsonrpc": "2.0", "id": 83, "error": {"code": -32000, "message": "head unknown"}})
+        if action == "eth_blockNumber":
+            return web.json_response({"jsonrpc": "2.0", "id": 83, "result": hex(self.head)})
+
+        startblock, endblock = int(query["startblock"]), int(query["endblock"])
+        page, offset = int(query["page"]), int(query["offset"])
+        if page * offset > ETHERSCAN_RESULT_WINDOW:
+            return web.json_response({"status": "0", "message": "NOTOK", "result": "Result window is too large"})
+        selected = [tx for tx in self.transactions.get(query["address"].lower(), []) if startblock <= int(tx["blockNumber"]) <= endblock]
+        if query["sort"] == "desc":
+            selected = selected[::-1]
+        selected = selected[(page - 1) * offset:page * offset]
+        if not selected:
+            return web.json_response({"status": "0", "message": "No transactions found", "result": []})
+        return web.json_response({"status": "1", "message": "OK", "result": selected})
+
+
+# Ethereum node answering batched JSON-RPC calls for blocks and receipts built from txlist transactions.
+# Blocks between the transactions are filled with transactions between unwatched addresses.
+class NodeStub(StubServer):
+    def __init__(self, transactions, head=None, seed=0):
+        super().__init__()
+        self.rng = random.Random(seed)
+        self.blocks = {}
+        self.receipts = {}
+        by_block = {}
+        for tx in transactions:
+            by_block.setdefault(int(tx["blockNumber"]), {})[tx["hash"]] = tx
+        self.first_block, last_block = min(by_block), max(by_block)
+        self.head = last_block if head is None else head
+        self.unavailable = 0  # Next batches answered with HTTP 503
+        for number in range(self.first_block, last_block + 1):
+            self.add_block(number, list(by_block.get(number, {}).values()))
+
+    def add_block(self, number, transactions):
+        transactions = transactions + [self.noise_transaction(number) for _ in range(self.rng.randint(1, 5))]
+        parent = self.blocks.get(number - 1)
+        self.blocks[number] = {
+            "number": hex(number),
+            "hash": "0x%064x" % self.rng.getrandbits(256),
+            "parentHash": parent["hash"] if parent else "0x" + "00" * 32,
+            "timestamp": hex(START_TIMESTAMP + (number - START_BLOCK) * SECONDS_PER_BLOCK),
+            "transactions": [self.node_transaction(number, index, tx) for index, tx in enumerate(transactions)]
+        }
+
+    def noise_transaction(self, number):
+        return {"hash": "0x%064x" % self.rng.getrandbits(256), "from": "0x%040x" % self.rng.getrandbits(160),
+                "to": "0x%040x" % self.rng.getrandbits(160), "value": "1", "gasPrice": "1", "gasUsed": "21000", "isError": "0"}
+
+    def node_transaction(self, number, index, tx):
+        self.receipts[tx["hash"]] = {"gasUsed": hex(int(tx["gasUsed"])), "status": "0x0" if tx["isError"] == "1" else "0x1",
+                                     "effectiveGasPrice": hex(int(tx["gasPrice"])), "contractAddress": None}
+        return {"hash": tx["hash"], "blockNumber": hex(number), "transactionIndex": hex(index), "from": tx["from"],
+                "to": tx["to"] or None, "value": hex(int(tx["value"])), "gas": hex(90000), "gasPrice": hex(int(tx["gasPrice"]))}
+
+    # Replace the chain from `number` on with a new branch holding `transactions` per block
+    def fork(self, number, transactions_by_block=None):
+        last_block = max(self.blocks)
+        for block in range(number, last_block + 1):
+            del self.blocks[block]
+        for block in range(number, last_block + 1):
+            self.add_block(block, (transactions_by_block or {}).get(block, []))
+
+    def routes(self, app):
+        app.router.add_post("/", self.handle)
+
+    async def handle(self, request):
+        if self.unavailable:
+            self.unavailable -= 1
+            return web.Response(status=503)
+        payload = await request.json()
+        responses = []
+        for call in payload:
+            self.calls.append(call)
+            if call["method"] == "eth_blockNumber":
+                result = hex(self.head)
+            elif call["method"] == "eth_getBlockByNumber":
+                number = int(call["params"][0], 16)
+                result = self.blocks.get(number) if number <= self.head else None
+            else:
+                result = self.receipts.get(call["params"][0])
+            responses.append({"jsonrpc": "2.0", "id": call["id"], "result": result})
+        return web.json_response(responses[::-1])  # Nodes may answer a batch in any order
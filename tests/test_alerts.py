@@ -0,0 +1,126 @@
+import asyncio
+import socket
+import time
+from email import message_from_bytes
+
+import pytest
+
+import alerts
+from alerts import AlertDispatcher
+
+controller = pytest.importorskip("aiosmtpd.controller")
+
+FINDINGS = [
+    {"issue": "Large Transaction", "details": "Value: 25.0000 ETH", "tx_hash": "0x01"},
+    {"issue": "Failed Transaction", "details": "Transaction failed", "tx_hash": "0x02"},
+    {"issue": "Transaction Diversity", "details": "Interacted with 101 unique addresses"}
+]
+
+
+# Local SMTP server keeping the messages it receives. It can answer the next DATA commands with 421 and
+# drop the connection after the next message, like a server that fails or times out idle clients.
+class SmtpStub:
+    def __init__(self):
+        self.messages = []
+        self.fail_data = 0
+        self.drop_after_next = False
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail_data:
+            self.fail_data -= 1
+            return "421 Service not available, closing transmission channel"
+        message = message_from_bytes(envelope.content)
+        self.messages.append((message["Subject"], message.get_payload()[0].get_payload()))
+        if self.drop_after_next:
+            self.drop_after_next = False
+            asyncio.get_running_loop().call_soon(server.transport.close)  # After the reply has been written
+        return "250 OK"
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.messages) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.messages
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    stub = SmtpStub()
+    server = controller.Controller(stub, hostname="127.0.0.1", port=port)
+    server.start()
+    stub.port = port
+    yield stub
+    server.stop()
+
+
+@pytest.fixture
+def connect(smtp_server, monkeypatch):
+    monkeypatch.setattr(alerts, "BACKOFF_BASE", 0.01)
+    dispatchers = []
+
+    def connect(digest_window=60):
+        dispatchers.append(AlertDispatcher("127.0.0.1", smtp_server.port, "monitor@example.com", None, "owner@example.com",
+                                           use_ssl=False, digest_window=digest_window))
+        return dispatchers[-1]
+
+    yield connect
+    for dispatcher in dispatchers:
+        dispatcher.close()
+
+
+def test_repeated_findings_are_sent_once(smtp_server, connect):
+    dispatcher = connect()
+    dispatcher.submit_findings("0xAAAA", FINDINGS[:2])
+    dispatcher.submit_findings("0xaaaa", FINDINGS)
+    dispatcher.submit_findings("0xbbbb", FINDINGS[:1])
+    dispatcher.close()
+
+    [(subject, body)] = smtp_server.messages
+    assert subject == "Ethereum Wallet Alerts: 4 findings across 2 wallets"
+    assert body.count("Tx Hash: 0x01") == 2 and body.count("Tx Hash: 0x02") == 1 and body.count("Transaction Diversity") == 1
+
+
+def test_findings_are_batched_per_digest_window(smtp_server, connect):
+    dispatcher = connect(digest_window=0.3)
+    dispatcher.submit_findings("0xaaaa", FINDINGS[:1])
+    dispatcher.submit_findings("0xbbbb", FINDINGS[1:])
+    assert smtp_server.messages == []
+    assert [subject for subject, _ in smtp_server.wait_for(1)] == ["Ethereum Wallet Alerts: 3 findings across 2 wallets"]
+
+    # Findings after a digest start the next window, repeats of sent findings are dropped
+    dispatcher.submit_findings("0xaaaa", FINDINGS[:1] + [{"issue": "Large Transaction", "details": "Value: 30.0000 ETH", "tx_hash": "0x03"}])
+    assert [subject for subject, _ in smtp_server.wait_for(2)][1] == "Ethereum Wallet Alerts: 1 findings across 1 wallets"
+    assert smtp_server.connections == 1  # Both digests went over the same connection
+
+
+def test_delivery_is_retried_after_a_dropped_connection(smtp_server, connect):
+    dispatcher = connect()
+    smtp_server.drop_after_next = True
+    dispatcher.send("first", "sent before the server drops the connection")
+    smtp_server.wait_for(1)
+    dispatcher.send("second", "sent over a new connection")
+    smtp_server.wait_for(2)
+    smtp_server.fail_data = 2
+    dispatcher.send("third", "sent on the third attempt")
+    dispatcher.close()
+
+    assert [subject for subject, _ in smtp_server.messages] == ["first", "second", "third"]
+    assert smtp_server.connections == 4  # The dropped connection and each failed attempt are replaced
+
+
+def test_close_flushes_the_pending_digest(smtp_server, connect):
+    dispatcher = connect(digest_window=3600)
+    dispatcher.send("report", "queued before the findings")
+    dispatcher.submit_findings("0xaaaa", FINDINGS)
+    dispatcher.close()
+
+    assert [subject for subject, _ in smtp_server.messages] == ["report", "Ethereum Wallet Alerts: 3 findings across 1 wallets"]
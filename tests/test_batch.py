@@ -0,0 +1,28 @@
+from core import WalletDetectorState, get_balances, read_wallet_addresses, scan_wallets
+from stubs import WALLET, make_transactions
+
+OTHER_WALLET = "0xbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb"
+MIXED_CASE_WALLET = "0xAaaAaAaaAAaaaAaAaaaaAAAaAaaAaaaaAaaaAAaa"
+
+
+def test_read_wallet_addresses_skips_lines_that_are_not_addresses(capsys):
+    lines = ["address,label", MIXED_CASE_WALLET + ",main", "# comment", "", "0x1234", WALLET, OTHER_WALLET + "\n"]
+    assert read_wallet_addresses(lines) == [MIXED_CASE_WALLET, OTHER_WALLET]
+    assert "'address'" in capsys.readouterr().err
+
+
+def test_failed_balance_lookup_is_unknown_not_zero(etherscan_stub, store):
+    etherscan_stub.transactions[WALLET] = transactions = make_transactions(WALLET, 60, seed=6)
+    etherscan_stub.balance = 5 * 10 ** 16  # 0.05 ETH, low enough for the High Spend with Low Balance rule
+    flagged = scan_wallets([WALLET])[0]["activity_counts"]["High Spend with Low Balance"]
+    assert flagged > 0
+
+    etherscan_stub.failing.add("balancemulti")
+    assert get_balances([WALLET, OTHER_WALLET]) == [None, None]
+    [result] = scan_wallets([WALLET])
+    assert result["balance"] is None
+    assert result["activity_counts"]["High Spend with Low Balance"] == 0
+
+    state = WalletDetectorState(WALLET, None, None)
+    state.add_transactions(transactions)
+    assert state.activity_counts["High Spend with Low Balance"] == 0
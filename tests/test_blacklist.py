@@ -0,0 +1,59 @@
+import random
+import time
+
+import numpy as np
+import pytest
+
+import blacklist
+from blacklist import ADDRESS_SIZE, Blacklist, BlacklistFile, write_blacklist
+
+
+def random_addresses(count, seed):
+    rng = random.Random(seed)
+    return ["0x%040x" % rng.getrandbits(160) for _ in range(count)]
+
+
+LISTED = random_addresses(2000, seed=1)
+UNLISTED = random_addresses(2000, seed=2)
+EXTRA = "0x" + "ab" * 20
+EXTRA_MIXED_CASE = "0x" + "aB" * 20
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "blacklist.bin")
+    write_blacklist(LISTED + ["not an address", "0x1234"], path)
+    return path
+
+
+def test_lookups_find_listed_addresses_only(path):
+    blacklist_file = BlacklistFile(path)
+    assert len(blacklist_file) == len(LISTED)
+    raw = [bytes.fromhex(address[2:]) for address in LISTED + UNLISTED]
+    keys = np.array(raw, dtype=f"S{ADDRESS_SIZE}")
+    expected = [True] * len(LISTED) + [False] * len(UNLISTED)
+    assert [blacklist_file.contains(key) for key in raw] == expected
+    assert blacklist_file.contains_many(keys).tolist() == expected
+    assert blacklist_file.contains_many(keys[:0]).tolist() == []
+
+
+def test_screening_is_case_insensitive(path):
+    screen = Blacklist(path, extra_addresses=[EXTRA_MIXED_CASE])
+    mixed_case = "0x" + LISTED[0][2:].upper()
+    for address, listed in [(LISTED[0], True), (mixed_case, True), (EXTRA, True), (EXTRA_MIXED_CASE, True),
+                            (UNLISTED[0], False), ("0x1234", False), ("", False), (None, False)]:
+        assert (address in screen) == listed, address
+    addresses = [mixed_case, UNLISTED[0], None, EXTRA, LISTED[1]]
+    assert screen.screen(addresses).tolist() == [True, False, False, True, True]
+
+
+def test_rewritten_file_is_picked_up_after_the_check_interval(path, monkeypatch):
+    monkeypatch.setattr(blacklist, "RELOAD_CHECK_INTERVAL", 0.5)
+    screen = Blacklist(path)
+    assert LISTED[0] in screen and UNLISTED[0] not in screen
+
+    write_blacklist(UNLISTED[:10], path)
+    assert LISTED[0] in screen  # Checked again only once the interval has passed
+    time.sleep(0.6)
+    assert LISTED[0] not in screen and UNLISTED[0] in screen
+    assert len(screen) == 10
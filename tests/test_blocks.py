@@ -0,0 +1,108 @@
+import pytest
+
+import etherscan
+from blocks import BlockScanner
+from core import REORG_DEPTH, WalletDetectorState, sync_wallet
+from etherscan import MAX_RETRIES, run_sync
+from monitor import block_cycle
+from stubs import WALLET, NodeStub, make_transactions
+
+OTHER_WALLET = "0xbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb"
+TXLIST_FIELDS = ["blockNumber", "timeStamp", "hash", "from", "to", "value", "gasPrice", "gasUsed", "isError"]
+
+
+@pytest.fixture
+def node():
+    transactions = make_transactions(WALLET, 120, seed=4) + make_transactions(OTHER_WALLET, 80, seed=5)
+    node = NodeStub(sorted(transactions, key=lambda tx: int(tx["blockNumber"]))).start()
+    node.transactions = transactions
+    yield node
+    node.stop()
+
+
+def expected_matches(transactions, wallet_address, start, end):
+    return [{field: tx[field] for field in TXLIST_FIELDS} for tx in transactions
+            if wallet_address in (tx["from"], tx["to"]) and start <= int(tx["blockNumber"]) <= end]
+
+
+def test_scan_matches_watched_wallets(node, rpc_client):
+    scanner = BlockScanner(rpc_client(node.url), [WALLET, OTHER_WALLET], reorg_depth=5, max_blocks=10000)
+    start, end = node.first_block, node.head
+    matches, next_block, reorg = run_sync(scanner.scan(start, end))
+
+    assert (next_block, reorg) == (end + 1, False)
+    for wallet_address in (WALLET, OTHER_WALLET):
+        found = sorted(({field: tx[field] for field in TXLIST_FIELDS} for tx in matches[wallet_address]), key=lambda tx: tx["hash"])
+        assert found == sorted(expected_matches(node.transactions, wallet_address, start, end), key=lambda tx: tx["hash"])
+    # One request per block and one per matched transaction, sent in batches
+    assert node.count("eth_getBlockByNumber") == end - start + 1
+    assert node.count("eth_getTransactionReceipt") == len({tx["hash"] for tx in node.transactions})
+
+
+def test_scan_is_bounded_and_resumable(node, rpc_client):
+    scanner = BlockScanner(rpc_client(node.url), [WALLET], reorg_depth=5, max_blocks=50)
+    matches, next_block, _ = run_sync(scanner.scan(node.first_block, node.head))
+    assert next_block == node.first_block + 50
+    found = [tx["hash"] for tx in matches.get(WALLET, [])]
+    assert found == [tx["hash"] for tx in expected_matches(node.transactions, WALLET, node.first_block, next_block - 1)]
+
+
+def test_reorg_deep_in_a_scan_rewinds_no_further_than_its_start(node, rpc_client):
+    scanner = BlockScanner(rpc_client(node.url), [WALLET], reorg_depth=12, max_blocks=10000)
+    start = node.first_block + 6
+    run_sync(scanner.scan(node.first_block, start - 1))
+    # The node switched branches while the batch was read: block start + 14 no longer builds on start + 13
+    node.blocks[start + 14]["parentHash"] = "0x" + "ff" * 32
+
+    matches, next_block, reorg = run_sync(scanner.scan(start, start + 14))
+    assert (matches, next_block, reorg) == ({}, start, True)
+
+
+def test_block_cycle_replaces_orphaned_transactions(node, rpc_client, store, etherscan_stub):
+    scanner = BlockScanner(rpc_client(node.url), [WALLET], reorg_depth=12, max_blocks=10000)
+    watched = sorted((tx for tx in node.transactions if WALLET in (tx["from"], tx["to"])), key=lambda tx: int(tx["blockNumber"]))
+    store.set_synced_block(WALLET, node.first_block - 1)
+    states = {WALLET: WalletDetectorState(WALLET, None)}
+    run_sync(block_cycle(store, states, scanner, node.first_block, node.head))
+    assert {tx["hash"] for tx in store.iter_transactions(WALLET)} == {tx["hash"] for tx in watched}
+
+    # The last block holding a wallet transaction is replaced by an empty one on a new branch
+    fork_block = int(watched[-1]["blockNumber"])
+    orphaned = {tx["hash"] for tx in watched if int(tx["blockNumber"]) >= fork_block}
+    node.fork(fork_block)
+    node.head += 1
+    node.add_block(node.head, [])
+    _, rewind, reorg = run_sync(block_cycle(store, states, scanner, node.head, node.head))
+    assert reorg and rewind <= node.head
+    _, next_block, reorg = run_sync(block_cycle(store, states, scanner, rewind, node.head, reorg=True))
+    assert (next_block, reorg) == (node.head + 1, False)
+    assert {tx["hash"] for tx in store.iter_transactions(WALLET)} == {tx["hash"] for tx in watched} - orphaned
+
+
+def test_block_cycle_advances_the_synced_block(node, rpc_client, store, etherscan_stub):
+    middle = (node.first_block + node.head) // 2
+    etherscan_stub.transactions[WALLET] = [tx for tx in node.transactions if WALLET in (tx["from"], tx["to"]) and int(tx["blockNumber"]) <= middle]
+    sync_wallet(store, WALLET)
+    scanner = BlockScanner(rpc_client(node.url), [WALLET, OTHER_WALLET], reorg_depth=12, max_blocks=10000)
+    states = {address: WalletDetectorState(address, None) for address in (WALLET, OTHER_WALLET)}
+    run_sync(block_cycle(store, states, scanner, middle + 1, node.head))
+
+    assert store.last_synced_block(WALLET) == node.head
+    assert store.last_synced_block(OTHER_WALLET) is None  # Never backfilled, its history is still missing
+    # A later Etherscan sync only fetches the blocks after the scan
+    etherscan_stub.transactions[WALLET] = [tx for tx in node.transactions if WALLET in (tx["from"], tx["to"])]
+    etherscan_stub.calls.clear()
+    sync_wallet(store, WALLET)
+    assert all(int(call["startblock"]) == node.head + 1 - REORG_DEPTH for call in etherscan_stub.calls if call["action"] == "txlist")
+    assert {tx["hash"] for tx in store.iter_transactions(WALLET)} == {tx["hash"] for tx in etherscan_stub.transactions[WALLET]}
+
+
+def test_node_requests_are_retried(node, rpc_client, monkeypatch):
+    monkeypatch.setattr(etherscan, "BACKOFF_BASE", 0.01)
+    client = rpc_client(node.url)
+    node.unavailable = 2
+    assert run_sync(client.get_block_number()) == hex(node.head)
+    assert client in etherscan._open_clients  # Closed with the Etherscan clients when the process exits
+
+    node.unavailable = MAX_RETRIES + 1
+    assert run_sync(client.get_block_number()) is None
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+import pytest
+
+from core import (BLACKLISTED_ADDRESSES, FREQUENT_TX_THRESHOLD, FREQUENT_TX_WINDOW, THRESHOLD_ETH, build_transaction_frame,
+                  detect_frequent_transactions, detect_suspicious_activity)
+from stubs import WALLET, make_transactions
+
+
+# Transactions inside some window of FREQUENT_TX_WINDOW seconds holding more than FREQUENT_TX_THRESHOLD transactions, by brute force
+def frequent_reference(timestamps, window=FREQUENT_TX_WINDOW, threshold=FREQUENT_TX_THRESHOLD):
+    bursts = [end for end in timestamps if sum(1 for t in timestamps if end - window < t <= end) > threshold]
+    return [any(end - window < t <= end for end in bursts) for t in timestamps]
+
+
+# The per-transaction loop detect_suspicious_activity replaced, with the sliding window Frequent Transaction rule
+# in place of the old `len(transactions) > 50` one
+def detect_reference(transactions, wallet_creation_date, wallet_balance, threshold=THRESHOLD_ETH):
+    suspicious_transactions = []
+    activity_counts = {issue: 0 for issue in [
+        "Blacklisted Address", "Self Transaction", "Failed Transaction", "High Gas Fee", "Frequent Transaction",
+        "High Spend with Low Balance", "Large Transaction", "Large Transaction for New Wallet", "Transaction Diversity",
+        "Repetitive Transactions"]}
+    unique_addresses = set()
+    repeated_addresses = {}
+    frequent = frequent_reference([int(tx["timeStamp"]) for tx in transactions])
+
+    def flag(issue, details, tx_hash=None):
+        finding = {"issue": issue, "details": details}
+        if tx_hash:
+            finding["tx_hash"] = tx_hash
+        suspicious_transactions.append(finding)
+        activity_counts[issue] += 1
+
+    for tx, is_frequent_tx in zip(transactions, frequent):
+        value_in_ether = int(tx["value"]) / (10 ** 18)
+        gas_fee_in_ether = int(tx["gasUsed"]) * int(tx["gasPrice"]) / (10 ** 18) if "gasUsed" in tx else 0
+        to_address = tx["to"].lower() if tx["to"] else None
+        from_address = tx["from"].lower()
+        if to_address in BLACKLISTED_ADDRESSES or from_address in BLACKLISTED_ADDRESSES:
+            flag("Blacklisted Address", f"Address: {to_address or from_address}", tx["hash"])
+        if to_address:
+            unique_addresses.add(to_address)
+            repeated_addresses[to_address] = repeated_addresses.get(to_address, 0) + 1
+        if from_address == to_address:
+            flag("Self Transaction", tx["to"], tx["hash"])
+        if tx["isError"] == "1":
+            flag("Failed Transaction", "Transaction failed", tx["hash"])
+        if gas_fee_in_ether > value_in_ether * 0.05:
+            flag("High Gas Fee", f"Fee: {gas_fee_in_ether:.4f} ETH", tx["hash"])
+        if is_frequent_tx:
+            flag("Frequent Transaction", f"More than {FREQUENT_TX_THRESHOLD} transactions within {FREQUENT_TX_WINDOW // 60} minutes", tx["hash"])
+        if wallet_balance < 0.1 and value_in_ether > wallet_balance * 0.5:
+            flag("High Spend with Low Balance", f"Value: {value_in_ether:.4f} ETH", tx["hash"])
+        if value_in_ether >= threshold:
+            flag("Large Transaction", f"Value: {value_in_ether:.4f} ETH", tx["hash"])
+        if value_in_ether >= threshold and wallet_creation_date >= time.time() - 30 * 24 * 60 * 60:
+            flag("Large Transaction for New Wallet", f"Value: {value_in_ether:.4f} ETH", tx["hash"])
+
+    if len(unique_addresses) > 100:
+        flag("Transaction Diversity", f"Interacted with {len(unique_addresses)} unique addresses")
+    for address, count in repeated_addresses.items():
+        if count > 10:
+            flag("Repetitive Transactions", f"Repeated interactions with {address} ({count} times)")
+    return suspicious_transactions, activity_counts
+
+
+@pytest.mark.parametrize("count, counterparties, seed", [(0, 5, 0), (40, 5, 1), (400, 30, 2), (600, 150, 3)])
+@pytest.mark.parametrize("wallet_balance", [0.05, 5.0])
+@pytest.mark.parametrize("new_wallet", [False, True])
+def test_matches_reference_loop(count, counterparties, seed, wallet_balance, new_wallet):
+    transactions = make_transactions(WALLET, count, counterparties, seed=seed)
+    if transactions:
+        del transactions[len(transactions) // 2]["gasUsed"]  # Older txlist results may lack gasUsed
+    wallet_creation_date = int(time.time()) - (86400 if new_wallet else 400 * 86400)
+
+    expected = detect_reference(transactions, wallet_creation_date, wallet_balance)
+    assert detect_suspicious_activity(transactions, wallet_creation_date, wallet_balance) == expected
+    assert detect_suspicious_activity(build_transaction_frame(transactions), wallet_creation_date, wallet_balance) == expected
+
+
+def test_fixtures_cover_every_rule():
+    transactions = make_transactions(WALLET, 600, 150, seed=3)
+    _, activity_counts = detect_suspicious_activity(transactions, int(time.time()), 0.05)
+    assert all(activity_counts.values()), activity_counts
+
+
+def test_frequent_transactions_window():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        timestamps = rng.integers(0, 4000, rng.integers(0, 60))
+        expected = frequent_reference(timestamps.tolist(), window=600, threshold=5)
+        assert detect_frequent_transactions(timestamps, window=600, threshold=5).tolist() == expected
@@ -0,0 +1,70 @@
+import json
+import time
+
+import pytest
+
+from core import WalletDetectorState, detect_suspicious_activity
+from stubs import WALLET, make_transactions
+
+
+# Feed the transactions in chunks, saving and restoring the state through JSON between chunks like the monitor does
+def feed(transactions, wallet_creation_date, wallet_balance, chunk_sizes, use_sketches=False):
+    state = WalletDetectorState(WALLET, wallet_creation_date, wallet_balance, use_sketches=use_sketches)
+    findings = []
+    position = 0
+    for size in chunk_sizes:
+        findings.extend(state.add_transactions(transactions[position:position + size]))
+        state = WalletDetectorState.from_dict(json.loads(json.dumps(state.to_dict())))
+        position += size
+    findings.extend(state.add_transactions(transactions[position:]))
+    return state, findings
+
+
+def per_transaction(findings):
+    return sorted((finding["issue"], finding["details"], finding["tx_hash"]) for finding in findings if "tx_hash" in finding)
+
+
+@pytest.mark.parametrize("count, counterparties, seed", [(40, 5, 1), (400, 30, 2), (600, 150, 3)])
+@pytest.mark.parametrize("chunk_sizes", [[], [1, 1, 7], [100, 3, 250]])
+@pytest.mark.parametrize("wallet_balance", [0.05, 5.0])
+def test_incremental_matches_batch(count, counterparties, seed, chunk_sizes, wallet_balance):
+    transactions = make_transactions(WALLET, count, counterparties, seed=seed)
+    wallet_creation_date = int(time.time()) - 86400
+    state, findings = feed(transactions, wallet_creation_date, wallet_balance, chunk_sizes)
+    suspicious_activities, activity_counts = detect_suspicious_activity(transactions, wallet_creation_date, wallet_balance)
+
+    assert state.activity_counts == activity_counts
+    assert state.transaction_count == len(transactions)
+    assert per_transaction(findings) == per_transaction(suspicious_activities)
+    # Whole-history rules fire once, when the threshold is crossed
+    assert sorted(finding["issue"] for finding in findings if "tx_hash" not in finding) == \
+        sorted(finding["issue"] for finding in suspicious_activities if "tx_hash" not in finding)
+
+
+def test_sketch_mode_matches_batch_on_small_wallets():
+    transactions = make_transactions(WALLET, 600, 150, seed=3)
+    state, _ = feed(transactions, None, 5.0, [200, 200], use_sketches=True)
+    _, activity_counts = detect_suspicious_activity(transactions, int(transactions[0]["timeStamp"]), 5.0, use_sketches=True)
+    assert state.activity_counts == activity_counts
+
+
+def test_sketch_mode_reports_an_evicted_address_once():
+    repeated = "0x" + "cc" * 20
+    others = ["0x%040x" % i for i in range(1, 301)]
+
+    def transaction(number, to_address):
+        return {"blockNumber": str(number), "timeStamp": str(1600000000 + number * 3600), "hash": "0x%064x" % number,
+                "from": WALLET, "to": to_address, "value": "1", "gasPrice": "1", "gasUsed": "21000", "isError": "0"}
+
+    addresses = [repeated] * 11 + [others[i % len(others)] for i in range(3900)] + [repeated] * 11
+    state = WalletDetectorState(WALLET, 1600000000, 5.0, use_sketches=True)
+    findings = []
+    for number, address in enumerate(addresses):
+        findings.extend(state.add_transaction(transaction(number, address)))
+        if number == 2000:
+            state = WalletDetectorState.from_dict(json.loads(json.dumps(state.to_dict())))
+
+    reported = [finding["details"].split()[3] for finding in findings if finding["issue"] == "Repetitive Transactions"]
+    assert reported.count(repeated) == 1
+    assert len(reported) == len(set(reported))
+    assert state.activity_counts["Repetitive Transactions"] == len(reported)
@@ -0,0 +1,49 @@
+from history import ScanHistory, top_findings
+
+COUNTS = {"Large Transaction": 1, "Failed Transaction": 0}
+FINDINGS = [{"issue": "Large Transaction", "details": "Value: 25.0000 ETH", "tx_hash": "0x01"}]
+
+
+def wallets(history):
+    return [entry["wallet"] for entry in history]
+
+
+def test_least_recently_scanned_wallet_is_evicted_first():
+    history = ScanHistory(capacity=3)
+    for wallet_address in ["0xa", "0xb", "0xc"]:
+        history.record(wallet_address, 1.0, COUNTS, FINDINGS)
+    history.record("0xA", 2.0, COUNTS, FINDINGS)  # A rescan replaces the entry and moves it to the front
+    history.record("0xd", 1.0, COUNTS, FINDINGS)
+    assert wallets(history) == ["0xd", "0xA", "0xc"]
+    assert len(history) == 3
+
+
+def test_repeating_the_latest_scan_is_a_no_op(store):
+    history = ScanHistory(capacity=3, store=store)
+    first = history.record("0xa", 1.0, COUNTS, FINDINGS)
+    saved = store.scan_summaries(3)
+    assert history.record("0xa", 1.0, COUNTS, FINDINGS) is first
+    assert store.scan_summaries(3) == saved
+
+    # The same scan after another wallet is a new entry, and so is a changed scan
+    history.record("0xb", 1.0, COUNTS, FINDINGS)
+    assert history.record("0xa", 1.0, COUNTS, FINDINGS) is not first
+    assert history.record("0xa", 1.0, COUNTS, []) is not first
+    assert wallets(history) == ["0xa", "0xb"]
+
+
+def test_persisted_history_is_bounded_and_reloaded(store):
+    history = ScanHistory(capacity=2, store=store)
+    for wallet_address in ["0xa", "0xb", "0xc"]:
+        history.record(wallet_address, 1.0, COUNTS, FINDINGS)
+    assert wallets(ScanHistory(capacity=2, store=store)) == ["0xc", "0xb"]
+
+    history.clear()
+    assert len(history) == 0 and len(ScanHistory(capacity=2, store=store)) == 0
+
+
+def test_top_findings_take_turns_across_issues():
+    findings = [{"issue": "Failed Transaction", "details": str(i), "tx_hash": f"0x{i}"} for i in range(10)]
+    findings.append({"issue": "Transaction Diversity", "details": "Interacted with 101 unique addresses"})
+    assert [(finding["issue"], finding["details"]) for finding in top_findings(findings, 3)] == [
+        ("Failed Transaction", "0"), ("Transaction Diversity", "Interacted with 101 unique addresses"), ("Failed Transaction", "1")]
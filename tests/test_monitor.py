@@ -0,0 +1,84 @@
+import pytest
+
+from core import detect_suspicious_activity, sync_wallet
+from etherscan import run_sync
+from monitor import monitor_cycle
+from stubs import WALLET, make_transactions
+
+
+@pytest.mark.parametrize("use_sketches", [False, True])
+def test_wallet_synced_elsewhere_counts_new_transactions_once(etherscan_stub, store, use_sketches):
+    transactions = make_transactions(WALLET, 300, counterparties=150, seed=6)
+    etherscan_stub.transactions[WALLET] = transactions[:250]
+    sync_wallet(store, WALLET)  # Synced by the app or a batch scan, without a detector state
+
+    etherscan_stub.transactions[WALLET] = transactions
+    states = {}
+    run_sync(monitor_cycle(store, states, [WALLET], head=99999999, use_sketches=use_sketches))
+
+    state = states[WALLET]
+    assert state.transaction_count == len(transactions)
+    _, activity_counts = detect_suspicious_activity(transactions, state.wallet_creation_date, state.wallet_balance, use_sketches=use_sketches)
+    assert state.activity_counts == activity_counts
+
+
+def test_rebuilt_state_applies_the_balance_rule_to_new_transactions_only(etherscan_stub, store):
+    etherscan_stub.balance = 5 * 10 ** 16  # 0.05 ETH
+    transactions = make_transactions(WALLET, 300, seed=11)
+    etherscan_stub.transactions[WALLET] = transactions[:250]
+    sync_wallet(store, WALLET)
+
+    etherscan_stub.transactions[WALLET] = transactions
+    states = {}
+    run_sync(monitor_cycle(store, states, [WALLET], head=99999999))
+    _, activity_counts = detect_suspicious_activity(transactions[250:], None, 0.05)
+    assert states[WALLET].activity_counts["High Spend with Low Balance"] == activity_counts["High Spend with Low Balance"] > 0
+
+
+def test_backfilled_wallet_is_loaded_without_alerts(etherscan_stub, store, capsys):
+    transactions = make_transactions(WALLET, 200, seed=7)
+    etherscan_stub.transactions[WALLET] = transactions
+    states = {}
+    assert run_sync(monitor_cycle(store, states, [WALLET], head=int(transactions[-1]["blockNumber"]))) == 0
+    assert states[WALLET].transaction_count == len(transactions)
+    assert store.load_detector_state(WALLET)["transaction_count"] == len(transactions)
+
+    # The next cycle alerts on the new transactions only
+    new_transactions = make_transactions(WALLET, 30, start_block=100000, seed=8)
+    etherscan_stub.transactions[WALLET] = transactions + new_transactions
+    run_sync(monitor_cycle(store, states, [WALLET], head=int(new_transactions[-1]["blockNumber"])))
+    assert states[WALLET].transaction_count == len(transactions) + 30
+
+
+def test_failed_fetch_keeps_the_stored_history(etherscan_stub, store):
+    transactions = make_transactions(WALLET, 200, seed=9)
+    head = int(transactions[-1]["blockNumber"])
+    etherscan_stub.transactions[WALLET] = transactions
+    states = {}
+    run_sync(monitor_cycle(store, states, [WALLET], head=head))
+
+    # A cycle whose txlist call fails changes nothing
+    etherscan_stub.failing.add("txlist")
+    assert run_sync(monitor_cycle(store, states, [WALLET], head=head + 1)) == 0
+    assert list(store.iter_transactions(WALLET)) == transactions
+    assert store.last_synced_block(WALLET) == head
+
+    # The next cycle fetches the same blocks again and finds nothing new
+    etherscan_stub.failing.clear()
+    assert run_sync(monitor_cycle(store, states, [WALLET], head=head + 2)) == 0
+    assert states[WALLET].transaction_count == len(transactions)
+    assert store.last_synced_block(WALLET) == head + 2
+
+
+def test_failed_backfill_is_retried(etherscan_stub, store):
+    transactions = make_transactions(WALLET, 200, seed=10)
+    head = int(transactions[-1]["blockNumber"])
+    etherscan_stub.transactions[WALLET] = transactions
+    etherscan_stub.failing.add("txlist")
+    states = {}
+    run_sync(monitor_cycle(store, states, [WALLET], head=head))
+    assert WALLET not in states and store.last_synced_block(WALLET) is None
+
+    etherscan_stub.failing.clear()
+    assert run_sync(monitor_cycle(store, states, [WALLET], head=head)) == 0
+    assert states[WALLET].transaction_count == len(transactions)
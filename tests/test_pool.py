@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from core import WalletDetectorState, detect_suspicious_activity, scan_result, scan_wallets, sync_wallet
+from etherscan import run_sync
+from monitor import load_detector_states
+from pool import DetectionPool, _build_states, _scan_shard, pack_transactions
+from stubs import WALLET, make_transactions
+
+WALLETS = ["0x%040x" % i for i in range(1, 8)]
+
+
+# Transactions of several wallets, one without any and one with a transaction lacking gasUsed
+def wallet_transactions():
+    groups = [make_transactions(wallet_address, 40 * i, counterparties=10 * i, seed=i) for i, wallet_address in enumerate(WALLETS)]
+    del groups[3][5]["gasUsed"]
+    return groups
+
+
+# Run a worker function in this process on a shard packed into shared memory, like the pool's workers do
+def run_worker(function, groups, jobs):
+    block, layout = pack_transactions(groups)
+    try:
+        return function(layout, jobs)
+    finally:
+        block.close()
+        block.unlink()
+
+
+@pytest.mark.parametrize("wallet_balance", [0.05, 5.0, None])
+def test_scan_shard_matches_in_process_detection(wallet_balance):
+    groups = wallet_transactions()
+    creation = int(time.time()) - 86400
+    jobs = [(wallet_address, wallet_balance, creation) for wallet_address in WALLETS]
+    expected = [scan_result(wallet_address, wallet_balance, len(transactions), *detect_suspicious_activity(transactions, creation, wallet_balance))
+                for wallet_address, transactions in zip(WALLETS, groups)]
+    assert run_worker(_scan_shard, groups, jobs) == expected
+
+
+@pytest.mark.parametrize("use_sketches", [False, True])
+def test_build_states_matches_in_process_states(use_sketches):
+    groups = wallet_transactions()
+    creation = int(time.time()) - 86400
+    expected = []
+    for wallet_address, transactions in zip(WALLETS, groups):
+        state = WalletDetectorState(wallet_address, creation, use_sketches=use_sketches)
+        state.add_transactions(transactions)
+        expected.append(state.to_dict())
+    assert run_worker(_build_states, groups, [(wallet_address, creation, use_sketches) for wallet_address in WALLETS]) == expected
+
+
+def test_pool_matches_the_in_process_scan_and_state_rebuild(etherscan_stub, store):
+    for wallet_address, transactions in zip(WALLETS, wallet_transactions()):
+        etherscan_stub.transactions[wallet_address] = transactions
+    wallet_addresses = WALLETS + [WALLET]
+    expected = scan_wallets(wallet_addresses, count=100)
+    for wallet_address in WALLETS:
+        sync_wallet(store, wallet_address)
+    expected_states = [state.to_dict() for state in run_sync(load_detector_states(store, WALLETS))]
+
+    pool = DetectionPool(2, shard_size=3)
+    try:
+        results = scan_wallets(wallet_addresses, count=100, pool=pool)
+        states = run_sync(load_detector_states(store, WALLETS, pool=pool))
+    finally:
+        pool.close()
+    assert sorted(results, key=lambda result: result["wallet"]) == sorted(expected, key=lambda result: result["wallet"])
+    assert [state.to_dict() for state in states] == expected_states
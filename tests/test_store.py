@@ -0,0 +1,32 @@
+import pytest
+
+from store import ROLLUP_RESOLUTIONS, TransactionStore
+from stubs import WALLET, make_transactions
+
+
+# Rollups of a fresh store holding `transactions`, aggregated in one go
+def full_rollups(path, transactions):
+    store = TransactionStore(str(path))
+    store.add_transactions(WALLET, transactions)
+    store.refresh_rollups(WALLET, 0)
+    rollups = {resolution: store.rollups(WALLET, resolution) for resolution in ROLLUP_RESOLUTIONS}
+    store.close()
+    return rollups
+
+
+@pytest.mark.parametrize("replacement_count", [0, 80])
+def test_refresh_after_a_partial_drop_matches_a_full_rebuild(store, tmp_path, replacement_count):
+    transactions = make_transactions(WALLET, 400, seed=12)
+    store.add_transactions(WALLET, transactions)
+    store.refresh_rollups(WALLET, 0)
+
+    # Replace the tail from a block in the middle of an hour, like a sync after a reorganisation
+    cut = int(transactions[300]["blockNumber"])
+    replacement = make_transactions(WALLET, replacement_count, start_block=cut, seed=13)
+    since = store.replace_from_block(WALLET, cut, replacement)
+    store.refresh_rollups(WALLET, min([since] + [int(tx["timeStamp"]) for tx in replacement]))
+
+    kept = [tx for tx in transactions if int(tx["blockNumber"]) < cut]
+    expected = full_rollups(tmp_path / "fresh.db", kept + replacement)
+    for resolution in ROLLUP_RESOLUTIONS:
+        assert store.rollups(WALLET, resolution) == [pytest.approx(row) for row in expected[resolution]]
@@ -0,0 +1,90 @@
+import asyncio
+
+import core
+import stubs
+from core import REORG_DEPTH, fetch_recent_transactions, fetch_wallet_data, get_balance, iter_transactions, scan_wallets, sync_wallet
+from etherscan import MAX_RETRIES, run_sync
+from stubs import WALLET, make_transactions
+
+
+def test_iter_transactions_walks_past_the_result_window(etherscan_stub, monkeypatch):
+    monkeypatch.setattr(stubs, "ETHERSCAN_RESULT_WINDOW", 50)
+    transactions = make_transactions(WALLET, 300, seed=1)
+    etherscan_stub.transactions[WALLET] = transactions
+
+    assert list(iter_transactions(WALLET, page_size=20)) == transactions
+    assert list(iter_transactions(WALLET, page_size=20, sort="desc")) == transactions[::-1]
+    assert fetch_recent_transactions(WALLET, 35) == transactions[::-1][:35]
+
+
+def test_sync_stores_history_and_reports_only_new_transactions(etherscan_stub, store):
+    transactions = make_transactions(WALLET, 250, seed=2)
+    etherscan_stub.transactions[WALLET] = transactions[:200]
+    assert sync_wallet(store, WALLET) == int(transactions[199]["blockNumber"])
+    assert list(store.iter_transactions(WALLET)) == transactions[:200]
+
+    etherscan_stub.transactions[WALLET] = transactions
+    etherscan_stub.calls.clear()
+    new_transactions = []
+    sync_wallet(store, WALLET, on_new_transactions=new_transactions.extend)
+    assert list(store.iter_transactions(WALLET)) == transactions
+    assert new_transactions == transactions[200:]
+    # Only the blocks after the last sync, less the reorg margin, are requested again
+    assert all(int(call["startblock"]) > int(transactions[0]["blockNumber"]) for call in etherscan_stub.calls if call["action"] == "txlist")
+
+
+def test_sync_records_the_block_it_covered(etherscan_stub, store, monkeypatch):
+    transactions = make_transactions(WALLET, 50, seed=7)
+    etherscan_stub.transactions[WALLET] = transactions
+    etherscan_stub.head = int(transactions[-1]["blockNumber"]) + 100
+    assert sync_wallet(store, WALLET) == etherscan_stub.head
+    assert store.last_synced_block(WALLET) == etherscan_stub.head
+
+    # The next sync only reads the blocks after the head, less the reorg margin, and leaves the stored history alone
+    refreshed = []
+    monkeypatch.setattr(store, "refresh_rollups", lambda *args: refreshed.append(args))
+    etherscan_stub.calls.clear()
+    assert sync_wallet(store, WALLET, endblock=etherscan_stub.head + 5) == etherscan_stub.head + 5
+    [call] = [call for call in etherscan_stub.calls if call["action"] == "txlist"]
+    assert (int(call["startblock"]), int(call["endblock"])) == (etherscan_stub.head + 1 - REORG_DEPTH, etherscan_stub.head + 5)
+    assert refreshed == []
+    assert list(store.iter_transactions(WALLET)) == transactions
+
+
+def test_first_view_reads_one_page_and_backfills_in_background(etherscan_stub, store):
+    transactions = make_transactions(WALLET, 2500, seed=3)
+    etherscan_stub.transactions[WALLET] = transactions
+
+    balance, recent = fetch_wallet_data(WALLET, 100)
+    assert balance == 2.0
+    assert recent == transactions[::-1][:100]
+    first_call = [call for call in etherscan_stub.calls if call["action"] == "txlist"][0]
+    assert (first_call["sort"], first_call["offset"]) == ("desc", "100")
+
+    run_sync(asyncio.wait_for(core._backfills[WALLET], 30))
+    assert list(store.iter_transactions(WALLET)) == transactions
+    # Later views read the store and only sync the newest blocks
+    etherscan_stub.calls.clear()
+    assert fetch_wallet_data(WALLET, 100)[1] == transactions[::-1][:100]
+    assert etherscan_stub.count("txlist") == 1
+
+
+def test_batch_scan_of_new_wallets_is_bounded(etherscan_stub, store):
+    wallets = ["0x%040x" % i for i in range(1, 6)]
+    for seed, wallet_address in enumerate(wallets):
+        etherscan_stub.transactions[wallet_address] = make_transactions(wallet_address, 1500, seed=seed)
+
+    results = scan_wallets(wallets, count=50)
+    assert [result["transaction_count"] for result in results] == [50] * len(wallets)
+    # One page of recent transactions and one creation date lookup per wallet, nothing is backfilled
+    assert etherscan_stub.count("txlist") == 2 * len(wallets)
+    assert all(store.last_synced_block(wallet_address) is None for wallet_address in wallets)
+
+
+def test_rate_limited_calls_are_retried(etherscan_stub):
+    etherscan_stub.rate_limited = 2
+    assert get_balance(WALLET) == 2.0
+    assert etherscan_stub.count("balance") == 3
+
+    etherscan_stub.rate_limited = MAX_RETRIES + 1
+    assert get_balance(WALLET) is None
@@ -1,583 +1,100 @@
 import streamlit as st
-import requests
-import time
-from web3 import Web3
-import plotly.graph_objects as go
-import plotly.express as px
-import numpy as np
 import pandas as pd
-import networkx as nx
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-
-bright_colors = ['#FF007F', '#FFB400', '#00FF7F', '#00D9FF', '#FF7F00', '#FF00FF', '#FFFF00', '#00FF00']
-
-# Set up your Etherscan and Infura API keys
-INFURA_URL = "https://mainnet.infura.io/v3/INFURAAPIKEY"
-ETHERSCAN_API_KEY = "ETHERSCAN API KEY"
+from core import (TRANSACTION_COUNT, batch_summary_rows, build_transaction_frame, detect_suspicious_activity, fetch_wallet_data,
+                  generate_detailed_security_summary, get_latest_block, get_wallet_creation_date, load_rollups, read_wallet_addresses,
+                  scan_wallets, send_email)
+from history import PERSIST_HISTORY, ScanHistory
+from metrics import metrics, snapshot_delta, timed
+from rendering import (build_transaction_table, plot_address_interaction_network, plot_cumulative_transaction_value,
+                       plot_gas_fee_distribution, plot_pie_chart, plot_spend_vs_balance, plot_top_5_largest_transactions,
+                       plot_transaction_activity_timeline, plot_transaction_count_over_time, plot_transaction_heatmap,
+                       plot_transaction_success_rate, plot_transaction_value_bar_chart, plot_transaction_value_distribution,
+                       plot_transaction_value_trend)
+from store import get_store
+
+# Streamlit app. Fetching and detection live in core.py, figures and the table frame in rendering.py.
 WALLET_ADDRESS = "PUT WALLET ADDDRESS TO TEST"
-TRANSACTION_COUNT = 100  # Adjust the number of transactions to fetch
-THRESHOLD_ETH = 10  # Set threshold for large transactions in ETH
-
-# Set up Web3 instance to interact with the blockchain
-web3 = Web3(Web3.HTTPProvider(INFURA_URL))
-
-# Example of a set of blacklisted addresses
-BLACKLISTED_ADDRESSES = {
-    "0x0000000000000000000000000000000000000000",
-    "0x1111111111111111111111111111111111111111"
+BLOCK_HEIGHT_TTL = 30  # Seconds the latest block number is cached, scans are keyed by (address, block height)
+SCAN_CACHE_TTL = 600  # Seconds fetched wallet data and detection results stay cached
+FIGURE_CACHE_TTL = 600  # Seconds built charts stay cached
+CACHE_MAX_ENTRIES = 32  # Wallet scans kept per cache before the oldest are evicted
+TABLE_PAGE_SIZE = 50  # Rows of the transactions table sent to the browser at a time
+
+# Number formats of the transactions table, applied by the browser instead of per-cell string formatting
+TRANSACTION_TABLE_CONFIG = {
+    'Value (ETH)': st.column_config.NumberColumn(format="%.4f"),
+    'Gas Price (ETH)': st.column_config.NumberColumn(format="%.10f"),
+    'Gas Used (ETH)': st.column_config.NumberColumn(format="%.10f")
 }
 
-# Function to fetch wallet balance from Etherscan
-def get_balance(wallet_address):
-    url = f"https://api.etherscan.io/api?module=account&action=balance&address={wallet_address}&tag=latest&apikey={ETHERSCAN_API_KEY}"
-    response = requests.get(url)
-    data = response.json()
-    if data["status"] == "1":
-        return int(data["result"]) / (10 ** 18)  # Convert from Wei to Ether
-    else:
-        print(f"Error fetching balance from Etherscan: {data['message']}")
-        return 0.0
-
-# Function to fetch recent transactions from Etherscan
-def fetch_recent_transactions(wallet_address, count=10):
-    url = f"https://api.etherscan.io/api?module=account&action=txlist&address={wallet_address}&startblock=0&endblock=99999999&page=1&offset={count}&sort=desc&apikey={ETHERSCAN_API_KEY}"
-    response = requests.get(url)
-    data = response.json()
-    if data["status"] == "1":
-        return data["result"][:count]  # Return the top `count` transactions
-    else:
-        print(f"Error fetching transactions from Etherscan: {data['message']}")
-        return []
-
-# Function to detect suspicious activity in transactions
-def detect_suspicious_activity(transactions, wallet_creation_date, wallet_balance, threshold=THRESHOLD_ETH):
-    suspicious_transactions = []
-    activity_counts = {
-        "Blacklisted Address": 0,
-        "Self Transaction": 0,
-        "Failed Transaction": 0,
-        "High Gas Fee": 0,
-        "Frequent Transaction": 0,
-        "High Spend with Low Balance": 0,
-        "Large Transaction": 0,
-        "Large Transaction for New Wallet": 0,
-        "Transaction Diversity": 0,
-        "Repetitive Transactions": 0
-    }
-
-    unique_addresses = set()
-    repeated_addresses = {}
-
-    for tx in transactions:
-        value_in_ether = int(tx["value"]) / (10 ** 18)
-        gas_price_in_ether = int(tx["gasPrice"]) / (10 ** 18)
-        gas_fee_in_ether = int(tx["gasUsed"]) * int(tx["gasPrice"]) / (10 ** 18) if "gasUsed" in tx else 0
-        to_address = tx["to"].lower() if tx["to"] else None
-        from_address = tx["from"].lower()
-
-        # Check for blacklisted addresses
-        if to_address in BLACKLISTED_ADDRESSES or from_address in BLACKLISTED_ADDRESSES:
-            suspicious_transactions.append(
-                {"issue": "Blacklisted Address", "details": f"Address: {to_address or from_address}", "tx_hash": tx["hash"]})
-            activity_counts["Blacklisted Address"] += 1
-
-        # Track unique and repeated addresses
-        if to_address:
-            unique_addresses.add(to_address)
-            repeated_addresses[to_address] = repeated_addresses.get(to_address, 0) + 1
-
-        # Check for suspicious patterns
-        is_self_transaction = from_address == to_address
-        is_failed_transaction = tx["isError"] == "1"
-        is_high_fee = gas_fee_in_ether > (value_in_ether * 0.05)  # Fee > 5% of value
-        is_frequent_tx = len(transactions) > 50  # Excessive transactions in a short time
-        is_low_balance_high_spend = wallet_balance < 0.1 and value_in_ether > wallet_balance * 0.5  # High spend with low balance
-        is_large_transaction = value_in_ether >= threshold
-        is_new_wallet_large_tx = value_in_ether >= threshold and wallet_creation_date >= time.time() - 30 * 24 * 60 * 60  # Large TX for new wallets
-
-        # Add suspicious transaction details
-        if is_self_transaction:
-            suspicious_transactions.append({"issue": "Self Transaction", "details": tx["to"], "tx_hash": tx["hash"]})
-            activity_counts["Self Transaction"] += 1
-        if is_failed_transaction:
-            suspicious_transactions.append({"issue": "Failed Transaction", "details": "Transaction failed", "tx_hash": tx["hash"]})
-            activity_counts["Failed Transaction"] += 1
-        if is_high_fee:
-            suspicious_transactions.append({"issue": "High Gas Fee", "details": f"Fee: {gas_fee_in_ether:.4f} ETH", "tx_hash": tx["hash"]})
-            activity_counts["High Gas Fee"] += 1
-        if is_frequent_tx:
-            suspicious_transactions.append({"issue": "Frequent Transaction", "details": "Excessive transaction activity", "tx_hash": tx["hash"]})
-            activity_counts["Frequent Transaction"] += 1
-        if is_low_balance_high_spend:
-            suspicious_transactions.append({"issue": "High Spend with Low Balance", "details": f"Value: {value_in_ether:.4f} ETH", "tx_hash": tx["hash"]})
-            activity_counts["High Spend with Low Balance"] += 1
-        if is_large_transaction:
-            suspicious_transactions.append({"issue": "Large Transaction", "details": f"Value: {value_in_ether:.4f} ETH", "tx_hash": tx["hash"]})
-            activity_counts["Large Transaction"] += 1
-        if is_new_wallet_large_tx:
-            suspicious_transactions.append({"issue": "Large Transaction for New Wallet", "details": f"Value: {value_in_ether:.4f} ETH", "tx_hash": tx["hash"]})
-            activity_counts["Large Transaction for New Wallet"] += 1
-
-    # Check for transaction diversity (too many unique addresses)
-    if len(unique_addresses) > 100:
-        suspicious_transactions.append({"issue": "Transaction Diversity", "details": f"Interacted with {len(unique_addresses)} unique addresses"})
-        activity_counts["Transaction Diversity"] += 1
-
-    # Check for repetitive patterns (too many interactions with the same address)
-    for address, count in repeated_addresses.items():
-        if count > 10:  # Arbitrary threshold for repetitive transactions
-            suspicious_transactions.append({"issue": "Repetitive Transactions", "details": f"Repeated interactions with {address} ({count} times)"})
-            activity_counts["Repetitive Transactions"] += 1
-
-    return suspicious_transactions, activity_counts
-
-def generate_detailed_security_summary(activity_counts, suspicious_activities):
-    summary = []
-    
-    # Security Risk Levels
-    def risk_level(count, activity_type):
-        if count > 0:
-            if activity_type in ["Large Transaction", "Failed Transaction", "High Spend with Low Balance"]:
-                return "High Risk"
-            elif activity_type in ["Frequent Transaction", "Repetitive Transactions", "Transaction Diversity"]:
-                return "Medium Risk"
-            else:
-                return "Low Risk"
-        return "No Issues"
-
-    # Security Overview
-    summary.append("### Security Overview:")
-    
-    # 1. Blacklisted Address
-    if activity_counts["Blacklisted Address"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Blacklisted Address'], 'Blacklisted Address')}**: "
-                       "This wallet has interacted with one or more blacklisted addresses. "
-                       "Blacklisted addresses are typically associated with fraudulent or suspicious activities, "
-                       "such as money laundering or scam operations. It is highly advised not to send funds to this wallet if it has interacted with any blacklisted addresses.")
-    
-    # 2. Self Transactions
-    if activity_counts["Self Transaction"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Self Transaction'], 'Self Transaction')}**: "
-                       "There have been self-transactions detected in the wallet. "
-                       "Self-transactions often point to attempts to hide the true source or destination of funds, or they might be used to obfuscate the wallet's activity trail. "
-                       "These transactions can indicate potential laundering behavior or other illicit activities. Review the transactions carefully for unusual patterns.")
-    
-    # 3. Failed Transactions
-    if activity_counts["Failed Transaction"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Failed Transaction'], 'Failed Transaction')}**: "
-                       "There are failed transactions associated with this wallet. "
-                       "While occasional failures can occur due to network issues, persistent failures can indicate problems with the wallet's security, "
-                       "incorrect contract interaction, or deliberate attempts to disrupt transaction history. Consider verifying the wallet's health and connection status.")
-    
-    # 4. High Gas Fee
-    if activity_counts["High Gas Fee"] > 0:
-        summary.append(f"**{risk_level(activity_counts['High Gas Fee'], 'High Gas Fee')}**: "
-                       "Certain transactions have been executed with disproportionately high gas fees (greater than 5% of the transaction value). "
-                       "This can be a sign of either an intentional attempt to drain funds with high costs or errors in contract interaction. "
-                       "It is recommended to monitor future gas fees closely and avoid engaging in transactions with excessively high fees.")
-    
-    # 5. Frequent Transactions
-    if activity_counts["Frequent Transaction"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Frequent Transaction'], 'Frequent Transaction')}**: "
-                       "This wallet has made a high frequency of transactions within a short period. "
-                       "Frequent transactions might indicate an automated system or bot operating the wallet, which could be a sign of fraudulent activities like phishing, or other malicious use cases. "
-                       "Carefully evaluate the nature of each transaction to determine if this is suspicious or abnormal activity.")
-    
-    # 6. High Spend with Low Balance
-    if activity_counts["High Spend with Low Balance"] > 0:
-        summary.append(f"**{risk_level(activity_counts['High Spend with Low Balance'], 'High Spend with Low Balance')}**: "
-                       "The wallet is spending a large portion of its balance despite having a relatively low overall balance. "
-                       "This could indicate reckless spending behavior or, in some cases, attempts to drain the wallet’s funds rapidly. "
-                       "If you are the owner or a potential counterparty, consider re-evaluating the wallet's current financial stability and assess any pending transactions.")
-    
-    # 7. Large Transactions
-    if activity_counts["Large Transaction"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Large Transaction'], 'Large Transaction')}**: "
-                       "This wallet has been involved in transactions of unusually large amounts. "
-                       "Large transfers often indicate high-value transfers that could be linked to illicit activities, including large-scale fraud or asset concealment. "
-                       "If you are considering interacting with this wallet, exercise extra caution, verify the source of funds, and assess the legitimacy of the transaction.")
-    
-    # 8. Large Transaction for New Wallet
-    if activity_counts["Large Transaction for New Wallet"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Large Transaction for New Wallet'], 'Large Transaction for New Wallet')}**: "
-                       "A large transaction was detected soon after the wallet was created. "
-                       "New wallets making large transactions could be an indication of suspicious behavior or attempts to quickly launder funds. "
-                       "This behavior warrants a higher level of scrutiny before interacting with this wallet.")
-    
-    # 9. Transaction Diversity
-    if activity_counts["Transaction Diversity"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Transaction Diversity'], 'Transaction Diversity')}**: "
-                       "This wallet has interacted with an unusually large number of unique addresses. "
-                       "While diversification in transaction partners can be normal, this could also suggest an attempt to obfuscate the wallet’s activities or involve it in diverse operations that could be illicit. "
-                       "Investigating the pattern of address interactions is recommended.")
-    
-    # 10. Repetitive Transactions
-    if activity_counts["Repetitive Transactions"] > 0:
-        summary.append(f"**{risk_level(activity_counts['Repetitive Transactions'], 'Repetitive Transactions')}**: "
-                       "The wallet has made multiple repetitive transactions with the same address. "
-                       "Repeated interactions could suggest a controlled operation or targeted manipulation of the wallet, potentially for fraudulent activities. "
-                       "Check the recipient addresses for known suspicious or untrustworthy entities.")
-
-    # Recommendations for Interaction
-    summary.append("\n### Recommendations for Interaction:")
-    summary.append("1. **Avoid Interaction with High-Risk Patterns**: Avoid interacting with this wallet if you notice any blacklisted addresses or high-risk behavior, like self-transactions or large/failed transactions.")
-    summary.append("2. **Verify Sources and Destinations**: Confirm the legitimacy of large transactions and verify any involved addresses before sending funds.")
-    summary.append("3. **Monitor Gas Fees**: Keep an eye on gas fees and avoid transactions with excessive costs unless absolutely necessary.")
-    summary.append("4. **Consider Further Investigation**: It is advisable to conduct a more in-depth investigation if you are unsure about the wallet’s legitimacy or transactions.")
-    summary.append("5. **Seek Professional Advice**: If you're dealing with significant amounts of funds, consider consulting a blockchain security expert or using blockchain forensics services.")
-
-    return "\n".join(summary)
-
-# Function to plot pie chart with animation
-def plot_pie_chart(activity_counts):
-    labels = list(activity_counts.keys())
-    values = list(activity_counts.values())
-    
-    fig = go.Figure(data=[go.Pie(labels=labels, values=values, hole=0.4, pull=[0.1]*len(values), 
-                                 rotation=90, marker=dict(colors=bright_colors))])
-    
-    fig.update_traces(hoverinfo='label+percent', textinfo='value', textfont_size=20, 
-                      hoverlabel=dict(bgcolor="rgba(0, 0, 0, 0.7)", font_size=16, font_color="white"))
-    
-    fig.update_layout(
-        title="Distribution of Security Issues",
-        title_x=0.5,
-        transition_duration=500,
-        transition_easing="cubic-in-out",
-        autosize=True,
-        plot_bgcolor="#2E3440",  # Dark background color for the chart
-        paper_bgcolor="#2E3440",
-        font=dict(family="Roboto, sans-serif", color="white"),
-        margin=dict(l=0, r=0, b=0, t=40)
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-
-# Additional Visualizations (Bar chart, Heatmap, Histogram, etc.)
-
-# Plot bar chart of transaction values
-def plot_transaction_value_bar_chart(transactions):
-    values = [int(tx["value"]) / 10**18 for tx in transactions]
-    tx_hashes = [tx["hash"] for tx in transactions]
-
-    fig = go.Figure(data=[go.Bar(x=tx_hashes, y=values, marker=dict(color=bright_colors[1]))])
-    
-    fig.update_layout(
-        title="Transaction Values",
-        xaxis_title="Transaction Hash",
-        yaxis_title="ETH",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white"),
-        showlegend=False
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# Plot heatmap for transaction times
-def plot_transaction_heatmap(transactions):
-    times = [int(tx["timeStamp"]) for tx in transactions]
-    times = pd.to_datetime(times, unit='s')
-    hours = times.hour
-
-    fig = px.histogram(hours, x=hours, nbins=24, color_discrete_sequence=bright_colors)
-    fig.update_layout(
-        title="Transaction Activity Heatmap (Hour of the Day)",
-        xaxis_title="Hour of Day",
-        yaxis_title="Transaction Count",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# Plot spend vs balance line chart
-def plot_spend_vs_balance(transactions, wallet_balance):
-    spend = [int(tx["value"]) / 10**18 for tx in transactions]
-    dates = [pd.to_datetime(int(tx["timeStamp"]), unit='s') for tx in transactions]
-    
-    df = pd.DataFrame({
-        'Date': dates,
-        'Spend': spend,
-        'Balance': [wallet_balance] * len(transactions)
-    })
-    
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=df['Date'], y=df['Spend'], mode='lines', name='Spend', line=dict(color=bright_colors[0])))
-    fig.add_trace(go.Scatter(x=df['Date'], y=df['Balance'], mode='lines', name='Balance', line=dict(color=bright_colors[4])))
-    
-    fig.update_layout(
-        title="Spend vs Balance",
-        xaxis_title="Date",
-        yaxis_title="ETH",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    
-import pandas as pd
-
-def plot_transaction_count_over_time(transactions):
-    times = [int(tx["timeStamp"]) for tx in transactions]
-    times = pd.to_datetime(times, unit='s')
-
-    times_dates = pd.Series(times.date)
-
-    transaction_counts = times_dates.value_counts().sort_index()
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=transaction_counts.index, y=transaction_counts.values, mode='lines', 
-                             name='Transaction Count', line=dict(color=bright_colors[3], width=4)))
-
-    fig.update_layout(
-        title="Transaction Count Over Time",
-        xaxis_title="Date",
-        yaxis_title="Number of Transactions",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-
-
-
-# 2. Plot top 5 largest transactions (Bar Chart)
-def plot_top_5_largest_transactions(transactions):
-    transactions_sorted = sorted(transactions, key=lambda tx: int(tx["value"]), reverse=True)[:5]
-    values = [int(tx["value"]) / 10**18 for tx in transactions_sorted]
-    tx_hashes = [tx["hash"] for tx in transactions_sorted]
-    
-    fig = go.Figure(data=[go.Bar(x=tx_hashes, y=values, marker=dict(color='#81A1C1'))])
-    fig.update_layout(
-        title="Top 5 Largest Transactions",
-        xaxis_title="Transaction Hash",
-        yaxis_title="ETH",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white"),
-        showlegend=False,
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# 3. Plot transaction value distribution (Histogram)
-def plot_transaction_value_distribution(transactions):
-    values = [int(tx["value"]) / 10**18 for tx in transactions]
-
-    fig = px.histogram(values, nbins=50, color_discrete_sequence=["#81A1C1"])
-    fig.update_layout(
-        title="Transaction Value Distribution",
-        xaxis_title="Transaction Value (ETH)",
-        yaxis_title="Frequency",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# 4. Plot gas fee distribution (Histogram)
-def plot_gas_fee_distribution(transactions):
-    gas_fees = [int(tx["gasUsed"]) * int(tx["gasPrice"]) / (10**18) for tx in transactions]
-
-    fig = px.histogram(gas_fees, nbins=50, color_discrete_sequence=[bright_colors[2]])
-    fig.update_layout(
-        title="Gas Fee Distribution",
-        xaxis_title="Gas Fee (ETH)",
-        yaxis_title="Frequency",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# 5. Plot cumulative transaction value over time (Line Chart)
-def plot_cumulative_transaction_value(transactions):
-    times = [int(tx["timeStamp"]) for tx in transactions]
-    values = [int(tx["value"]) / 10**18 for tx in transactions]
-    times = pd.to_datetime(times, unit='s')
-
-    cumulative_values = np.cumsum(values)
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=times, y=cumulative_values, mode='lines', name='Cumulative Value', 
-                             line=dict(color=bright_colors[5], width=4)))
-    fig.update_layout(
-        title="Cumulative Transaction Value Over Time",
-        xaxis_title="Date",
-        yaxis_title="Cumulative ETH",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# 6. Plot Address Interaction Network (Force-Directed Graph)
-def plot_address_interaction_network(transactions):
-    G = nx.Graph()
-
-    for tx in transactions:
-        from_address = tx["from"].lower()
-        to_address = tx["to"].lower() if tx["to"] else None
-        G.add_edge(from_address, to_address)
-
-    pos = nx.spring_layout(G, seed=42)
-    edges_x = []
-    edges_y = []
-    for edge in G.edges():
-        x0, y0 = pos[edge[0]]
-        x1, y1 = pos[edge[1]]
-        edges_x.append(x0)
-        edges_x.append(x1)
-        edges_y.append(y0)
-        edges_y.append(y1)
-
-    edge_trace = go.Scatter(x=edges_x, y=edges_y, mode='lines', line=dict(width=0.5, color=bright_colors[6]), 
-                            hoverinfo='none')
-
-    nodes_x = [pos[node][0] for node in G.nodes()]
-    nodes_y = [pos[node][1] for node in G.nodes()]
-    node_trace = go.Scatter(x=nodes_x, y=nodes_y, mode='markers', hoverinfo='text', 
-                            marker=dict(color=bright_colors[7], size=10))
-
-    fig = go.Figure(data=[edge_trace, node_trace])
-    fig.update_layout(
-        title="Address Interaction Network",
-        title_x=0.5,
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white"),
-        showlegend=False
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-
-# 7. Plot transaction frequency over time (Line Chart)
-def plot_cumulative_transaction_value(transactions):
-    times = [int(tx["timeStamp"]) for tx in transactions]
-    values = [int(tx["value"]) / 10**18 for tx in transactions]
-    times = pd.to_datetime(times, unit='s')
-
-    # Calculate cumulative value
-    cumulative_values = np.cumsum(values)
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=times, 
-        y=cumulative_values, 
-        mode='lines', 
-        name='Cumulative Value', 
-        line=dict(color='#81A1C1', width=4, dash='dot')
-    ))
-
-    fig.update_layout(
-        title="Cumulative Transaction Value Over Time",
-        xaxis_title="Date",
-        yaxis_title="Cumulative ETH",
-        plot_bgcolor="#2E3440",  # Dark background
-        paper_bgcolor="#3B4252",  # Lighter background for contrast
-        font=dict(family="Roboto, sans-serif", color="white"),
-        hoverlabel=dict(font_size=18, font_color="white"),
-        transition_duration=1000,
-        transition_easing="cubic-in-out"
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-# 8. Plot Transaction Value Trend (Line Chart)
-def plot_transaction_value_trend(transactions):
-    times = [int(tx["timeStamp"]) for tx in transactions]
-    values = [int(tx["value"]) / 10**18 for tx in transactions]
-    times = pd.to_datetime(times, unit='s')
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=times, y=values, mode='lines+markers', name='Transaction Value Trend',
-                             line=dict(color=bright_colors[5], width=3), marker=dict(size=6, color=bright_colors[1])))
-
-    fig.update_layout(
-        title="Transaction Value Trend Over Time",
-        xaxis_title="Date",
-        yaxis_title="ETH",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-def plot_transaction_success_rate(transactions):
-    successful = 0
-    failed = 0
-
-    for tx in transactions:
-        if tx["isError"] == "0":
-            successful += 1
-        else:
-            failed += 1
-
-    fig = go.Figure(data=[go.Pie(labels=["Successful", "Failed"], values=[successful, failed], hole=0.3,
-                                 marker=dict(colors=[bright_colors[0], bright_colors[3]]))])
-    
-    fig.update_layout(
-        title="Transaction Success vs Failure",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    
-# 9. Plot Transaction Activity Over Time (Line Chart)
-def plot_transaction_activity_timeline(transactions):
-    times = [int(tx["timeStamp"]) for tx in transactions]
-    times = pd.to_datetime(times, unit='s')
-
-    # Calculate daily transaction counts
-    daily_activity = pd.Series(times).dt.date.value_counts().sort_index()
-
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=daily_activity.index, y=daily_activity.values, mode='lines+markers', 
-                             name="Daily Transaction Activity", line=dict(color=bright_colors[4], width=3)))
-
-    fig.update_layout(
-        title="Transaction Activity Over Time",
-        xaxis_title="Date",
-        yaxis_title="Number of Transactions",
-        plot_bgcolor="#2E3440",
-        paper_bgcolor="#3B4252",
-        font=dict(family="Roboto, sans-serif", color="white")
-    )
-    st.plotly_chart(fig, use_container_width=True)
-    
-    
-    
-
-
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-
-# Set up the email credentials
-from_email = 'from email'  # Replace with your Gmail address
-app_password = 'temporary password generated for ur gmail'  # Replace with your generated app password
-to_email = 'email to send report to'  # Replace with the recipient's email address
-
-# Function to send the email
-def send_email(subject, body):
-    # Set up the SMTP server
-    server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-    server.login(from_email, app_password)
-
-    # Create the email
-    msg = MIMEMultipart()
-    msg['From'] = from_email
-    msg['To'] = to_email
-    msg['Subject'] = subject
-
-    # Attach the body (report content)
-    msg.attach(MIMEText(body, 'plain'))
-
-    # Send the email
-    server.sendmail(from_email, to_email, msg.as_string())
-    server.quit()
+# Show one page of the transactions table, only that page is serialized and sent to the browser
+def show_transaction_table(table, page_size=TABLE_PAGE_SIZE):
+    pages = max(1, -(-len(table) // page_size))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="transactions_page") if pages > 1 else 1
+    st.dataframe(table.iloc[(page - 1) * page_size:page * page_size], column_config=TRANSACTION_TABLE_CONFIG,
+                 hide_index=True, width="stretch")
+
+# Balance as shown in the app, a balance Etherscan did not return is shown as unavailable rather than 0
+def format_balance(balance):
+    return "unavailable" if balance is None else f"{balance:.4f} ETH"
+
+# Streamlit caches, keyed by (address, block height) so a rerun only refetches once a new block lands.
+# Arguments starting with an underscore are not hashed, they are fully determined by the key.
+@st.cache_data(ttl=BLOCK_HEIGHT_TTL, show_spinner=False)
+def cached_latest_block():
+    return get_latest_block()
+
+@st.cache_data(ttl=SCAN_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_wallet_data(wallet_address, block_height, count):
+    balance, transactions = fetch_wallet_data(wallet_address, count, block_height)
+    return balance, build_transaction_frame(transactions), get_store().last_synced_block(wallet_address)
+
+# A wallet without transactions has no creation date to store, the cache keeps reruns from asking Etherscan again
+@st.cache_data(ttl=SCAN_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_wallet_creation_date(wallet_address, block_height):
+    return get_wallet_creation_date(wallet_address)
+
+@st.cache_data(ttl=SCAN_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_rollups(wallet_address, block_height, resolution):
+    return load_rollups(wallet_address, resolution)
+
+@st.cache_data(ttl=SCAN_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_detection(wallet_address, block_height, _transactions_frame, _wallet_creation_date, _wallet_balance):
+    return detect_suspicious_activity(_transactions_frame, _wallet_creation_date, _wallet_balance)
+
+# Figures are keyed by the wallet's sync version, the last synced block and balance, so they are reused
+# across new blocks until the wallet itself changes
+@st.cache_data(ttl=FIGURE_CACHE_TTL, max_entries=CACHE_MAX_ENTRIES * 16, show_spinner=False)
+def cached_figure(chart_name, wallet_address, sync_version, _plot_function, _args):
+    with timed(chart_name):
+        fig = _plot_function(*_args)
+    # Serialized once to measure what the browser receives, Streamlit does the same when it renders the chart
+    with timed(f"{chart_name}_json"):
+        payload = fig.to_json()
+    metrics.increment("wallet_monitor_payload_bytes_total", len(payload), source=f"chart:{chart_name}")
+    return fig
+
+# Render a chart, building its figure only if it is not cached for this wallet and sync version
+def show_chart(wallet_address, sync_version, plot_function, *args):
+    fig = cached_figure(plot_function.__name__, wallet_address, sync_version, plot_function, args)
+    st.plotly_chart(fig, width="stretch")
+
+# Render a chart inside an expander that reruns the app when toggled. The figure (and its
+# arguments, passed as a callable) is only computed while the expander is open.
+def lazy_chart(title, wallet_address, sync_version, plot_function, chart_args, expanded=False):
+    chart = st.expander(title, expanded=expanded, key=f"chart_{plot_function.__name__}", on_change="rerun")
+    if chart.open:
+        with chart:
+            show_chart(wallet_address, sync_version, plot_function, *chart_args())
+
+# Drop every cached scan and chart, the next run fetches from Etherscan again
+def clear_caches():
+    cached_latest_block.clear()
+    cached_wallet_data.clear()
+    cached_wallet_creation_date.clear()
+    cached_rollups.clear()
+    cached_detection.clear()
+    cached_figure.clear()
 
 # Main function
 if __name__ == "__main__":
@@ -645,29 +162,32 @@ if __name__ == "__main__":
     st.title("Ethereum Wallet Activity Monitor")
     wallet_address_input = st.text_input("Enter Ethereum Wallet Address", value=WALLET_ADDRESS)
 
+    # One compact summary per wallet, bounded and shared with the store when history is persisted
     if 'history' not in st.session_state:
-        st.session_state['history'] = []
+        st.session_state['history'] = ScanHistory(store=get_store() if PERSIST_HISTORY else None)
+
+    if st.sidebar.button("Force Refresh"):
+        clear_caches()
+    show_debug_panel = st.sidebar.checkbox("Show debug panel")
 
     if wallet_address_input:
+        metrics_before = metrics.snapshot()
         with st.spinner("Fetching wallet data..."):
-            balance = get_balance(wallet_address_input)
-            recent_transactions = fetch_recent_transactions(wallet_address_input, count=TRANSACTION_COUNT)
-            wallet_creation_date = time.time() - 365 * 24 * 60 * 60  # Example: wallet created a year ago
-            suspicious_activities, activity_counts = detect_suspicious_activity(recent_transactions, wallet_creation_date, balance)
-
-        st.markdown(f'<div class="wallet-balance">Wallet Balance: {balance:.4f} ETH</div>', unsafe_allow_html=True)
+            block_height = cached_latest_block()
+            # Parsed once into a frame shared by detection, table and charts
+            balance, transactions_frame, synced_block = cached_wallet_data(wallet_address_input, block_height, TRANSACTION_COUNT)
+            sync_version = (synced_block, balance)
+            wallet_creation_date = cached_wallet_creation_date(wallet_address_input, block_height)
+            suspicious_activities, activity_counts = cached_detection(wallet_address_input, block_height, transactions_frame, wallet_creation_date, balance)
+
+        st.markdown(f'<div class="wallet-balance">Wallet Balance: {format_balance(balance)}</div>', unsafe_allow_html=True)
         # Show detailed security summary
         security_summary = generate_detailed_security_summary(activity_counts, suspicious_activities)
         st.markdown("### Comprehensive Security Summary")
         st.write(security_summary)
 
-        # Add this wallet's details to history
-        st.session_state['history'].append({
-            'wallet': wallet_address_input,
-            'balance': balance,
-            'activity_counts': activity_counts,
-            'suspicious_activities': suspicious_activities
-        })
+        # Add this wallet's summary to history, replacing an earlier scan of it
+        st.session_state['history'].record(wallet_address_input, balance, activity_counts, suspicious_activities)
 
         # Show suspicious activity
         if suspicious_activities:
@@ -680,112 +200,66 @@ if __name__ == "__main__":
                         st.write(f"- {tx['details']} (Tx Hash: {tx.get('tx_hash', 'N/A')})")
 
         # --- New Table for Recent Transactions ---
-        # Prepare the data for the table
-        import pandas as pd
-
-        transaction_data = []
-        for tx in recent_transactions:
-            value_in_ether = int(tx["value"]) / (10 ** 18)
-            gas_price_in_ether = int(tx["gasPrice"]) / (10 ** 18)
-            gas_fee_in_ether = int(tx["gasUsed"]) * gas_price_in_ether if "gasUsed" in tx else 0
-            
-            transaction_data.append({
-                'Tx Hash': tx['hash'],
-                'From Address': tx['from'],
-                'To Address': tx['to'],
-                'Value (ETH)': f"{value_in_ether:.4f}",
-                'Gas Price (ETH)': f"{gas_price_in_ether:.10f}",
-                'Gas Used (ETH)': f"{gas_fee_in_ether:.10f}",
-                'Transaction Status': 'Success' if tx["isError"] == "0" else 'Failed'
-            })
-
-        # Convert the list of transactions to a pandas DataFrame
-        transaction_df = pd.DataFrame(transaction_data)
-
-        # Apply pandas styling to make the table visually appealing and set column widths
-        styled_df = transaction_df.style.set_properties(
-            **{
-                'font-size': '16px',   # Increase font size
-                'text-align': 'center',  # Center align the text in each column
-                'background-color': '#000000',  # Set the background color of the table to black
-                'color': '#FFFFFF',  # Red text color
-                'border': '1px solid #ddd',  # Add borders around the cells
-                'border-collapse': 'collapse',  # Collapse borders
-                'padding': '10px',  # Increase padding for cells
-            }
-        ).set_table_styles(
-            [{
-                'selector': 'thead th', 
-                'props': [('background-color', '#333333'),  # Dark background color for header
-                          ('color', 'white'),  # Header text color
-                          ('font-size', '18px'),  # Header font size
-                          ('padding', '15px')]}]  # Add padding to header cells
-        )
-
-        # Set max-width and make it responsive
-        styled_df = styled_df.set_properties(
-            subset=['Tx Hash', 'From Address', 'To Address', 'Value (ETH)', 'Gas Price (ETH)', 'Gas Used (ETH)', 'Transaction Status'],
-            **{'max-width': '250px', 'overflow': 'hidden'}
-        )
-
-        # Add custom CSS to make the table fit the available width without scrolling
-        st.markdown("""
-            <style>
-                .stDataFrame {
-                    width: 100%;  # Ensure the table takes up full width
-                    overflow: hidden;  # Prevent horizontal scroll
-                    white-space: nowrap;  # Prevent text from overflowing
-                }
-                .stDataFrame th, .stDataFrame td {
-                    max-width: 200px;  # Set column width limits
-                    text-overflow: ellipsis;  # Ensure text gets truncated if too long
-                    overflow: hidden;
-                    word-wrap: break-word;
-                }
-                .stDataFrame th {
-                    font-size: 18px;
-                    background-color: #333333;  # Dark background color for header
-                    color: white;  # White text color for header
-                }
-                .stDataFrame td {
-                    font-size: 16px;
-                    color:rgb(24, 2, 2);  # Red text color for the body of the table
-                }
-            </style>
-        """, unsafe_allow_html=True)
-
-        # Show the styled DataFrame in Streamlit
         st.write("### Recent Transactions")
-        st.dataframe(styled_df)
+        show_transaction_table(build_transaction_table(transactions_frame))
 
         # Email Button
         if st.button('Send Security Report via Email'):
             send_email("Ethereum Wallet Security Report", security_summary)
-            st.success("Security report sent successfully!")
+            st.success("Security report queued for sending!")
 
         # Visualization & Security checks (optional as per your existing code)
-        st.sidebar.header("Security Issues Distribution")
-        plot_pie_chart(activity_counts)
-        plot_transaction_value_bar_chart(recent_transactions)
-        plot_transaction_heatmap(recent_transactions)
-        plot_spend_vs_balance(recent_transactions, balance)
-        plot_transaction_count_over_time(recent_transactions)
-        plot_top_5_largest_transactions(recent_transactions)
-        plot_transaction_value_distribution(recent_transactions)
-        plot_gas_fee_distribution(recent_transactions)
-        plot_cumulative_transaction_value(recent_transactions)
-        plot_address_interaction_network(recent_transactions)
-        plot_transaction_value_trend(recent_transactions)
-        plot_transaction_success_rate(recent_transactions)
-        plot_transaction_activity_timeline(recent_transactions)
+        # Charts are computed only when opened, the summary above never waits on them.
+        # Time-based charts read the rollups of the whole synced history.
+        hourly_rollups = lambda: (cached_rollups(wallet_address_input, block_height, "hour"),)
+        daily_rollups = lambda: (cached_rollups(wallet_address_input, block_height, "day"),)
+        st.markdown("### Charts")
+        lazy_chart("Security Issues Distribution", wallet_address_input, sync_version, plot_pie_chart, lambda: (activity_counts,), expanded=True)
+        lazy_chart("Transaction Values", wallet_address_input, sync_version, plot_transaction_value_bar_chart, lambda: (transactions_frame,))
+        lazy_chart("Activity by Hour of Day", wallet_address_input, sync_version, plot_transaction_heatmap, hourly_rollups)
+        lazy_chart("Spend vs Balance", wallet_address_input, sync_version, plot_spend_vs_balance, lambda: (transactions_frame, balance))
+        lazy_chart("Transaction Count Over Time", wallet_address_input, sync_version, plot_transaction_count_over_time, daily_rollups)
+        lazy_chart("Top 5 Largest Transactions", wallet_address_input, sync_version, plot_top_5_largest_transactions, lambda: (transactions_frame,))
+        lazy_chart("Transaction Value Distribution", wallet_address_input, sync_version, plot_transaction_value_distribution, lambda: (transactions_frame,))
+        lazy_chart("Gas Fee Distribution", wallet_address_input, sync_version, plot_gas_fee_distribution, lambda: (transactions_frame,))
+        lazy_chart("Cumulative Transaction Value", wallet_address_input, sync_version, plot_cumulative_transaction_value, hourly_rollups)
+        lazy_chart("Address Interaction Network", wallet_address_input, sync_version, plot_address_interaction_network, lambda: (transactions_frame, wallet_address_input))
+        lazy_chart("Transaction Value Trend", wallet_address_input, sync_version, plot_transaction_value_trend, hourly_rollups)
+        lazy_chart("Transaction Success vs Failure", wallet_address_input, sync_version, plot_transaction_success_rate, lambda: (transactions_frame,))
+        lazy_chart("Transaction Activity Over Time", wallet_address_input, sync_version, plot_transaction_activity_timeline, daily_rollups)
+
+        # Timings, API calls and payload sizes of the work this run actually did (cache hits cost nothing)
+        if show_debug_panel:
+            with st.expander("Debug: work done by this run", expanded=True):
+                debug_rows = snapshot_delta(metrics_before, metrics.snapshot())
+                if debug_rows:
+                    st.dataframe(pd.DataFrame(debug_rows), width="stretch")
+                else:
+                    st.write("Everything was served from the caches.")
 
         # Show history on the left sidebar
         if st.session_state['history']:
             st.sidebar.header("Wallet History")
             for entry in st.session_state['history']:
                 with st.sidebar.expander(f"Wallet: {entry['wallet']}"):
-                    st.write(f"Balance: {entry['balance']:.4f} ETH")
+                    st.write(f"Balance: {format_balance(entry['balance'])}")
                     for activity, count in entry['activity_counts'].items():
                         st.write(f"{activity}: {count} occurrences")
-                    for tx in entry['suspicious_activities']:
+                    for tx in entry['findings']:
                         st.write(f"- {tx['issue']}: {tx['details']}")
+                    if entry['finding_count'] > len(entry['findings']):
+                        st.write(f"... and {entry['finding_count'] - len(entry['findings'])} more findings")
+            if st.sidebar.button("Clear History"):
+                st.session_state['history'].clear()
+                st.rerun()
+
+    # Batch scan of many wallets from an uploaded address list
+    with st.sidebar.expander("Batch Scan"):
+        address_file = st.file_uploader("Wallet address list (one per line)", type=["txt", "csv"])
+        if address_file is not None and st.button("Run Batch Scan"):
+            batch_addresses = read_wallet_addresses(address_file.getvalue().decode("utf-8").splitlines())
+            with st.spinner(f"Scanning {len(batch_addresses)} wallets..."):
+                batch_results = scan_wallets(batch_addresses, count=TRANSACTION_COUNT)
+            batch_df = pd.DataFrame(batch_summary_rows(batch_results))
+            st.dataframe(batch_df)
+            st.download_button("Download Results (CSV)", batch_df.to_csv(index=False), file_name="batch_results.csv", mime="text/csv")